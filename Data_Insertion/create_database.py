@@ -1,8 +1,32 @@
 import sqlite3
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from insurance_data import ensure_schema, require_unsharded
+
+# policy_info table definition (shared with the benchmark data generator)
+POLICY_INFO_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS policy_info (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        policy_holder_name TEXT NOT NULL,
+        policy_number TEXT UNIQUE NOT NULL,
+        product_name TEXT NOT NULL,
+        policy_start_date TEXT NOT NULL,
+        premium_due_date TEXT NOT NULL,
+        outstanding_amount REAL NOT NULL,
+        total_premium_paid REAL NOT NULL,
+        sum_assured REAL NOT NULL,
+        fund_value REAL NOT NULL,
+        status TEXT NOT NULL,
+        loyalty_benefits REAL NOT NULL,
+        phone_number TEXT NOT NULL
+    )
+'''
 
 def create_database():
     """Create SQLite database with insurance customer data"""
+    require_unsharded("create_database.py")
     
     # Create data_insertion directory if it doesn't exist
     os.makedirs('data_insertion', exist_ok=True)
@@ -12,23 +36,10 @@ def create_database():
     cursor = conn.cursor()
     
     # Create policy_info table with exact structure
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS policy_info (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            policy_holder_name TEXT NOT NULL,
-            policy_number TEXT UNIQUE NOT NULL,
-            product_name TEXT NOT NULL,
-            policy_start_date TEXT NOT NULL,
-            premium_due_date TEXT NOT NULL,
-            outstanding_amount REAL NOT NULL,
-            total_premium_paid REAL NOT NULL,
-            sum_assured REAL NOT NULL,
-            fund_value REAL NOT NULL,
-            status TEXT NOT NULL,
-            loyalty_benefits REAL NOT NULL,
-            phone_number TEXT NOT NULL
-        )
-    ''')
+    cursor.execute(POLICY_INFO_SCHEMA)
+    
+    # Change feed, household phone index, call history and portfolio rollups
+    ensure_schema(conn)
     
     # Sample data with 20 customers
     sample_data = [
@@ -54,13 +65,20 @@ def create_database():
         ('Anjali Reddy', 'PN1019', 'Wealth Builder', '2014-07-22', '2024-06-30', 35000.00, 135000.00, 2200000.00, 1650000.00, 'Active', 72000.00, '+919849475949')
     ]
     
-    # Insert sample data
+    # Insert sample data (an upsert, not INSERT OR REPLACE: the implicit
+    # delete of a replaced row fires no trigger, so rollups would double count)
     cursor.executemany('''
-        INSERT OR REPLACE INTO policy_info 
+        INSERT INTO policy_info 
         (policy_holder_name, policy_number, product_name, policy_start_date, 
          premium_due_date, outstanding_amount, total_premium_paid, 
          sum_assured, fund_value, status, loyalty_benefits, phone_number)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (policy_number) DO UPDATE SET
+            policy_holder_name = excluded.policy_holder_name, product_name = excluded.product_name,
+            policy_start_date = excluded.policy_start_date, premium_due_date = excluded.premium_due_date,
+            outstanding_amount = excluded.outstanding_amount, total_premium_paid = excluded.total_premium_paid,
+            sum_assured = excluded.sum_assured, fund_value = excluded.fund_value, status = excluded.status,
+            loyalty_benefits = excluded.loyalty_benefits, phone_number = excluded.phone_number
     ''', sample_data)
     
     # Commit changes and close connection
@@ -73,5 +91,26 @@ def create_database():
     print("💾 Database file: insurance_db.sqlite")
     print("📋 Table structure matches your requirements exactly")
 
+def migrate_database(db_path=None):
+    """Bring an existing database up to the current schema (and E.164 phone numbers)"""
+    require_unsharded("create_database.py --migrate")
+    db_path = db_path or os.getenv('DATABASE_PATH', 'insurance_db.sqlite')
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database file '{db_path}' not found!")
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_schema(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ Schema up to date: {db_path}")
+
 if __name__ == "__main__":
-    create_database() 
\ No newline at end of file
+    try:
+        if '--migrate' in sys.argv:
+            migrate_database()
+        else:
+            create_database()
+    except (RuntimeError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Artifact Writer - calling scripts and transcripts written off the call path
+
+Workers hand each file to write() and carry on. One background thread
+takes whatever has queued up (up to batch_size files), writes each file
+to a temporary name and renames it into place, then makes the batch
+durable according to the fsync policy:
+
+    always  fsync every file and its folder before the next one
+    batch   write the whole batch, then fsync each file and each folder
+            once (the default; one disk flush covers many files)
+    never   leave it to the OS page cache
+
+Readers never see a half-written file, because of the rename. write()
+blocks only when max_queue files are waiting, so a slow disk holds the
+campaign back instead of filling memory. flush() waits until everything
+submitted so far is on disk. close() flushes and stops the thread. It
+runs at interpreter exit for any writer still open.
+
+Usage:
+    python artifact_writer.py bench --files 500 --fsync batch
+    python artifact_writer.py bench --files 500 --fsync always --sync
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import argparse
+import tempfile
+import threading
+import collections
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+DEFAULT_FSYNC = os.getenv('ARTIFACT_FSYNC', 'batch')
+LATENCY_SAMPLES = 2048  # recent submit-to-durable times kept for percentiles
+
+# Temp files get 0o666 minus the umask, like open(); mkstemp would make them 0600
+TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+_open_writers = set()
+
+class ArtifactWriter:
+    def __init__(self, fsync=DEFAULT_FSYNC, batch_size=64, max_queue=1000, linger=0.05):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}; use one of {', '.join(FSYNC_POLICIES)}")
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.linger = linger  # how long a batch waits for more files once the first one arrives
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._folders = set()  # folders already created
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._submitted = 0
+        self._completed = 0
+        self.stats_counters = {'files': 0, 'bytes': 0, 'batches': 0, 'failed': 0,
+                               'fsync_seconds': 0.0, 'max_queue_depth': 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+        self._thread.start()
+        _open_writers.add(self)
+
+    # --- producer side ---------------------------------------------------
+
+    def write(self, path, content):
+        """Queue text or bytes for path; returns path at once (the file appears once written)"""
+        if self._closed:
+            raise RuntimeError("ArtifactWriter is closed")
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        with self._lock:
+            self._submitted += 1
+        self._queue.put((path, data, time.perf_counter()))  # blocks while max_queue files wait
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self.stats_counters['max_queue_depth']:
+                self.stats_counters['max_queue_depth'] = depth
+        return path
+
+    def write_json(self, path, obj):
+        return self.write(path, json.dumps(obj, ensure_ascii=False))
+
+    def flush(self, timeout=None):
+        """Wait until every file submitted so far is on disk; returns False on timeout"""
+        with self._done:
+            target = self._submitted
+            return self._done.wait_for(lambda: self._completed >= target, timeout)
+
+    def close(self, timeout=None):
+        """Flush, then stop the writer thread (safe to call twice)"""
+        if self._closed:
+            return True
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        _open_writers.discard(self)
+        return not self._thread.is_alive()
+
+    drain = close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- writer thread -----------------------------------------------------
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.linger
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        pending = []  # (open temp file, temp path, final path) awaiting the batch fsync
+        folders = set()
+        written = failed = size = 0
+        fsync_seconds = 0.0
+        for path, data, _ in batch:
+            try:
+                folder = os.path.dirname(path) or '.'
+                if folder not in self._folders:
+                    os.makedirs(folder, exist_ok=True)
+                    self._folders.add(folder)
+                fd, tmp_path = _create_temp(folder, os.path.splitext(path)[1])
+                f = os.fdopen(fd, 'wb')
+                try:
+                    f.write(data)
+                    f.flush()
+                    if self.fsync == 'always':
+                        started = time.perf_counter()
+                        os.fsync(f.fileno())
+                        fsync_seconds += time.perf_counter() - started
+                except BaseException:
+                    f.close()
+                    os.unlink(tmp_path)
+                    raise
+                if self.fsync == 'batch':
+                    pending.append((f, tmp_path, path))
+                else:
+                    f.close()
+                    os.replace(tmp_path, path)
+                    if self.fsync == 'always':
+                        started = time.perf_counter()
+                        _fsync_folder(folder)
+                        fsync_seconds += time.perf_counter() - started
+                folders.add(folder)
+                written += 1
+                size += len(data)
+            except Exception as e:
+                failed += 1
+                print(f"❌ Could not write {path}: {e}")
+
+        if pending:
+            started = time.perf_counter()
+            for f, tmp_path, path in pending:
+                try:
+                    os.fsync(f.fileno())
+                    f.close()
+                    os.replace(tmp_path, path)
+                except Exception as e:
+                    f.close()
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                    written -= 1
+                    failed += 1
+                    print(f"❌ Could not write {path}: {e}")
+            for folder in folders:
+                _fsync_folder(folder)
+            fsync_seconds += time.perf_counter() - started
+
+        finished = time.perf_counter()
+        with self._done:
+            for _, _, submitted in batch:
+                self._latencies.append(finished - submitted)
+            counters = self.stats_counters
+            counters['files'] += written
+            counters['failed'] += failed
+            counters['bytes'] += size
+            counters['batches'] += 1
+            counters['fsync_seconds'] += fsync_seconds
+            self._completed += len(batch)
+            self._done.notify_all()
+
+    # --- reporting ---------------------------------------------------------
+
+    def stats(self):
+        """Queue depth, throughput counters and submit-to-durable latency (ms)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            report = dict(self.stats_counters)
+            report['queue_depth'] = self._submitted - self._completed
+        report['fsync'] = self.fsync
+        report['fsync_seconds'] = round(report['fsync_seconds'], 4)
+        report['files_per_batch'] = round(report['files'] / report['batches'], 1) if report['batches'] else 0.0
+        for pct in (50, 95, 99):
+            value = latencies[min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))] if latencies else 0.0
+            report[f'latency_p{pct}_ms'] = round(value * 1000, 3)
+        report['latency_max_ms'] = round(latencies[-1] * 1000, 3) if latencies else 0.0
+        return report
+
+def _create_temp(folder, suffix):
+    """Create a new hidden temp file in folder, returning (fd, path)"""
+    while True:
+        path = os.path.join(folder, f".tmp-{os.urandom(6).hex()}{suffix}")
+        try:
+            return os.open(path, TEMP_FLAGS, 0o666), path
+        except FileExistsError:
+            continue
+
+def _fsync_folder(folder):
+    """Make a rename durable (no-op where folders cannot be opened, e.g. Windows)"""
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+@atexit.register
+def _close_open_writers():
+    for writer in list(_open_writers):
+        writer.close()
+
+def write_file(path, content, writer=None):
+    """Write through writer if given, else synchronously (the old inline behaviour)"""
+    if writer is not None:
+        return writer.write(path, content)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Background artifact writer")
+    commands = parser.add_subparsers(dest='command', required=True)
+    bench = commands.add_parser('bench', help="Time writing transcript-sized files")
+    bench.add_argument('--files', type=int, default=500)
+    bench.add_argument('--size', type=int, default=4096, help="Bytes per file")
+    bench.add_argument('--fsync', choices=FSYNC_POLICIES, default=DEFAULT_FSYNC)
+    bench.add_argument('--folder', help="Where to write (default: a temporary folder)")
+    bench.add_argument('--sync', action='store_true', help="Also time plain inline writes for comparison")
+    args = parser.parse_args()
+
+    print("🗄️  Artifact Writer")
+    print("=" * 60)
+    payload = ('x' * 79 + '\n') * (args.size // 80)
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        if args.sync:
+            started = time.perf_counter()
+            for index in range(args.files):
+                path = os.path.join(folder, 'sync', f"transcript_{index}.txt")
+                write_file(path, payload)
+                if args.fsync != 'never':
+                    with open(path, 'rb') as f:
+                        os.fsync(f.fileno())
+            elapsed = time.perf_counter() - started
+            print(f"📝 inline:     {args.files} files in {elapsed:.3f}s "
+                  f"({elapsed / args.files * 1e6:.0f} µs blocked per file)")
+
+        writer = ArtifactWriter(fsync=args.fsync)
+        started = time.perf_counter()
+        for index in range(args.files):
+            writer.write(os.path.join(folder, 'async', f"transcript_{index}.txt"), payload)
+        blocked = time.perf_counter() - started
+        writer.close()
+        elapsed = time.perf_counter() - started
+        stats = writer.stats()
+        print(f"🗄️  background: {args.files} files durable in {elapsed:.3f}s "
+              f"({blocked / args.files * 1e6:.0f} µs blocked per file), fsync={args.fsync}")
+        print(f"   {stats['batches']} batches ({stats['files_per_batch']} files each), "
+              f"fsync {stats['fsync_seconds']:.3f}s, max queue {stats['max_queue_depth']}")
+        print(f"   submit-to-durable p50 {stats['latency_p50_ms']:.1f} ms, p95 {stats['latency_p95_ms']:.1f} ms, "
+              f"max {stats['latency_max_ms']:.1f} ms")
+        if stats['failed']:
+            print(f"❌ {stats['failed']} files failed")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for work_queue.WorkQueue
+
+Runs N worker processes against one copy of a synthetic policy book. Each
+worker claims policies until the book is drained and then completes them.
+The run checks that no policy was handed to two workers and reports claim
+throughput and latency. With --abandon-rate, some workers drop claims
+without completing them; those leases must expire and be reclaimed.
+
+Usage:
+    python benchmarks/bench_contention.py --workers 32
+    python benchmarks/bench_contention.py --workers 32 --abandon-rate 0.05 --lease 0.5
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(REPO_ROOT)
+sys.path.append(BENCH_DIR)
+
+from synthetic_policy_book import DEFAULT_SEED, resolve_size, ensure_policy_book
+from insurance_data import OVERDUE_FILTER
+from work_queue import WorkQueue
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def worker(db_path, index, lease_seconds, hold_seconds, abandon_rate, start_event, results):
+    """Claim until the book is empty; report completed policies and claim latencies"""
+    queue = WorkQueue(db_path, worker_id=f"worker-{index}", lease_seconds=lease_seconds)
+    rng = random.Random(DEFAULT_SEED + index)
+    completed, abandoned, lost, latencies = [], 0, 0, []
+    start_event.wait()
+    while True:
+        start = time.perf_counter()
+        record = queue.claim()
+        latencies.append(time.perf_counter() - start)
+        if record is None:
+            # Claims still in flight (or abandoned, pending expiry) may come back
+            if claims_outstanding(db_path):
+                time.sleep(min(0.05, lease_seconds / 4))
+                continue
+            break
+        if hold_seconds:
+            time.sleep(hold_seconds)
+        if rng.random() < abandon_rate:
+            # Simulate a crashed worker: keep the lease but never finish it
+            queue.held.discard(record.policy_number)
+            abandoned += 1
+            continue
+        if queue.complete(record.policy_number):
+            completed.append(record.policy_number)
+        else:
+            lost += 1
+    results.put((index, completed, abandoned, latencies, queue.stats, lost))
+    queue.close()
+
+
+def claims_outstanding(db_path):
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM policy_claims WHERE state = 'claimed'").fetchone()[0] > 0
+    finally:
+        conn.close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Multi-process claim contention benchmark")
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--book', default='10k', help="Synthetic book size (10k, 1m, 10m or a number)")
+    parser.add_argument('--lease', type=float, default=30.0, help="Lease seconds")
+    parser.add_argument('--hold', type=float, default=0.0, help="Seconds each claim is held before completing")
+    parser.add_argument('--abandon-rate', type=float, default=0.0, help="Fraction of claims dropped without completing")
+    args = parser.parse_args()
+
+    print("🔒 Work Queue Contention Benchmark")
+    print("=" * 60)
+
+    rows = resolve_size(args.book)
+    source = ensure_policy_book(rows, DEFAULT_SEED)
+    scratch = tempfile.mkdtemp(prefix='insurance_contention_')
+    db_path = os.path.join(scratch, 'book.sqlite')
+    shutil.copy(source, db_path)
+    try:
+        conn = sqlite3.connect(db_path)
+        expected = conn.execute(f"SELECT COUNT(*) FROM policy_info WHERE {OVERDUE_FILTER}").fetchone()[0]
+        conn.close()
+        WorkQueue(db_path).close()  # create tables/indexes and switch to WAL before the workers race
+
+        print(f"📚 {rows:,} policies, {expected:,} overdue; {args.workers} workers")
+        results = multiprocessing.Queue()
+        start_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(target=worker, args=(db_path, i, args.lease, args.hold, args.abandon_rate, start_event, results))
+            for i in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        start = time.perf_counter()
+        start_event.set()
+        reports = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    completed = [policy for report in reports for policy in report[1]]
+    latencies = [latency for report in reports for latency in report[3]]
+    duplicates = len(completed) - len(set(completed))
+    reclaimed = sum(report[4]['reclaimed'] for report in reports)
+    per_worker = sorted(len(report[1]) for report in reports)
+
+    print(f"\n📊 Results ({elapsed:.2f}s wall)")
+    print(f"   Claims: {len(latencies):,} ({len(latencies) / elapsed:,.0f}/s), completed {len(completed):,}/{expected:,}")
+    print(f"   Claim latency: p50 {percentile(latencies, 50) * 1000:.2f}ms  "
+          f"p95 {percentile(latencies, 95) * 1000:.2f}ms  p99 {percentile(latencies, 99) * 1000:.2f}ms")
+    print(f"   Abandoned: {sum(report[2] for report in reports)}, reclaimed after expiry: {reclaimed}, "
+          f"completions refused after losing the lease: {sum(report[5] for report in reports)}")
+    print(f"   Lock retries: {sum(report[4]['busy_retries'] for report in reports):,}")
+    print(f"   Per worker: min {per_worker[0]}  max {per_worker[-1]}")
+    if duplicates or len(set(completed)) != expected:
+        print(f"❌ {duplicates} duplicate completions, {expected - len(set(completed))} policies never completed")
+        sys.exit(1)
+    print("✅ Every overdue policy completed exactly once")
+
+
+if __name__ == "__main__":
+    main()
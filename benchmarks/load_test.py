@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Load test: push simulated concurrent calls through the bot's real HTTP path
+
+Starts fake_vapi_server.py in-process (or targets --base-url), points a
+non-mock VAPIInsuranceBot at it and runs script -> assistant -> call ->
+monitor -> transcript for many customers of a synthetic policy book at
+the requested concurrency.
+
+Usage:
+    python benchmarks/load_test.py --calls 2000 --concurrency 500 --time-scale 0.001
+    python benchmarks/load_test.py --calls 200 --rate-limit-rate 0.1 --error-rate 0.02
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(REPO_ROOT)
+sys.path.append(BENCH_DIR)
+
+from synthetic_policy_book import DEFAULT_SEED, resolve_size, ensure_policy_book
+from fake_vapi_server import FakeVAPIConfig, FakeVAPIServer
+from insurance_data import connect_for_records, iter_overdue_records
+
+
+def load_customers(db_path, limit):
+    """Overdue PolicyRecords in campaign order"""
+    conn = connect_for_records(db_path)
+    try:
+        return list(iter_overdue_records(conn, limit=limit))
+    finally:
+        conn.close()
+
+
+def run_one(bot, record, script_content):
+    """One customer through the real bot code path; returns (outcome, seconds)"""
+    start = time.perf_counter()
+    assistant = bot.create_vapi_assistant(record, script_content)
+    if not assistant:
+        return 'assistant-failed', time.perf_counter() - start
+    call = bot.make_call(assistant['id'], record)
+    if not call:
+        return 'call-failed', time.perf_counter() - start
+    completed = bot.monitor_call(call['id'], record.policy_holder_name)
+    if not completed:
+        return 'monitor-timeout', time.perf_counter() - start
+    bot.save_transcript(completed, record.policy_holder_name, assistant.get('latencyProfile'))
+    return completed.get('endedReason', 'unknown'), time.perf_counter() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Concurrent call load test against a fake VAPI server")
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--book', default='10k', help="Synthetic book size to draw customers from")
+    parser.add_argument('--base-url', help="Use an already running fake server instead of starting one")
+    parser.add_argument('--latency', default='lognormal:-3.5,0.5', help="Fake server latency distribution")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=0.2)
+    parser.add_argument('--answer-rate', type=float, default=0.7)
+    parser.add_argument('--time-scale', type=float, default=0.001, help="Wall seconds per simulated call second")
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's per-call output")
+    args = parser.parse_args()
+
+    print("📞 VAPI Load Test")
+    print("=" * 60)
+
+    rows = resolve_size(args.book)
+    db_path = ensure_policy_book(rows, DEFAULT_SEED)
+    customers = load_customers(db_path, args.calls)
+    if len(customers) < args.calls:
+        print(f"⚠️  Book only has {len(customers)} overdue customers; reusing them")
+        customers = [customers[i % len(customers)] for i in range(args.calls)]
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        config = FakeVAPIConfig(
+            latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+            retry_after=args.retry_after, answer_rate=args.answer_rate, time_scale=args.time_scale,
+            transcript_folder=os.path.join(REPO_ROOT, 'Customer_transcripts'), seed=DEFAULT_SEED,
+        )
+        server = FakeVAPIServer(('127.0.0.1', 0), config)
+        server.start_background()
+        base_url = server.base_url
+    print(f"🎭 Fake VAPI: {base_url}")
+
+    os.environ.update({
+        'VAPI_API_KEY': os.getenv('VAPI_API_KEY', 'load-test-key'),
+        'VAPI_PHONE_NUMBER_ID': os.getenv('VAPI_PHONE_NUMBER_ID', 'load-test-number'),
+        'VAPI_BASE_URL': base_url,
+        'VAPI_POLL_INTERVAL': str(args.poll_interval),
+        'VAPI_RETRY_BACKOFF': '0.1',
+        'DATABASE_PATH': db_path,
+    })
+
+    scratch = tempfile.mkdtemp(prefix='insurance_load_')
+    previous_cwd = os.getcwd()
+    # create_vapi_assistant reads the system prompt relative to the working directory
+    shutil.copy(os.path.join(REPO_ROOT, 'system_promt.py'), scratch)
+    os.chdir(scratch)
+    try:
+        from vapi_insurance_bot import VAPIInsuranceBot
+        from dnc_filter import DNCFilter
+
+        with open(os.devnull, 'w') as devnull, redirect_stdout(sys.stdout if args.verbose else devnull):
+            # Synthetic numbers against a fake server: no do-not-call list to honour
+            bot = VAPIInsuranceBot(dnc_filter=DNCFilter(allow_missing=True))
+            scripts = {}
+            for record in customers:
+                if record.policy_number not in scripts:
+                    path = bot.generate_customer_script(record)
+                    with open(path, 'r', encoding='utf-8') as f:
+                        scripts[record.policy_number] = f.read()
+
+            print(f"🚀 {args.calls} calls at concurrency {args.concurrency}...", file=sys.stderr)
+            outcomes = {}
+            durations = []
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                futures = [pool.submit(run_one, bot, r, scripts[r.policy_number]) for r in customers]
+                for future in as_completed(futures):
+                    try:
+                        outcome, seconds = future.result()
+                    except Exception as e:
+                        outcome, seconds = f"error:{type(e).__name__}", 0.0
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                    durations.append(seconds)
+            elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    print(f"\n📊 Results ({elapsed:.2f}s wall)")
+    print(f"   Throughput: {args.calls / elapsed:.1f} calls/s")
+    print(f"   Per-call latency: p50 {percentile(durations, 50):.3f}s  "
+          f"p95 {percentile(durations, 95):.3f}s  p99 {percentile(durations, 99):.3f}s  "
+          f"mean {statistics.mean(durations):.3f}s")
+    print(f"   HTTP: {bot.http_stats['requests']} requests, {bot.http_stats['retries']} retries, "
+          f"{bot.http_stats['rate_limited']} rate-limited, {bot.http_stats['server_errors']} server errors")
+    print("   Outcomes:")
+    for outcome, count in sorted(outcomes.items(), key=lambda item: -item[1]):
+        print(f"     {outcome}: {count}")
+
+
+if __name__ == "__main__":
+    main()
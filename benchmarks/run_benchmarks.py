@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the insurance bot
+
+Times the MCP data tools, script generation, number_to_words, transcript
+saving and a mock-mode campaign against synthetic policy books, then
+compares the medians with benchmarks/baseline.json so regressions fail
+the run. Cold starts are also held to an absolute budget over a bare
+interpreter, so new module-level imports fail the run even on a fresh
+baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py                   # 10k book, compare
+    python benchmarks/run_benchmarks.py --sizes 10k,1m    # several books
+    python benchmarks/run_benchmarks.py --update-baseline # record new baseline
+    python benchmarks/run_benchmarks.py --only startup    # cold-start gate only
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import subprocess
+import platform
+import tempfile
+import statistics
+from contextlib import contextmanager, redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(REPO_ROOT)
+sys.path.append(BENCH_DIR)
+
+from synthetic_policy_book import DEFAULT_SEED, resolve_size, ensure_policy_book
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+# A benchmark is a regression when its median exceeds baseline * (1 + tolerance)
+DEFAULT_TOLERANCE = 0.25
+
+# Start-up is gated on the time a fresh interpreter takes beyond `python -c pass`
+STARTUP_BUDGET_MS = 60
+STARTUP_REFERENCE = 'startup.python'
+# Interpreter start-up is noisy, so these get more runs than --repeat
+STARTUP_REPEAT = 11
+
+
+class BenchmarkSkipped(Exception):
+    """Raised when a benchmark's dependencies are unavailable"""
+
+
+@contextmanager
+def working_directory(path):
+    """Run file-writing code inside a scratch directory"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def measure(func, repeat):
+    """Run func `repeat` times and return timings in milliseconds"""
+    timings = []
+    # The code under test is chatty; keep its progress output out of the report
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        func()  # warm-up: caches, imports, first-time folder creation
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+class BenchmarkSuite:
+    def __init__(self, db_path, rows, repeat=5, seed=DEFAULT_SEED):
+        self.db_path = db_path
+        self.rows = rows
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+
+    def _use_book(self):
+        """Point the data layer at this suite's book (DB_PATH is read once, at import)"""
+        import insurance_data
+        insurance_data.DB_PATH = self.db_path
+        os.environ['DATABASE_PATH'] = self.db_path
+
+    def _mcp_server(self):
+        try:
+            import insurance_mcp_server
+        except ImportError as e:
+            raise BenchmarkSkipped(f"MCP server unavailable: {e}")
+        self._use_book()
+        return insurance_mcp_server
+
+    def _sample_policies(self, count):
+        return [f"PN{1000 + self.rng.randrange(self.rows)}" for _ in range(count)]
+
+    def bench_mcp_longest_overdue(self):
+        server = self._mcp_server()
+        return lambda: server.get_longest_overdue_customer()
+
+    def bench_mcp_customer_by_policy(self):
+        server = self._mcp_server()
+        policies = self._sample_policies(100)
+
+        def run():
+            for policy_number in policies:
+                server.get_customer_by_policy(policy_number)
+        return run
+
+    def bench_mcp_all_overdue(self):
+        server = self._mcp_server()
+        return lambda: server.get_all_overdue_customers()
+
+    def bench_mcp_safe_query_rollup(self):
+        server = self._mcp_server()
+        sql = ("SELECT product_name, status, COUNT(*) AS policies, SUM(outstanding_amount) AS outstanding "
+               "FROM policy_info GROUP BY product_name, status")
+        return lambda: server.execute_safe_query(sql)
+
+    def bench_number_to_words(self):
+        from customer_script_generator import CustomerScriptGenerator
+        self._use_book()
+        generator = CustomerScriptGenerator(self.db_path)
+        amounts = [self.rng.randint(0, 250_000_000) for _ in range(10_000)]
+
+        def run():
+            for amount in amounts:
+                generator.number_to_words(amount)
+        return run
+
+    def bench_script_generation(self):
+        from customer_script_generator import CustomerScriptGenerator
+        self._use_book()
+        generator = CustomerScriptGenerator(self.db_path)
+        customer = generator.get_longest_overdue_customer()
+        if not customer:
+            raise BenchmarkSkipped("no overdue customer in book")
+        return lambda: generator.create_customer_script_file(customer)
+
+    def _mock_bot(self):
+        try:
+            from vapi_insurance_bot import VAPIInsuranceBot
+            from dnc_filter import DNCFilter
+        except ImportError as e:
+            raise BenchmarkSkipped(f"bot unavailable: {e}")
+        self._use_book()
+        # The synthetic book has no do-not-call list
+        return VAPIInsuranceBot(mock_mode=True, dnc_filter=DNCFilter(allow_missing=True))
+
+    def bench_transcript_save(self):
+        bot = self._mock_bot()
+        fixture = os.path.join(REPO_ROOT, 'Customer_transcripts', 'Kavita_Joshi_20250811_221027.txt')
+        with open(fixture, 'r', encoding='utf-8') as f:
+            transcript = f.read()
+        call_data = {
+            'id': 'bench-call',
+            'status': 'ended',
+            'cost': 0.17,
+            'startedAt': '2025-08-11T16:36:02.069Z',
+            'endedAt': '2025-08-11T16:37:54.770Z',
+            'endedReason': 'customer-ended-call',
+            'artifact': {'transcript': transcript},
+        }
+        return lambda: bot.save_transcript(call_data, 'Kavita Joshi')
+
+    def bench_mock_campaign(self):
+        bot = self._mock_bot()
+        return lambda: bot.run_campaign()
+
+    def _cold_start(self, code):
+        """Time a fresh interpreter running `code` with the repo importable"""
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT, DATABASE_PATH=self.db_path,
+                   VAPI_NON_INTERACTIVE='1', VAPI_SKIP_DOTENV='1')
+        command = [sys.executable, '-c', code]
+
+        def run():
+            subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        return run
+
+    def bench_python_startup(self):
+        return self._cold_start('pass')
+
+    def bench_import_bot(self):
+        return self._cold_start('import vapi_insurance_bot')
+
+    def bench_import_script_generator(self):
+        return self._cold_start('import customer_script_generator')
+
+    def bench_import_data_layer(self):
+        return self._cold_start('import insurance_data')
+
+    def bench_cold_start_bot(self):
+        return self._cold_start('import vapi_insurance_bot as b; b.VAPIInsuranceBot(mock_mode=True)')
+
+    # (name, factory, repeat override) - the mock campaign sleeps, so run it once
+    def benchmarks(self):
+        return [
+            ('mcp.get_longest_overdue_customer', self.bench_mcp_longest_overdue, None),
+            ('mcp.get_customer_by_policy_x100', self.bench_mcp_customer_by_policy, None),
+            ('mcp.get_all_overdue_customers', self.bench_mcp_all_overdue, None),
+            ('mcp.execute_safe_query_rollup', self.bench_mcp_safe_query_rollup, None),
+            ('script.number_to_words_x10k', self.bench_number_to_words, None),
+            ('script.create_customer_script_file', self.bench_script_generation, None),
+            ('bot.save_transcript', self.bench_transcript_save, None),
+            ('bot.mock_campaign', self.bench_mock_campaign, 1),
+            ('startup.python', self.bench_python_startup, STARTUP_REPEAT),
+            ('startup.import_insurance_data', self.bench_import_data_layer, STARTUP_REPEAT),
+            ('startup.import_customer_script_generator', self.bench_import_script_generator, STARTUP_REPEAT),
+            ('startup.import_vapi_insurance_bot', self.bench_import_bot, STARTUP_REPEAT),
+            ('startup.bot_non_interactive', self.bench_cold_start_bot, STARTUP_REPEAT),
+        ]
+
+    def run(self, only=None):
+        """Run every benchmark and return {name: result}"""
+        results = {}
+        for name, factory, repeat in self.benchmarks():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            try:
+                with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                    func = factory()
+                timings = measure(func, repeat or self.repeat)
+            except BenchmarkSkipped as e:
+                print(f"   ⏭️  {name}: skipped ({e})")
+                continue
+            results[name] = {
+                'median_ms': round(statistics.median(timings), 3),
+                'min_ms': round(min(timings), 3),
+                'runs': len(timings),
+            }
+            print(f"   ⏱️  {name}: median {results[name]['median_ms']:.3f} ms "
+                  f"(min {results[name]['min_ms']:.3f} ms, {len(timings)} runs)")
+        return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    payload = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Return a list of (key, baseline_ms, current_ms) regressions"""
+    regressions = []
+    for key, result in sorted(results.items()):
+        reference = baseline.get(key)
+        if not reference:
+            print(f"   🆕 {key}: no baseline")
+            continue
+        ratio = result['median_ms'] / reference['median_ms'] if reference['median_ms'] else 1.0
+        marker = "❌" if ratio > 1 + tolerance else "✅"
+        print(f"   {marker} {key}: {reference['median_ms']:.3f} ms -> {result['median_ms']:.3f} ms ({ratio:.2f}x)")
+        if ratio > 1 + tolerance:
+            regressions.append((key, reference['median_ms'], result['median_ms']))
+    return regressions
+
+
+def check_startup_budget(results, budget_ms):
+    """Return a list of (key, overhead_ms) start-ups over budget_ms above a bare interpreter"""
+    over_budget = []
+    for key, result in sorted(results.items()):
+        prefix, _, name = key.rpartition(':')
+        reference = results.get(f"{prefix}:{STARTUP_REFERENCE}" if prefix else STARTUP_REFERENCE)
+        if not name.startswith('startup.') or name == STARTUP_REFERENCE or not reference:
+            continue
+        overhead = result['median_ms'] - reference['median_ms']
+        marker = "❌" if overhead > budget_ms else "✅"
+        print(f"   {marker} {key}: {overhead:.1f} ms over a bare interpreter (budget {budget_ms:.0f} ms)")
+        if overhead > budget_ms:
+            over_budget.append((key, overhead))
+    return over_budget
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Run the insurance bot benchmark suite")
+    parser.add_argument('--sizes', default='10k', help="Comma separated book sizes (10k,1m,10m)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help="Comma separated substrings of benchmark names to run")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET_MS,
+                        help="Milliseconds a cold start may take beyond a bare interpreter")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--output', help="Also write raw results as JSON to this path")
+    args = parser.parse_args()
+
+    print("📈 Insurance Bot Benchmark Suite")
+    print("=" * 60)
+
+    only = [p.strip() for p in args.only.split(',')] if args.only else None
+    results = {}
+    scratch = tempfile.mkdtemp(prefix='insurance_bench_')
+    try:
+        for size in args.sizes.split(','):
+            rows = resolve_size(size.strip())
+            db_path = ensure_policy_book(rows, args.seed)
+            print(f"\n📊 Policy book: {rows:,} rows ({db_path})")
+            with working_directory(scratch):
+                suite = BenchmarkSuite(db_path, rows, repeat=args.repeat, seed=args.seed)
+                for name, result in suite.run(only).items():
+                    results[f"{size.strip().lower()}:{name}"] = result
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    # Checked before a baseline update too, so a slow start-up can't become the new normal
+    print(f"\n🚀 Cold-start budget ({args.startup_budget:.0f} ms over a bare interpreter)")
+    over_budget = check_startup_budget(results, args.startup_budget)
+    if over_budget:
+        print(f"\n❌ {len(over_budget)} cold start(s) over budget")
+        sys.exit(1)
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(baseline, args.baseline)
+        print(f"\n💾 Baseline updated: {args.baseline}")
+        return
+
+    print(f"\n🔍 Comparing with baseline (tolerance {args.tolerance:.0%})")
+    regressions = compare_with_baseline(results, load_baseline(args.baseline), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Synthetic policy book generator for benchmarks
+
+Builds a deterministic policy_info table (same schema as
+Data_Insertion/create_database.py) with realistic distributions of
+status, premium due dates and amounts. The same seed and size always
+produce byte-identical rows, so timings are comparable between runs.
+
+Usage:
+    python benchmarks/synthetic_policy_book.py --rows 10k
+    python benchmarks/synthetic_policy_book.py --rows 1m --output /tmp/book.sqlite
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import argparse
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data_Insertion'))
+from create_database import POLICY_INFO_SCHEMA
+
+# Named sizes accepted on the command line
+BOOK_SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+DEFAULT_SEED = 20240618
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Fixed "today" so due-date ageing never depends on when the book was built
+REFERENCE_DATE = date(2024, 12, 31)
+
+FIRST_NAMES = [
+    'Pratik', 'Priya', 'Rajesh', 'Anita', 'Suresh', 'Meera', 'Vikram', 'Sunita',
+    'Arun', 'Kavita', 'Rahul', 'Neha', 'Amit', 'Pooja', 'Deepak', 'Ritu',
+    'Mohan', 'Sangeeta', 'Vishal', 'Anjali', 'Sanjay', 'Lakshmi', 'Karan', 'Divya',
+]
+LAST_NAMES = [
+    'Jadhav', 'Sharma', 'Kumar', 'Patel', 'Reddy', 'Singh', 'Malhotra', 'Verma',
+    'Desai', 'Joshi', 'Gupta', 'Kapoor', 'Shah', 'Mehta', 'Iyer', 'Nair',
+]
+PRODUCTS = [
+    'Smart Growth', 'Health Shield Pro', 'Motor Insurance', 'Home Protection',
+    'Term Life Plan', 'Child Education Plan', 'Retirement Plus', 'Critical Illness',
+    'Personal Accident', 'Wealth Builder',
+]
+
+# (status, weight) - most of the book is healthy, the tail is what campaigns dial
+STATUS_WEIGHTS = [
+    ('Active', 70),
+    ('Grace Period', 10),
+    ('Discontinuance', 12),
+    ('overdue', 5),
+    ('Lapsed', 3),
+]
+
+# Share of Active policies that still carry an unpaid premium
+ACTIVE_WITH_DUES = 0.35
+
+# Share of policies that reuse a phone number already in the book (households)
+SHARED_PHONE_RATE = 0.15
+
+
+def resolve_size(size):
+    """Turn '10k' / '1m' / '10m' / '2500' into a row count"""
+    key = str(size).lower()
+    if key in BOOK_SIZES:
+        return BOOK_SIZES[key]
+    return int(key.replace('_', ''))
+
+
+def default_book_path(rows, seed=DEFAULT_SEED):
+    """Cache location for a generated book of the given size"""
+    return os.path.join(DATA_FOLDER, f"policy_book_{rows}_{seed}.sqlite")
+
+
+def _round_to(value, step):
+    return float(int(round(value / step)) * step)
+
+
+def iter_policy_rows(rows, seed=DEFAULT_SEED):
+    """Yield policy_info tuples in insert-column order"""
+    rng = random.Random(seed)
+    statuses = [s for s, _ in STATUS_WEIGHTS]
+    weights = [w for _, w in STATUS_WEIGHTS]
+    recent_phones = []
+
+    for i in range(rows):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        policy_number = f"PN{1000 + i}"
+        product = rng.choice(PRODUCTS)
+        status = rng.choices(statuses, weights)[0]
+
+        # Policies started 1-14 years before the reference date
+        start = REFERENCE_DATE - timedelta(days=rng.randint(365, 14 * 365))
+        years_in_force = max(1, (REFERENCE_DATE - start).days // 365)
+
+        # Annual premium is log-normal around fifteen thousand rupees
+        premium = min(max(_round_to(rng.lognormvariate(9.6, 0.55), 100), 2000.0), 250000.0)
+
+        if status == 'Active':
+            # Mostly paid up; due dates spread over the coming year
+            due = REFERENCE_DATE + timedelta(days=rng.randint(-30, 335))
+            outstanding = premium if rng.random() < ACTIVE_WITH_DUES else 0.0
+        elif status == 'Grace Period':
+            due = REFERENCE_DATE - timedelta(days=rng.randint(1, 30))
+            outstanding = premium
+        else:
+            # Long tail of ageing arrears, skewed towards recent months
+            due = REFERENCE_DATE - timedelta(days=int(rng.expovariate(1 / 150)) + 31)
+            outstanding = premium * rng.choice((1, 1, 1, 2, 3))
+
+        total_paid = premium * max(1, years_in_force - (0 if outstanding == 0 else 1)) * rng.uniform(0.9, 1.0)
+        sum_assured = _round_to(premium * rng.uniform(10, 60), 1000)
+        fund_value = _round_to(total_paid * rng.uniform(0.8, 1.6), 10)
+        loyalty = _round_to(fund_value * rng.uniform(0.02, 0.06), 10)
+
+        if recent_phones and rng.random() < SHARED_PHONE_RATE:
+            phone = rng.choice(recent_phones)
+        else:
+            phone = f"+919{rng.randint(0, 999_999_999):09d}"
+            recent_phones.append(phone)
+            if len(recent_phones) > 64:
+                recent_phones.pop(0)
+
+        yield (
+            name, policy_number, product, start.isoformat(), due.isoformat(),
+            outstanding, round(total_paid, 2), sum_assured, fund_value,
+            status, loyalty, phone,
+        )
+
+
+def generate_policy_book(db_path, rows, seed=DEFAULT_SEED, batch_size=50_000):
+    """Create (or replace) a SQLite policy book with `rows` synthetic policies"""
+    folder = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(folder, exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # Bulk-load settings; the file is throwaway until the final commit
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(POLICY_INFO_SCHEMA)
+
+        insert = '''
+            INSERT INTO policy_info
+            (policy_holder_name, policy_number, product_name, policy_start_date,
+             premium_due_date, outstanding_amount, total_premium_paid,
+             sum_assured, fund_value, status, loyalty_benefits, phone_number)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        batch = []
+        for row in iter_policy_rows(rows, seed):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(insert, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(insert, batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return db_path
+
+
+def ensure_policy_book(rows, seed=DEFAULT_SEED):
+    """Return a cached book for (rows, seed), generating it on first use"""
+    path = default_book_path(rows, seed)
+    if not os.path.exists(path):
+        print(f"🏗️  Generating synthetic policy book: {rows:,} rows (seed {seed})...")
+        generate_policy_book(path, rows, seed)
+    return path
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic policy_info book")
+    parser.add_argument('--rows', default='10k', help="10k, 1m, 10m or an explicit row count")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', help="Database path (defaults to benchmarks/data/)")
+    args = parser.parse_args()
+
+    rows = resolve_size(args.rows)
+    path = args.output or default_book_path(rows, args.seed)
+
+    print(f"🏗️  Generating {rows:,} policies (seed {args.seed})...")
+    generate_policy_book(path, rows, args.seed)
+    print(f"✅ Policy book written: {path}")
+    print(f"📊 File size: {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Campaign Daemon - resident campaign service with a local job API
+
+vapi_insurance_bot.py starts cold on every run: it loads .env, the
+templates and the DNC list, opens new connections, calls one customer
+and exits. The daemon keeps one warm VAPIInsuranceBot for its whole
+life: HTTP sessions, the parsed system prompt, single-language script
+templates, the DNC filter, and assistants already created for an
+identical configuration. Campaign jobs run on it as CampaignPipelines.
+
+One job runs at a time. Customers are claimed through the shared work
+queue, so a new job carries on where the last one stopped rather than
+redialling the top of the book.
+
+API (JSON over 127.0.0.1:8780, or a Unix socket with --socket):
+    GET  /health                  ok / draining
+    GET  /status                  daemon, cache, writer, snapshot and HTTP stats
+    GET  /jobs                    every job this daemon has run
+    GET  /jobs/<id>               one job, with live pipeline stats
+    POST /jobs                    start: {"lines": 4, "limit": 50, "pacing": true, ...}
+    POST /jobs/<id>/pause         hold new dials; calls in progress finish
+    POST /jobs/<id>/resume
+    POST /jobs/<id>/stop          finish calls in progress, release queued customers
+
+SIGTERM or SIGINT drains: new jobs get 503, the running job stops taking
+customers, calls in progress finish, queued artifacts are flushed, and
+the process exits. A second signal, or --drain-timeout, exits at once.
+
+Usage:
+    python campaign_daemon.py serve --fake-vapi
+    python campaign_daemon.py serve --socket /tmp/campaign.sock
+    python campaign_daemon.py serve --snapshot --snapshot-interval 120
+    python campaign_daemon.py start --lines 4 --limit 20
+    python campaign_daemon.py status
+    python campaign_daemon.py pause 1
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import http.client
+from datetime import datetime
+from socketserver import ThreadingMixIn, UnixStreamServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from campaign_pipeline import CampaignPipeline
+from pacing_controller import PacingController
+from artifact_writer import ArtifactWriter, FSYNC_POLICIES, DEFAULT_FSYNC
+from db_snapshot import SnapshotManager, REFRESH_INTERVAL
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.getenv('CAMPAIGN_DAEMON_PORT', '8780'))
+DRAIN_TIMEOUT = 900  # seconds; monitor_call waits up to 15 minutes for a call to end
+
+JOB_PARAMS = {'lines': int, 'prefetch': int, 'builders': int, 'limit': int,
+              'pacing': bool, 'initial_lines': int, 'answered_capacity': int}
+
+class JobConflict(Exception):
+    """Another job is still running"""
+
+class Job:
+    def __init__(self, job_id, params, pipeline):
+        self.id = job_id
+        self.params = params
+        self.pipeline = pipeline
+        self.state = 'running'
+        self.error = None
+        self.created_at = datetime.now().isoformat(timespec='seconds')
+        self.finished_at = None
+        self.thread = None
+
+    def to_dict(self):
+        pipeline = self.pipeline
+        with pipeline._lock:
+            stats = dict(pipeline.stats)
+        if pipeline.pacing is not None and 'pacing' not in stats:
+            stats['pacing'] = pipeline.pacing.snapshot()
+        state = 'paused' if self.state == 'running' and pipeline.paused else self.state
+        return {'id': self.id, 'state': state, 'params': self.params, 'created_at': self.created_at,
+                'finished_at': self.finished_at, 'error': self.error, 'stats': stats}
+
+class CampaignDaemon:
+    def __init__(self, bot, drain_timeout=DRAIN_TIMEOUT, snapshot=None):
+        self.bot = bot
+        self.snapshot = snapshot  # db_snapshot.SnapshotManager serving campaign reads, if any
+        self.drain_timeout = drain_timeout
+        self.jobs = {}
+        self.started_at = time.time()
+        self.draining = False
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._drained = threading.Event()
+
+    def active_job(self):
+        with self._lock:
+            for job in self.jobs.values():
+                if job.state in ('running', 'stopping'):
+                    return job
+        return None
+
+    def start_job(self, params):
+        """Start a CampaignPipeline job; raises JobConflict / RuntimeError / ValueError"""
+        if self.draining:
+            raise RuntimeError("Daemon is draining; not accepting jobs")
+        params = parse_job_params(params)
+        lines = params.get('lines', 4)
+        pacing = None
+        if params.get('pacing'):
+            pacing = PacingController(initial_limit=min(params.get('initial_lines', 4), lines), max_limit=lines,
+                                      answered_capacity=params.get('answered_capacity'))
+        with self._lock:
+            if any(job.state in ('running', 'stopping') for job in self.jobs.values()):
+                raise JobConflict("A job is already running; stop it first")
+            # The bot reports HTTP responses to whichever controller the current job uses
+            self.bot.pacing = pacing
+            pipeline = CampaignPipeline(self.bot, lines=lines, prefetch=params.get('prefetch'),
+                                        builders=params.get('builders', 2), limit=params.get('limit'),
+                                        pacing=pacing)
+            job = Job(self._next_id, params, pipeline)
+            self.jobs[job.id] = job
+            self._next_id += 1
+        job.thread = threading.Thread(target=self._run_job, args=(job,), name=f"job-{job.id}", daemon=True)
+        job.thread.start()
+        print(f"▶️  Job {job.id} started: {params}")
+        return job
+
+    def _run_job(self, job):
+        try:
+            job.pipeline.run()
+            job.state = 'stopped' if job.state == 'stopping' else 'finished'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            print(f"❌ Job {job.id} failed: {e}")
+        finally:
+            if self.bot.writer is not None:
+                self.bot.writer.flush()
+            self.bot.pacing = None
+            job.finished_at = datetime.now().isoformat(timespec='seconds')
+            stats = job.pipeline.stats
+            print(f"⏹️  Job {job.id} {job.state}: {stats['calls']} calls, {stats['completed']} completed")
+
+    def job(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"No job {job_id}")
+        return job
+
+    def pause(self, job_id):
+        job = self.job(job_id)
+        if job.state != 'running':
+            raise JobConflict(f"Job {job_id} is {job.state}")
+        job.pipeline.pause()
+        return job
+
+    def resume(self, job_id):
+        job = self.job(job_id)
+        if job.state != 'running':
+            raise JobConflict(f"Job {job_id} is {job.state}")
+        job.pipeline.resume()
+        return job
+
+    def stop(self, job_id):
+        job = self.job(job_id)
+        if job.state == 'running':
+            job.state = 'stopping'
+            job.pipeline.stop()
+        return job
+
+    def status(self):
+        job = self.active_job()
+        writer = self.bot.writer
+        with self.bot._stats_lock:
+            http_stats = dict(self.bot.http_stats)
+            cache_stats = dict(self.bot.cache_stats)
+            cache_stats['assistants_cached'] = len(self.bot._assistant_cache)
+        return {
+            'state': 'draining' if self.draining else 'ok',
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'active_job': job.id if job else None,
+            'jobs': len(self.jobs),
+            'mock_mode': self.bot.mock_mode,
+            'http': http_stats,
+            'caches': cache_stats,
+            'writer': writer.stats() if writer is not None else None,
+            'snapshot': self.snapshot.stats() if self.snapshot is not None else None,
+        }
+
+    def drain(self):
+        """Stop taking jobs, let the running one finish its calls, flush artifacts"""
+        if self.draining:
+            return
+        self.draining = True
+        print("🛑 Draining: no new jobs; calls in progress will finish")
+        job = self.active_job()
+        if job is not None:
+            self.stop(job.id)
+            job.thread.join(self.drain_timeout)
+            if job.thread.is_alive():
+                print(f"⚠️  Job {job.id} still running after {self.drain_timeout}s; exiting anyway")
+        if self.bot.writer is not None:
+            self.bot.writer.close(timeout=60)
+        if self.snapshot is not None:
+            self.snapshot.stop()
+        if self.bot.work_queue is not None:
+            for policy_number in list(self.bot.work_queue.held):
+                self.bot.work_queue.release(policy_number)
+        self._drained.set()
+
+def parse_job_params(params):
+    """Validate a POST /jobs body against JOB_PARAMS"""
+    if not isinstance(params, dict):
+        raise ValueError("Job parameters must be a JSON object")
+    unknown = set(params) - set(JOB_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown job parameters: {', '.join(sorted(unknown))}")
+    parsed = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        kind = JOB_PARAMS[key]
+        if kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{key} must be true or false")
+            parsed[key] = value
+            continue
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"{key} must be a positive integer")
+        parsed[key] = value
+    return parsed
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'CampaignDaemon/1.0'
+
+    @property
+    def daemon(self):
+        return self.server.daemon
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"🌐 {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        daemon = self.daemon
+        if self.path == '/health':
+            self._send_json(503 if daemon.draining else 200, {'status': 'draining' if daemon.draining else 'ok'})
+        elif self.path == '/status':
+            self._send_json(200, daemon.status())
+        elif self.path == '/jobs':
+            self._send_json(200, [job.to_dict() for job in list(daemon.jobs.values())])
+        else:
+            match = re.fullmatch(r'/jobs/(\d+)', self.path)
+            if not match:
+                self._send_json(404, {'message': 'Not found'})
+                return
+            try:
+                self._send_json(200, daemon.job(int(match.group(1))).to_dict())
+            except KeyError as e:
+                self._send_json(404, {'message': str(e.args[0])})
+
+    def do_POST(self):
+        daemon = self.daemon
+        try:
+            payload = self._read_json()
+        except (ValueError, UnicodeDecodeError):
+            self._send_json(400, {'message': 'Invalid JSON body'})
+            return
+        try:
+            if self.path == '/jobs':
+                self._send_json(201, daemon.start_job(payload).to_dict())
+                return
+            match = re.fullmatch(r'/jobs/(\d+)/(pause|resume|stop)', self.path)
+            if not match:
+                self._send_json(404, {'message': 'Not found'})
+                return
+            job = getattr(daemon, match.group(2))(int(match.group(1)))
+            self._send_json(200, job.to_dict())
+        except KeyError as e:
+            self._send_json(404, {'message': str(e.args[0])})
+        except JobConflict as e:
+            self._send_json(409, {'message': str(e)})
+        except ValueError as e:
+            self._send_json(400, {'message': str(e)})
+        except RuntimeError as e:
+            self._send_json(503, {'message': str(e)})
+
+class DaemonHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, daemon, verbose=False):
+        super().__init__(address, DaemonHandler)
+        self.daemon = daemon
+        self.verbose = verbose
+
+class DaemonUnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, daemon, verbose=False):
+        if os.path.exists(path):
+            os.unlink(path)  # left behind by a daemon that did not exit cleanly
+        super().__init__(path, DaemonHandler)
+        self.daemon = daemon
+        self.verbose = verbose
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+def serve(args):
+    """Start the warm bot and serve the job API until drained"""
+    print("🛰️  Campaign Daemon")
+    print("=" * 60)
+    if args.fake_vapi:
+        from fake_vapi_server import FakeVAPIConfig, FakeVAPIServer
+        fake_server = FakeVAPIServer(('127.0.0.1', 0), FakeVAPIConfig(answer_rate=1.0, time_scale=0.01))
+        fake_server.start_background()
+        os.environ.update({
+            'VAPI_BASE_URL': fake_server.base_url,
+            'VAPI_API_KEY': os.getenv('VAPI_API_KEY') or 'fake-vapi-key',
+            'VAPI_PHONE_NUMBER_ID': os.getenv('VAPI_PHONE_NUMBER_ID') or 'fake-vapi-number',
+            'VAPI_POLL_INTERVAL': os.getenv('VAPI_POLL_INTERVAL', '0.5'),
+        })
+        print(f"🎭 Using fake VAPI server at {fake_server.base_url}")
+
+    try:
+        from vapi_insurance_bot import VAPIInsuranceBot
+        work_queue = None
+        if not args.no_work_queue:
+            from work_queue import WorkQueue
+            work_queue = WorkQueue()
+            work_queue.start_heartbeat()
+        bot = VAPIInsuranceBot(mock_mode=args.mock, interactive=False, work_queue=work_queue,
+                               writer=ArtifactWriter(fsync=args.fsync))
+        # Load the lazily built state now, so the first job starts warm
+        bot.base_system_prompt()
+        bot.dnc_filter
+        snapshot = None
+        if args.snapshot:
+            snapshot = SnapshotManager(bot.db_path, interval=args.snapshot_interval).start()
+            print(f"📸 Campaign reads from {snapshot.path}, refreshed every {args.snapshot_interval:.0f}s")
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    daemon = CampaignDaemon(bot, drain_timeout=args.drain_timeout, snapshot=snapshot)
+    if args.socket:
+        server = DaemonUnixServer(args.socket, daemon, verbose=args.verbose)
+        print(f"🔌 Listening on unix:{args.socket}")
+    else:
+        server = DaemonHTTPServer((args.host, args.port), daemon, verbose=args.verbose)
+        print(f"🌐 Listening on http://{args.host}:{server.server_address[1]}")
+
+    def on_signal(signum, frame):
+        if daemon.draining:
+            print("⚠️  Second signal - exiting without waiting for calls")
+            os._exit(1)
+        # Drain off the main thread: serve_forever must keep answering /status meanwhile
+        def drain_then_shutdown():
+            daemon.drain()
+            server.shutdown()
+        threading.Thread(target=drain_then_shutdown, name='daemon-drain', daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    print(f"🔥 Warm: system prompt, DNC filter, HTTP sessions; assistant cache holds {bot.assistant_cache_size}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if work_queue is not None:
+            work_queue.close()
+    print("👋 Drained; exiting")
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+def request(method, path, payload=None, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """Call the daemon API; returns (status, parsed JSON)"""
+    if socket_path:
+        conn = _UnixHTTPConnection(socket_path)
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read().decode('utf-8') or 'null')
+    finally:
+        conn.close()
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Resident campaign service with a local job API")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', help="Unix socket path instead of TCP")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_cmd = commands.add_parser('serve', help="Run the daemon")
+    serve_cmd.add_argument('--mock', action='store_true', help="Simulate VAPI calls")
+    serve_cmd.add_argument('--fake-vapi', action='store_true', help="Run the real HTTP path against a local fake VAPI")
+    serve_cmd.add_argument('--no-work-queue', action='store_true',
+                           help="Read the book directly (each job starts from the top)")
+    serve_cmd.add_argument('--fsync', choices=FSYNC_POLICIES, default=DEFAULT_FSYNC)
+    serve_cmd.add_argument('--drain-timeout', type=float, default=DRAIN_TIMEOUT)
+    serve_cmd.add_argument('--snapshot', action='store_true', help="Read the book from a point-in-time snapshot")
+    serve_cmd.add_argument('--snapshot-interval', type=float, default=REFRESH_INTERVAL)
+    serve_cmd.add_argument('--verbose', action='store_true')
+
+    start_cmd = commands.add_parser('start', help="Start a campaign job")
+    start_cmd.add_argument('--lines', type=int)
+    start_cmd.add_argument('--prefetch', type=int)
+    start_cmd.add_argument('--builders', type=int)
+    start_cmd.add_argument('--limit', type=int)
+    start_cmd.add_argument('--pacing', action='store_true')
+    start_cmd.add_argument('--answered-capacity', type=int)
+    for name in ('pause', 'resume', 'stop'):
+        commands.add_parser(name, help=f"{name.capitalize()} a job").add_argument('job', type=int)
+    commands.add_parser('status', help="Daemon status").add_argument('job', type=int, nargs='?')
+    commands.add_parser('jobs', help="List jobs")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+        return
+
+    try:
+        if args.command == 'start':
+            params = {key: getattr(args, key) for key in JOB_PARAMS if getattr(args, key, None) not in (None, False)}
+            status, body = request('POST', '/jobs', params, args.host, args.port, args.socket)
+        elif args.command in ('pause', 'resume', 'stop'):
+            status, body = request('POST', f"/jobs/{args.job}/{args.command}", {}, args.host, args.port, args.socket)
+        elif args.command == 'status' and args.job:
+            status, body = request('GET', f"/jobs/{args.job}", None, args.host, args.port, args.socket)
+        elif args.command == 'status':
+            status, body = request('GET', '/status', None, args.host, args.port, args.socket)
+        else:
+            status, body = request('GET', '/jobs', None, args.host, args.port, args.socket)
+    except OSError as e:
+        print(f"❌ Daemon not reachable: {e}")
+        sys.exit(1)
+    print(json.dumps(body, indent=2, ensure_ascii=False))
+    if status >= 400:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Campaign Pipeline - keep the next customers ready to dial while calls run
+
+run_campaign handles one customer strictly in sequence. The pipeline
+splits that work into stages with bounded queues between them:
+
+    DB reader -> script renderer -> assistant builders -> dialers (one per line)
+
+The reader streams overdue customers in campaign order, folds shared
+numbers into one household and drops do-not-call numbers. The renderer
+writes each calling script. Builders POST the VAPI assistants. Each line
+then takes the next ready customer the moment its previous call ends.
+Every queue holds at most `prefetch` items, so a slow stage blocks the
+ones before it and memory stays bounded however large the book is.
+
+With a pacing_controller.PacingController, `lines` is only the ceiling:
+each dialer takes a slot from the controller before dialing, and the
+controller decides how many of them may be on a call at once.
+
+Usage:
+    python campaign_pipeline.py --mock --lines 4 --limit 20
+    python campaign_pipeline.py --fake-vapi --lines 10 --prefetch 20 --limit 200
+    python campaign_pipeline.py --worker --lines 8   # claim through the shared work queue
+    python campaign_pipeline.py --fake-vapi --pacing --lines 40 --limit 200   # adaptive dial limit
+    python campaign_pipeline.py --mock --snapshot --limit 50   # read the book from a snapshot
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+
+from insurance_data import connect_for_reads, iter_overdue_records
+from profiling import stage, enable_from_argv
+from pacing_controller import PacingController, classify_call
+from artifact_writer import ArtifactWriter, FSYNC_POLICIES, DEFAULT_FSYNC
+from db_snapshot import SnapshotManager, REFRESH_INTERVAL
+
+_DONE = object()  # end-of-stream marker, one per downstream worker
+
+class CampaignPipeline:
+    def __init__(self, bot, lines=4, prefetch=None, builders=2, limit=None, source=None, pacing=None):
+        self.bot = bot
+        self.lines = lines
+        self.prefetch = prefetch or lines * 2
+        self.builders = builders
+        self.limit = limit
+        # Iterable of PolicyRecords in campaign order; default is the bot's queue or the overdue book
+        self.source = source
+        # Optional PacingController; falls back to the bot's so HTTP responses and outcomes feed the same one
+        self.pacing = pacing or getattr(bot, 'pacing', None)
+        self.households = queue.Queue(maxsize=self.prefetch)  # [PolicyRecord, ...]
+        self.scripts = queue.Queue(maxsize=self.prefetch)     # (household, script text, language)
+        self.ready = queue.Queue(maxsize=self.prefetch)       # (household, assistant), ready to dial
+        self.stats = {
+            'households': 0, 'scripts': 0, 'assistants': 0, 'calls': 0, 'completed': 0,
+            'skipped_dnc': 0, 'skipped_paid': 0, 'failed': 0, 'released': 0,
+            'line_idle_seconds': 0.0, 'pacing_wait_seconds': 0.0,
+        }
+        self._stop = threading.Event()
+        self._resumed = threading.Event()  # cleared while paused
+        self._resumed.set()
+        self._lock = threading.Lock()
+        self._running = {}  # stage -> workers still running
+        self._threads = []
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def stop(self):
+        """Stop reading new customers; calls in progress finish, queued customers are released"""
+        self._stop.set()
+        self._resumed.set()  # wake paused dialers so they can release their customers
+
+    def pause(self):
+        """Hold new dials; calls in progress finish and the stages ahead fill up to `prefetch`"""
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+
+    def _records(self):
+        if self.source is not None:
+            return iter(self.source)
+        if self.bot.work_queue is not None or self.bot.campaign_queue is not None:
+            return iter(self.bot.get_overdue_customer, None)
+        return self._book()
+
+    def _book(self):
+        conn = connect_for_reads(self.bot.db_path)
+        try:
+            yield from iter_overdue_records(conn, limit=self.limit)
+        finally:
+            conn.close()
+
+    def _read(self):
+        """DB reader: households in campaign order, each policy at most once"""
+        seen = set()
+        try:
+            for record in self._records():
+                if self._stop.is_set():
+                    self._abandon([record])
+                    break
+                if record.policy_number in seen:
+                    self._abandon([record])  # already covered by an earlier household call
+                    continue
+                with stage("pipeline.read"):
+                    if self.bot.is_do_not_call(record):
+                        if self.bot.dnc_filter.missing:
+                            # Fail closed: nobody is dialed and nobody is marked done
+                            print("❌ No do-not-call list - stopping the pipeline")
+                            self._abandon([record])
+                            self.stop()
+                            break
+                        self._count('skipped_dnc')
+                        self.bot.finish_household([record])
+                        continue
+                    household = self.bot.get_household(record)
+                seen.update(member.policy_number for member in household)
+                self._count('households')
+                self.households.put(household)  # blocks while the renderer is `prefetch` behind
+                if self.limit and self.stats['households'] >= self.limit:
+                    break
+        except Exception as e:
+            print(f"❌ Pipeline reader failed: {e}")
+        finally:
+            self.households.put(_DONE)  # single renderer
+
+    def _render(self, household):
+        with stage("pipeline.render"):
+            language = self.bot.language_for(household[0])
+            script_file, script_content = self.bot.script_generator.create_script(household, language)
+            if not script_file:
+                raise RuntimeError("script generation failed")
+        self._count('scripts')
+        return household, script_content, language
+
+    def _build(self, item):
+        household, script_content, language = item
+        with stage("pipeline.build_assistant"):
+            assistant = self.bot.create_vapi_assistant(household[0], script_content, language)
+        if not assistant:
+            raise RuntimeError("assistant creation failed")
+        self._count('assistants')
+        return household, assistant
+
+    def _dial(self, item):
+        household, assistant = item
+        record = household[0]
+        self._resumed.wait()
+        if self._stop.is_set():
+            self._abandon(household)
+            return None
+        due = self.bot.drop_paid_members(household)
+        if len(due) < len(household):
+            self._count('skipped_paid', len(household) - len(due))
+            if not due:
+                print(f"💰 {record.policy_holder_name} has already paid - skipping call")
+                return None
+            # Members still owing get the call, with a script and assistant addressed to the first of them
+            print(f"💰 {len(household) - len(due)} of {len(household)} policies on {record.phone_number} "
+                  f"already paid - re-preparing the call for {due[0].policy_holder_name}")
+            household, assistant = self._build(self._render(due))
+            record = household[0]
+        if self.pacing is not None:
+            waited = time.perf_counter()
+            self.pacing.acquire()
+            self._count('pacing_wait_seconds', time.perf_counter() - waited)
+        completed = None
+        try:
+            with stage("pipeline.call"):
+                call = self.bot.make_call(assistant['id'], record)
+                if not call:
+                    raise RuntimeError("call could not be placed")
+                self._count('calls')
+                completed = self.bot.monitor_call(call['id'], record.policy_holder_name)
+        finally:
+            if self.pacing is not None:
+                self.pacing.release(classify_call(completed))
+        if completed:
+            transcript_path = self.bot.save_transcript(completed, record.policy_holder_name,
+                                                       assistant.get('latencyProfile'))
+            self.bot.record_call_history(completed, household, transcript_path or None)
+            self._count('completed')
+        self.bot.finish_household(household)
+        return None
+
+    def _abandon(self, household):
+        """Give policies that will not be called back to the shared work queue"""
+        if self.bot.work_queue is None:
+            return
+        for member in household:
+            if member.policy_number in self.bot.work_queue.held:
+                self.bot.work_queue.release(member.policy_number)
+                self._count('released')
+
+    def _worker(self, name, inbox, outbox, handle, consumers):
+        """One stage worker; the last one to finish passes end-of-stream downstream"""
+        while True:
+            started = time.perf_counter()
+            item = inbox.get()
+            if item is _DONE:
+                break
+            household = item if isinstance(item, list) else item[0]
+            if name == 'dial':
+                self._count('line_idle_seconds', time.perf_counter() - started)
+            if self._stop.is_set():
+                self._abandon(household)
+                continue
+            try:
+                result = handle(item)
+            except Exception as e:
+                print(f"❌ {name} failed for {household[0].policy_holder_name}: {e}")
+                self._count('failed')
+                self._abandon(household)
+                continue
+            if outbox is not None and result is not None:
+                outbox.put(result)
+        with self._lock:
+            self._running[name] -= 1
+            last = self._running[name] == 0
+        if last and outbox is not None:
+            for _ in range(consumers):
+                outbox.put(_DONE)
+
+    def run(self):
+        """Run until the source is exhausted (or stop() is called); returns the stats"""
+        stages = [
+            ('render', 1, self.households, self.scripts, self._render, self.builders),
+            ('build', self.builders, self.scripts, self.ready, self._build, self.lines),
+            ('dial', self.lines, self.ready, None, self._dial, 0),
+        ]
+        self._threads = [threading.Thread(target=self._read, name='pipeline-read', daemon=True)]
+        for name, workers, inbox, outbox, handle, consumers in stages:
+            self._running[name] = workers
+            for index in range(workers):
+                self._threads.append(threading.Thread(
+                    target=self._worker, args=(name, inbox, outbox, handle, consumers),
+                    name=f"pipeline-{name}-{index}", daemon=True
+                ))
+        self._started = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+        return self.join()
+
+    def join(self):
+        """Wait for every stage to drain; returns the stats"""
+        for thread in self._threads:
+            thread.join()
+        self.stats['elapsed_seconds'] = round(time.perf_counter() - self._started, 3)
+        self.stats['line_idle_seconds'] = round(self.stats['line_idle_seconds'], 3)
+        self.stats['pacing_wait_seconds'] = round(self.stats['pacing_wait_seconds'], 3)
+        if self.pacing is not None:
+            self.stats['pacing'] = self.pacing.snapshot()
+        if self.bot.writer is not None:
+            self.bot.writer.flush()
+            self.stats['writer'] = self.bot.writer.stats()
+        return self.stats
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Pipelined multi-line calling campaign")
+    parser.add_argument('--lines', type=int, default=4, help="Concurrent calls")
+    parser.add_argument('--prefetch', type=int, help="Customers buffered per stage (default: 2 x lines)")
+    parser.add_argument('--builders', type=int, default=2, help="Concurrent assistant builders")
+    parser.add_argument('--limit', type=int, help="Stop after this many households")
+    parser.add_argument('--mock', action='store_true', help="Simulate VAPI calls")
+    parser.add_argument('--fake-vapi', action='store_true', help="Run the real HTTP path against a local fake VAPI")
+    parser.add_argument('--worker', action='store_true', help="Claim customers through the shared work queue")
+    parser.add_argument('--pacing', action='store_true', help="Adapt the number of concurrent calls (--lines is the ceiling)")
+    parser.add_argument('--initial-lines', type=int, default=4, help="Starting dial limit with --pacing")
+    parser.add_argument('--answered-capacity', type=int, help="Live conversations we can take at once (with --pacing)")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=DEFAULT_FSYNC,
+                        help="Durability of scripts and transcripts written in the background")
+    parser.add_argument('--sync-writes', action='store_true', help="Write scripts and transcripts inline on the call path")
+    parser.add_argument('--snapshot', action='store_true', help="Read the book from a point-in-time snapshot")
+    parser.add_argument('--snapshot-interval', type=float, default=REFRESH_INTERVAL,
+                        help="Seconds between snapshot refreshes (with --snapshot)")
+    parser.add_argument('--profile', action='store_true', help="Write a profile report when the run ends")
+    args = parser.parse_args()
+
+    print("🏭 Campaign Pipeline")
+    print("=" * 60)
+    if args.profile:
+        enable_from_argv('campaign_pipeline', ['--profile'])
+    if args.fake_vapi:
+        from fake_vapi_server import FakeVAPIConfig, FakeVAPIServer
+        fake_server = FakeVAPIServer(('127.0.0.1', 0), FakeVAPIConfig(answer_rate=1.0, time_scale=0.01))
+        fake_server.start_background()
+        os.environ.update({
+            'VAPI_BASE_URL': fake_server.base_url,
+            'VAPI_API_KEY': os.getenv('VAPI_API_KEY') or 'fake-vapi-key',
+            'VAPI_PHONE_NUMBER_ID': os.getenv('VAPI_PHONE_NUMBER_ID') or 'fake-vapi-number',
+            'VAPI_POLL_INTERVAL': os.getenv('VAPI_POLL_INTERVAL', '0.5'),
+        })
+        print(f"🎭 Using fake VAPI server at {fake_server.base_url}")
+
+    try:
+        from vapi_insurance_bot import VAPIInsuranceBot
+        work_queue = None
+        if args.worker:
+            from work_queue import WorkQueue
+            work_queue = WorkQueue()
+            work_queue.start_heartbeat()
+        pacing = None
+        if args.pacing:
+            pacing = PacingController(initial_limit=min(args.initial_lines, args.lines), max_limit=args.lines,
+                                      answered_capacity=args.answered_capacity)
+        writer = None if args.sync_writes else ArtifactWriter(fsync=args.fsync)
+        bot = VAPIInsuranceBot(mock_mode=args.mock, interactive=False, work_queue=work_queue,
+                               pacing=pacing, writer=writer)
+        snapshot = None
+        if args.snapshot:
+            snapshot = SnapshotManager(bot.db_path, interval=args.snapshot_interval).start()
+            print(f"📸 Reading from {snapshot.path} ({snapshot.age_seconds():.0f}s old, "
+                  f"refreshed every {args.snapshot_interval:.0f}s)")
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    pipeline = CampaignPipeline(bot, lines=args.lines, prefetch=args.prefetch,
+                                builders=args.builders, limit=args.limit)
+    print(f"📞 {args.lines} lines, {pipeline.prefetch} customers buffered per stage, {args.builders} assistant builders")
+    try:
+        stats = pipeline.run()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping - letting calls in progress finish")
+        pipeline.stop()
+        stats = pipeline.join()
+    finally:
+        if work_queue is not None:
+            for policy_number in list(work_queue.held):
+                work_queue.release(policy_number)
+            work_queue.close()
+        if bot.writer is not None:
+            bot.writer.close()
+        if snapshot is not None:
+            snapshot.stop()
+    if snapshot is not None:
+        stats['snapshot'] = snapshot.stats()
+
+    print(f"\n📊 {stats['households']} households read, {stats['calls']} calls placed, "
+          f"{stats['completed']} completed in {stats.get('elapsed_seconds', 0):.1f}s")
+    print(f"   Skipped: {stats['skipped_dnc']} do-not-call, {stats['skipped_paid']} policies paid before dialing; "
+          f"{stats['failed']} failed, {stats['released']} released")
+    print(f"   Lines waited {stats['line_idle_seconds']:.1f}s in total for a ready customer")
+    if 'pacing' in stats:
+        pacing = stats['pacing']
+        print(f"🎚️  Dial limit ended at {pacing['limit']} (answer rate {pacing['answer_rate']}); "
+              f"lines waited {stats['pacing_wait_seconds']:.1f}s for a pacing slot")
+    if 'writer' in stats:
+        writer = stats['writer']
+        print(f"🗄️  {writer['files']} files written in {writer['batches']} batches (fsync={writer['fsync']}), "
+              f"write latency p95 {writer['latency_p95_ms']:.1f} ms, max queue {writer['max_queue_depth']}")
+    if 'snapshot' in stats:
+        snapshot = stats['snapshot']
+        print(f"📸 Snapshot {snapshot['age_seconds']:.0f}s old at the end, {snapshot['refreshes']} refreshes, "
+              f"{snapshot['failures']} failures")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Campaign Planner - one call per household instead of one per policy
+
+Groups the overdue book by phone number, keeping campaign order: a
+household is placed at the position of its longest-overdue policy. Each
+group becomes a single call with a combined script, so a shared family
+number never rings several times at once.
+
+Usage:
+    python campaign_planner.py
+    python campaign_planner.py --limit 1000 --write-scripts
+"""
+
+import sys
+import argparse
+
+import insurance_data
+from insurance_data import connect_for_records, iter_overdue_records, normalize_e164
+from dnc_filter import DNCFilter
+
+class HouseholdCall:
+    """All overdue policies reachable on one phone number"""
+    __slots__ = ('phone_number', 'records')
+
+    def __init__(self, phone_number, records=None):
+        self.phone_number = phone_number
+        self.records = records or []
+
+    @property
+    def primary(self):
+        """Longest-overdue policy; the call is addressed to its holder"""
+        return self.records[0]
+
+    @property
+    def policy_numbers(self):
+        return [record.policy_number for record in self.records]
+
+    @property
+    def total_outstanding(self):
+        return sum(record.outstanding_amount for record in self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return f"HouseholdCall({self.phone_number!r}, {len(self.records)} policies)"
+
+def group_by_phone(records):
+    """Group PolicyRecords (already in campaign order) into HouseholdCalls, preserving order"""
+    households = {}
+    for record in records:
+        # Records without a number cannot be merged with anyone
+        key = normalize_e164(record.phone_number) or f"policy:{record.policy_number}"
+        household = households.get(key)
+        if household is None:
+            household = households[key] = HouseholdCall(record.phone_number)
+        household.records.append(record)
+    return list(households.values())
+
+def suppress_dnc(records, dnc, stats=None):
+    """Drop records whose number is on the do-not-call / opt-out list"""
+    for record in records:
+        if dnc.is_blocked(record.phone_number):
+            if stats is not None:
+                stats['suppressed'] = stats.get('suppressed', 0) + 1
+            continue
+        yield record
+
+def plan_campaign(db_path=None, limit=None, dnc=None, stats=None):
+    """Overdue book as a list of HouseholdCalls in campaign order (DNC numbers removed)"""
+    conn = connect_for_records(db_path)
+    try:
+        records = iter_overdue_records(conn, limit=limit)
+        if dnc is not None:
+            records = suppress_dnc(records, dnc, stats)
+        return group_by_phone(records)
+    finally:
+        conn.close()
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Group overdue policies into one call per phone number")
+    parser.add_argument('--db', help="Database path (default: DATABASE_PATH or insurance_db.sqlite)")
+    parser.add_argument('--limit', type=int, help="Only plan the first N overdue policies")
+    parser.add_argument('--show', type=int, default=10, help="Households to list")
+    parser.add_argument('--write-scripts', action='store_true', help="Write a combined script per household")
+    parser.add_argument('--dnc', help="Do-not-call file (default: DNC_FILTER_PATH or dnc/dnc_numbers.dnc)")
+    args = parser.parse_args()
+
+    print("🗺️  Campaign Planner")
+    print("=" * 60)
+    stats = {'suppressed': 0}
+    try:
+        plan = plan_campaign(args.db, args.limit, DNCFilter(args.dnc), stats)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    policies = sum(len(household) for household in plan)
+    shared = [household for household in plan if len(household) > 1]
+    print(f"📋 {policies:,} overdue policies -> {len(plan):,} calls "
+          f"({policies - len(plan):,} saved, {len(shared):,} shared numbers)")
+    if stats['suppressed']:
+        print(f"🚫 {stats['suppressed']:,} policies suppressed by the do-not-call list")
+    for household in plan[:args.show]:
+        names = ", ".join(sorted({record.policy_holder_name for record in household.records}))
+        print(f"   📞 {household.phone_number}: {len(household)} policies, "
+              f"₹{household.total_outstanding:,.0f} outstanding ({names})")
+
+    if args.write_scripts:
+        from customer_script_generator import CustomerScriptGenerator
+        generator = CustomerScriptGenerator(args.db or insurance_data.DB_PATH)
+        for household in plan:
+            generator.create_household_script_file(household.records)
+
+if __name__ == "__main__":
+    main()
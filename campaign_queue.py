@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Campaign Queue - overdue customers kept current through the change feed
+
+Loads the overdue book once, then applies only policy_changelog deltas on
+refresh(): customers who paid (or were deleted) drop out, newly overdue
+ones are added, and changed due dates re-order the queue. No full rescans
+after start-up.
+"""
+
+import heapq
+import threading
+from datetime import date
+
+from insurance_data import (
+    connect_for_records,
+    has_table,
+    require_unsharded,
+    latest_change_seq,
+    fetch_changes_since,
+    iter_overdue_records,
+    is_overdue
+)
+
+class OverdueQueue:
+    def __init__(self, db_path=None, refresh_batch=5000):
+        require_unsharded("The campaign queue")
+        self.db_path = db_path
+        self.refresh_batch = refresh_batch
+        self.last_seq = 0
+        self._records = {}  # policy_number -> (version, PolicyRecord)
+        self._heap = []     # (due_date, version, policy_number); stale versions skipped lazily
+        self._version = 0
+        self._taken = set()  # popped for dialing; later updates don't re-queue them
+        self._lock = threading.Lock()
+        # Shared by worker threads; every use is serialised by self._lock
+        self._conn = connect_for_records(db_path, check_same_thread=False)
+        if not has_table(self._conn, 'policy_changelog'):
+            self._conn.close()
+            raise LookupError("change feed is not set up - run python Data_Insertion/create_database.py --migrate")
+        self.load()
+
+    def load(self):
+        """Full load of the overdue book, pinned to a changelog position"""
+        with self._lock:
+            self._records.clear()
+            heap = []
+            # One read transaction so the loaded rows and the seq agree
+            self._conn.execute("BEGIN")
+            try:
+                self.last_seq = latest_change_seq(self._conn)
+                for record in iter_overdue_records(self._conn):
+                    self._version += 1
+                    self._records[record.policy_number] = (self._version, record)
+                    heap.append((record.premium_due_date or date.min, self._version, record.policy_number))
+            finally:
+                self._conn.execute("COMMIT")
+            heapq.heapify(heap)
+            self._heap = heap
+
+    def _push(self, record):
+        self._version += 1
+        self._records[record.policy_number] = (self._version, record)
+        heapq.heappush(self._heap, (record.premium_due_date or date.min, self._version, record.policy_number))
+
+    def refresh(self):
+        """Apply changelog deltas since the last refresh; returns the number applied"""
+        applied = 0
+        with self._lock:
+            while True:
+                # A full window comes back short when it holds several changes to one
+                # policy, so only an empty page means the cursor has caught up
+                changes = fetch_changes_since(self.last_seq, self.refresh_batch, self._conn)
+                if not changes:
+                    break
+                for seq, policy_number, operation, changed_at, record in changes:
+                    if record is not None and is_overdue(record):
+                        if policy_number not in self._taken:
+                            self._push(record)
+                    else:
+                        self._records.pop(policy_number, None)
+                    self.last_seq = seq
+                    applied += 1
+        return applied
+
+    def pop(self):
+        """Next customer in campaign order (longest overdue first), or None"""
+        with self._lock:
+            while self._heap:
+                _, version, policy_number = heapq.heappop(self._heap)
+                entry = self._records.get(policy_number)
+                if entry and entry[0] == version:
+                    del self._records[policy_number]
+                    self._taken.add(policy_number)
+                    return entry[1]
+            return None
+
+    def peek(self):
+        with self._lock:
+            while self._heap:
+                _, version, policy_number = self._heap[0]
+                entry = self._records.get(policy_number)
+                if entry and entry[0] == version:
+                    return entry[1]
+                heapq.heappop(self._heap)
+            return None
+
+    def requeue(self, record):
+        """Put a popped customer back (e.g. no answer, retry later)"""
+        with self._lock:
+            self._taken.discard(record.policy_number)
+            self._push(record)
+
+    def discard(self, policy_number):
+        """Remove a policy from the queue (e.g. it was just paid); True if it was queued"""
+        with self._lock:
+            return self._records.pop(policy_number, None) is not None
+
+    def __contains__(self, policy_number):
+        return policy_number in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
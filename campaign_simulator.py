@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Campaign Simulator - discrete-event forecast of campaign throughput
+
+A model of VAPIInsuranceBot.run_campaign rather than the bot itself, so a
+day-long campaign over tens of thousands of policies is projected in
+seconds of wall time. Who gets dialed, and in what order, comes from
+campaign_planner.plan_campaign: the bot's overdue order, one call per
+household and do-not-call numbers skipped. What happens on each call
+(script -> assistant -> call -> monitor) is modelled on a virtual clock.
+tests/test_campaign_simulator.py checks the dial order and the policies
+covered against run_campaign; a change to how the bot picks or closes
+customers has to be mirrored here.
+
+Modelled:
+• Line limit (concurrent calls) and the bot's monitor poll interval,
+  which keeps a line held until the next status check after hang-up
+• Answer rate (constant or by hour of day) and busy lines. Like the bot,
+  each household is dialed once: a busy or unanswered call still finishes
+  it (the next campaign run picks it up again)
+• Ring time, talk time and per-customer setup latency distributions
+  (same 'const:' / 'uniform:' / 'lognormal:' / 'exp:' specs as fake_vapi_server.py)
+• Daily calling window
+
+Reported: projected completion time, line utilization and collections
+per hour.
+
+Usage:
+    python campaign_simulator.py --lines 20 --answer-rate 0.45
+    python campaign_simulator.py --db benchmarks/data/policy_book_1000000_20240618.sqlite --limit 50000 --lines 100
+"""
+
+import os
+import json
+import heapq
+import random
+import argparse
+import time as wall_time
+from datetime import datetime, timedelta
+
+from fake_vapi_server import parse_distribution
+from campaign_planner import plan_campaign
+from dnc_filter import DNCFilter
+
+DB_PATH = os.getenv('DATABASE_PATH', 'insurance_db.sqlite')
+
+# Same stop conditions as VAPIInsuranceBot.monitor_call
+MAX_WAIT_SECONDS = 15 * 60
+DEFAULT_POLL_INTERVAL = float(os.getenv('VAPI_POLL_INTERVAL', '10'))
+
+
+class VirtualClock:
+    """Simulated time; usable as VAPIInsuranceBot(clock=...) or as an event loop"""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+        self._events = []
+        self._seq = 0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def schedule(self, at, callback, *args):
+        self._seq += 1
+        heapq.heappush(self._events, (max(at, self.now), self._seq, callback, args))
+
+    def run(self):
+        """Process events in time order until none remain"""
+        while self._events:
+            at, _, callback, args = heapq.heappop(self._events)
+            self.now = at
+            callback(*args)
+
+
+def parse_answer_profile(spec):
+    """'0.45' or '9-12:0.5,12-14:0.3,14-21:0.45' -> function(hour) -> probability"""
+    if ':' not in spec:
+        value = float(spec)
+        return lambda hour: value
+    bands = []
+    for part in spec.split(','):
+        hours, _, rate = part.partition(':')
+        start, _, end = hours.partition('-')
+        bands.append((int(start), int(end), float(rate)))
+    default = sum(rate for _, _, rate in bands) / len(bands)
+
+    def answer_rate(hour):
+        for start, end, rate in bands:
+            if start <= hour < end:
+                return rate
+        return default
+    return answer_rate
+
+
+def load_campaign_customers(db_path, limit=None, dnc=None):
+    """The calls the bot would make, as campaign_planner.HouseholdCalls in dial order
+
+    Like run_campaign, policies sharing a number are one call carrying the
+    household's total outstanding amount, and numbers blocked by the
+    dnc_filter.DNCFilter `dnc` are not dialed.
+    """
+    return plan_campaign(db_path, limit, dnc)
+
+
+class CampaignSimulation:
+    def __init__(self, customers, lines=10, answer_rate='0.45', busy_rate=0.05,
+                 commit_rate=0.35, ring_seconds='uniform:5,25', talk_seconds='lognormal:5.0,0.5',
+                 setup_seconds='lognormal:0.7,0.4', poll_interval=DEFAULT_POLL_INTERVAL,
+                 day_start_hour=9, day_end_hour=21, start=None, seed=42):
+        self.customers = customers
+        self.lines = lines
+        self.answer_rate = parse_answer_profile(str(answer_rate))
+        self.busy_rate = busy_rate
+        self.commit_rate = commit_rate
+        self.ring_seconds = parse_distribution(ring_seconds)
+        self.talk_seconds = parse_distribution(talk_seconds)
+        self.setup_seconds = parse_distribution(setup_seconds)
+        self.poll_interval = poll_interval
+        self.day_start_hour = day_start_hour
+        self.day_end_hour = day_end_hour
+        self.start = start or datetime(2025, 1, 6, day_start_hour)
+        self.rng = random.Random(seed)
+
+        self.clock = VirtualClock()
+        self.free_lines = lines
+        self.ready = []  # heap of (ready_at, customer_index)
+        self.busy_seconds = 0.0
+        self.stats = {'dials': 0, 'answered': 0, 'busy': 0, 'no_answer': 0, 'timeouts': 0,
+                      'collections': 0, 'collected_amount': 0.0}
+        self.last_release = 0.0
+        self._wakeup_at = None
+
+    def _datetime(self, t):
+        return self.start + timedelta(seconds=t)
+
+    def _next_window(self, t):
+        """Earliest time >= t inside the daily calling window"""
+        moment = self._datetime(t)
+        day_open = moment.replace(hour=self.day_start_hour, minute=0, second=0, microsecond=0)
+        day_close = moment.replace(hour=self.day_end_hour, minute=0, second=0, microsecond=0)
+        if moment < day_open:
+            moment = day_open
+        elif moment >= day_close:
+            moment = day_open + timedelta(days=1)
+        return (moment - self.start).total_seconds()
+
+    def _sample(self, sampler):
+        return max(0.0, sampler(self.rng))
+
+    def _has_free_line(self):
+        """Overridden by pacing_controller.PacedCampaignSimulation to apply a dial limit"""
+        return self.free_lines > 0
+
+    def _setup_latency(self, now):
+        return self._sample(self.setup_seconds)
+
+    def _dispatch(self):
+        """Start calls while lines are free and customers are ready"""
+        now = self.clock.time()
+        while self.ready and self._has_free_line():
+            ready_at, index = self.ready[0]
+            start_at = self._next_window(max(now, ready_at))
+            if start_at > now:
+                # Nothing dialable yet; wake up when the next customer is
+                if self._wakeup_at is None or start_at < self._wakeup_at:
+                    self._wakeup_at = start_at
+                    self.clock.schedule(start_at, self._wakeup)
+                return
+            heapq.heappop(self.ready)
+            self.free_lines -= 1
+            self._start_call(index, now)
+
+    def _wakeup(self):
+        if self._wakeup_at is not None and self._wakeup_at <= self.clock.time():
+            self._wakeup_at = None
+        self._dispatch()
+
+    def _start_call(self, index, now):
+        self.stats['dials'] += 1
+        hour = self._datetime(now).hour
+        setup = self._setup_latency(now)
+        ring = self._sample(self.ring_seconds)
+
+        roll = self.rng.random()
+        answer_rate = self.answer_rate(hour)
+        if roll < answer_rate:
+            outcome = 'answered'
+            talk = max(1.0, self._sample(self.talk_seconds))
+        elif roll < answer_rate + self.busy_rate:
+            outcome = 'busy'
+            talk = 0.0
+        else:
+            outcome = 'no_answer'
+            talk = 0.0
+
+        # monitor_call notices the hang-up on its next poll, or gives up at MAX_WAIT_SECONDS
+        in_call = ring + talk
+        if in_call >= MAX_WAIT_SECONDS:
+            outcome = 'timeout'
+            held = MAX_WAIT_SECONDS
+        elif self.poll_interval > 0:
+            held = -(-in_call // self.poll_interval) * self.poll_interval
+        else:
+            held = in_call
+        release_at = now + setup + held
+        self.busy_seconds += release_at - now
+        self.clock.schedule(release_at, self._finish_call, index, outcome)
+
+    def _finish_call(self, index, outcome):
+        now = self.clock.time()
+        self.free_lines += 1
+        self.last_release = max(self.last_release, now)
+
+        if outcome == 'answered':
+            self.stats['answered'] += 1
+            if self.rng.random() < self.commit_rate:
+                self.stats['collections'] += 1
+                self.stats['collected_amount'] += float(self.customers[index].total_outstanding or 0)
+        else:
+            self.stats['timeouts' if outcome == 'timeout' else outcome] += 1
+        self._dispatch()
+
+    def run(self):
+        """Run to completion and return the forecast"""
+        started = wall_time.perf_counter()
+        self.ready = [(0.0, i) for i in range(len(self.customers))]
+        heapq.heapify(self.ready)
+        self.clock.schedule(0.0, self._dispatch)
+        self.clock.run()
+
+        makespan = self.last_release
+        window_hours = self._calling_hours(makespan)
+        return {
+            'customers': len(self.customers),
+            'lines': self.lines,
+            'projected_completion': self._datetime(makespan).isoformat(sep=' ', timespec='minutes'),
+            'elapsed_hours': round(makespan / 3600, 2),
+            'calling_hours': round(window_hours, 2),
+            'line_utilization': round(self.busy_seconds / (self.lines * window_hours * 3600), 4) if window_hours else 0.0,
+            'calls_per_hour': round(self.stats['dials'] / window_hours, 1) if window_hours else 0.0,
+            'collections_per_hour': round(self.stats['collections'] / window_hours, 1) if window_hours else 0.0,
+            'collected_amount_per_hour': round(self.stats['collected_amount'] / window_hours, 2) if window_hours else 0.0,
+            **self.stats,
+            'collected_amount': round(self.stats['collected_amount'], 2),
+            'wall_seconds': round(wall_time.perf_counter() - started, 3),
+        }
+
+    def _calling_hours(self, makespan):
+        """Hours of calling window between campaign start and completion"""
+        end = self._datetime(makespan)
+        day = self.start.replace(hour=0, minute=0, second=0, microsecond=0)
+        total = 0.0
+        while day <= end:
+            window_open = max(self.start, day.replace(hour=self.day_start_hour))
+            window_close = min(end, day.replace(hour=self.day_end_hour))
+            if window_close > window_open:
+                total += (window_close - window_open).total_seconds()
+            day += timedelta(days=1)
+        return total / 3600
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Forecast campaign throughput on a virtual clock")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--limit', type=int, help="Only simulate the first N overdue policies")
+    parser.add_argument('--lines', type=int, default=10, help="Concurrent call limit")
+    parser.add_argument('--dnc', help="Do-not-call file (default: DNC_FILTER_PATH or dnc/dnc_numbers.dnc)")
+    parser.add_argument('--answer-rate', default='0.45', help="Constant or hourly bands, e.g. 9-12:0.5,12-14:0.3,14-21:0.45")
+    parser.add_argument('--busy-rate', type=float, default=0.05)
+    parser.add_argument('--commit-rate', type=float, default=0.35, help="Share of answered calls that commit to pay")
+    parser.add_argument('--ring-seconds', default='uniform:5,25')
+    parser.add_argument('--talk-seconds', default='lognormal:5.0,0.5')
+    parser.add_argument('--setup-seconds', default='lognormal:0.7,0.4', help="Script + assistant + dial request latency")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument('--day-start', type=int, default=9)
+    parser.add_argument('--day-end', type=int, default=21)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help="Print the forecast as JSON")
+    args = parser.parse_args()
+
+    dnc = DNCFilter(args.dnc)
+    if dnc.missing:
+        # The bot would not dial anyone either
+        print("❌ No do-not-call list - build one, or set DNC_ALLOW_MISSING=1 to forecast without it")
+        return
+    customers = load_campaign_customers(args.db, args.limit, dnc)
+    if not customers:
+        print("❌ No overdue customers found!")
+        return
+
+    simulation = CampaignSimulation(
+        customers, lines=args.lines, answer_rate=args.answer_rate, busy_rate=args.busy_rate,
+        commit_rate=args.commit_rate, ring_seconds=args.ring_seconds, talk_seconds=args.talk_seconds,
+        setup_seconds=args.setup_seconds, poll_interval=args.poll_interval,
+        day_start_hour=args.day_start, day_end_hour=args.day_end, seed=args.seed,
+    )
+    forecast = simulation.run()
+
+    if args.json:
+        print(json.dumps(forecast, indent=2))
+        return
+
+    print("🔮 Campaign Forecast")
+    print("=" * 50)
+    print(f"👥 Customers: {forecast['customers']:,}   📞 Lines: {forecast['lines']}")
+    print(f"🏁 Projected completion: {forecast['projected_completion']} "
+          f"({forecast['elapsed_hours']} h elapsed, {forecast['calling_hours']} h of calling)")
+    print(f"📈 Line utilization: {forecast['line_utilization']:.1%}")
+    print(f"☎️  Calls per hour: {forecast['calls_per_hour']:,}")
+    print(f"💰 Collections per hour: {forecast['collections_per_hour']:,} "
+          f"({forecast['collected_amount_per_hour']:,.0f} rupees/hour)")
+    print(f"📊 Dials {forecast['dials']:,} | answered {forecast['answered']:,} | busy {forecast['busy']:,} | "
+          f"no answer {forecast['no_answer']:,} | timeouts {forecast['timeouts']:,}")
+    print(f"⏱️  Simulated in {forecast['wall_seconds']} s of wall time")
+
+
+if __name__ == "__main__":
+    main()
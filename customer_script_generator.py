@@ -1,29 +1,90 @@
 import os
-import json
+import re
+import sqlite3
 from datetime import datetime
 import sys
 
-# Add the current directory to Python path to import our MCP server
+# Add the current directory to Python path to import our data layer
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import the MCP server functions directly
-try:
-    from insurance_mcp_server import (
-        get_longest_overdue_customer as mcp_get_longest_overdue,
-        get_customer_by_policy as mcp_get_customer_by_policy,
-        get_all_overdue_customers as mcp_get_all_overdue
-    )
-    MCP_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Warning: Could not import MCP server functions: {e}")
-    print("📋 Falling back to direct database access...")
-    MCP_AVAILABLE = False
-    import sqlite3
+# Data access shared with the MCP server (no FastMCP start-up cost)
+from insurance_data import (
+    policy_record_factory,
+    fetch_longest_overdue_record,
+    require_unsharded,
+    OVERDUE_FILTER,
+    OVERDUE_ORDER
+)
+from profiling import stage, enable_from_argv
+from artifact_writer import write_file
+from policy_projection import ProjectionCache, CONTINUE_RETURN, EFFECTIVE_CHARGE
+
+# Replaces the "ask first" language rule once the customer's language is known
+LANGUAGE_RULES = {
+    'en': """- This customer chose ENGLISH on an earlier call; the call has already opened in English
+- The first message already greeted the customer and asked for {policy_holder_name}; continue from Branch 1.0 with their answer
+- Speak English only for the ENTIRE call; switch to Hindi only if the customer explicitly asks""",
+    'hi': """- This customer chose HINDI on an earlier call; the call has already opened in Hindi
+- The first message already greeted the customer and asked for {policy_holder_name}; continue from Branch 1.0 with their answer
+- Speak respectful Hindi only for the ENTIRE call; switch to English only if the customer explicitly asks""",
+}
+LANGUAGE_LABELS = {'ENGLISH': 'en', 'HINDI': 'hi'}
+# "[IF HINDI CHOSEN]:" / "COMMON HINDI PHRASES:" open a block that runs to the next blank line
+_LANGUAGE_BLOCK = re.compile(r"^(?:\[IF (ENGLISH|HINDI)(?: CHOSEN)?\]|COMMON (ENGLISH|HINDI) PHRASES):\s*$")
+_LANGUAGE_LINE = re.compile(r"^- (English|Hindi): ")
+
+def single_language_script(template, language):
+    """The calling script for a customer whose language is known
+
+    Drops Branch 0.0 (language selection) and every line meant for the
+    other language, and replaces the "ask first" rule with LANGUAGE_RULES.
+    """
+    lines = []
+    skipping = None  # 'rule', 'branch0' or 'block' while dropping lines
+    keep_block = True
+    for line in template.split('\n'):
+        stripped = line.strip()
+        if skipping == 'rule':
+            if stripped:
+                continue
+            skipping = None
+        elif skipping == 'branch0':
+            if not stripped.startswith('Branch 1.0'):
+                continue
+            skipping = None
+        elif skipping == 'block':
+            if stripped:
+                if keep_block:
+                    lines.append(line)
+                continue
+            skipping = None
+            if not keep_block:
+                continue  # the blank line after a dropped block
+        
+        if stripped == 'CRITICAL LANGUAGE RULE:':
+            lines.extend([line, LANGUAGE_RULES[language]])
+            skipping = 'rule'
+            continue
+        if stripped.startswith('Branch 0.0'):
+            skipping = 'branch0'
+            continue
+        match = _LANGUAGE_BLOCK.match(stripped)
+        if match:
+            keep_block = LANGUAGE_LABELS[match.group(1) or match.group(2)] == language
+            skipping = 'block'
+            if keep_block and match.group(2):
+                lines.append(line)  # keep the phrase list heading, drop the [IF ...] markers
+            continue
+        match = _LANGUAGE_LINE.match(stripped)
+        if match and LANGUAGE_LABELS[match.group(1).upper()] != language:
+            continue
+        lines.append(line.replace(' (IN CHOSEN LANGUAGE)', '').replace('=== BILINGUAL QUICK PHRASES ===', '=== QUICK PHRASES ==='))
+    return '\n'.join(lines)
 
 class CustomerScriptGenerator:
     def __init__(self, db_path="insurance_db.sqlite"):
+        require_unsharded("The script generator")
         self.db_path = db_path
-        self.use_mcp = MCP_AVAILABLE
         
         # Calling Script Template from PDF
         self.calling_script = """
@@ -102,6 +163,11 @@ Policy Details:
 - Premium paid till date: {total_premium_paid}
 - Loyalty Benefits: {loyalty_benefits}
 - Policy Status: {status}
+- Projected Maturity Value in {maturity_year} (if premiums continue): {projected_maturity_value}
+- Value if the policy stays discontinued: {discontinued_value}
+- Premiums still to pay until maturity: {premiums_to_pay}
+- Projected Loyalty Additions until maturity: {projected_loyalty_additions}
+- Projections assume {projection_basis}; quote them as estimates, never as guaranteed amounts
 
 REBUTTALS FOR COMMON OBJECTIONS:
 
@@ -115,7 +181,8 @@ REBUTTALS FOR COMMON OBJECTIONS:
    - Your money will be invested in low yield Discontinued Life Fund, with a 5 year annualised return of 4.30%
    - You lose life cover of {sum_assured}
    - Continue paying premiums to continue insurance cover of {sum_assured}
-   - Loyalty additions of {loyalty_benefits} over policy term
+   - Projected loyalty additions of {projected_loyalty_additions} until maturity in {maturity_year}
+   - If the policy stays discontinued you would get about {discontinued_value}, against a projected {projected_maturity_value} at maturity
 
 3. Immediate/Emergency Financial Needs/Medical emergency:
    - Specific due dates by which premium needs to be paid, and on your not paying premium, life insurance worth {sum_assured} has been reduced to NIL
@@ -127,7 +194,7 @@ REBUTTALS FOR COMMON OBJECTIONS:
    - Compare future effective charges vs. alternative financial plans
    - Most mutual funds have effective charge of 2% due to expense ratios AND do not provide life insurance cover
    - In your policy, effective charges reduce and returns get closer to actual fund return
-   - Loyalty additions of {loyalty_benefits} over policy term - not available in mutual funds
+   - Projected loyalty additions of {projected_loyalty_additions} over the remaining policy term - not available in mutual funds
 
 5. Low/unsatisfactory returns in policy:
    - In your policy, the effective charges reduce sharply post the lock-in period
@@ -155,7 +222,7 @@ Branch 8.0 - Final Rebuttals:
 - You can opt for Partial Withdrawal option after completing 5 years of the policy
 - If premiums stop before lock-in period ends, policy will discontinue and growth will be limited to 4-4.5% returns
 - You will lose your sum assured value of {sum_assured}
-- At maturity you will receive {fund_value}
+- If you continue paying, your projected maturity value in {maturity_year} is {projected_maturity_value}; if the policy stays discontinued you would get about {discontinued_value}
 - Would you be willing to pay your premium of {outstanding_amount} now?
 
 Branch 9.0 - Conversation Closure:
@@ -194,6 +261,76 @@ Loyalty Benefits: {loyalty_benefits}
 === END OF SCRIPT ===
 """
 
+        # Appended when several overdue policies share one phone number, so
+        # the household gets one call instead of one per policy; one per
+        # language so a single-language script stays in that language
+        household_english = """
+=== HOUSEHOLD POLICIES ON THIS NUMBER ===
+Phone Number: {phone_number}
+Policies Due: {policy_count}
+Total Outstanding: {total_outstanding}
+
+{policy_lines}
+
+=== AI INSTRUCTIONS FOR HOUSEHOLD CALL ===
+- This one call covers every policy listed above; do NOT promise a separate call for the others
+- Complete the conversation about {policy_holder_name}'s policy {policy_number} first, using the script above
+- Then ask whether the other policy holders ({other_holders}) are available, or whether {policy_holder_name} handles their premiums
+- For each remaining policy, state the policy number, product, outstanding amount and due date, and ask for a payment commitment
+- If a policy holder is not available, ask for a convenient time to reach them and note it against their policy number
+- Mention the total outstanding of {total_outstanding} only when summarising at the end
+{language_note}
+=== END OF HOUSEHOLD SECTION ===
+"""
+        self.household_scripts = {
+            None: household_english.replace("{language_note}", """- If the call is in Hindi, ask: "क्या {other_holders} जी से बात हो सकती है, या उनके प्रीमियम भी आप ही भरते हैं?"
+"""),
+            'en': household_english.replace("{language_note}", ""),
+            'hi': """
+=== इस नंबर पर परिवार की पॉलिसियां ===
+फ़ोन नंबर: {phone_number}
+बकाया पॉलिसियां: {policy_count}
+कुल बकाया राशि: {total_outstanding}
+
+{policy_lines}
+
+=== परिवार कॉल के लिए AI निर्देश ===
+- यह एक ही कॉल ऊपर दी गई सभी पॉलिसियों के लिए है; बाकी पॉलिसियों के लिए अलग कॉल का वादा न करें
+- पहले ऊपर की स्क्रिप्ट के अनुसार {policy_holder_name} जी की पॉलिसी {policy_number} पर बात पूरी करें
+- फिर पूछें: "क्या {other_holders} जी से बात हो सकती है, या उनके प्रीमियम भी आप ही भरते हैं?"
+- बाकी हर पॉलिसी के लिए पॉलिसी नंबर, प्रोडक्ट, बकाया राशि और ड्यू डेट बताएं, और भुगतान की तारीख पक्की करें
+- अगर पॉलिसीधारक उपलब्ध नहीं हैं, तो उनसे बात करने का सही समय पूछें और उसे उनके पॉलिसी नंबर के साथ नोट करें
+- कुल बकाया {total_outstanding} का ज़िक्र केवल अंत में सारांश देते समय करें
+
+=== परिवार सेक्शन समाप्त ===
+""",
+        }
+        self.household_policy_lines = {
+            None: "{number}. {name} - Policy {policy_number} ({product})\n"
+                  "   Outstanding: {outstanding}\n"
+                  "   Due Date: {due_date}   Status: {status}\n"
+                  "   Sum Assured: {sum_assured}   Fund Value: {fund_value}",
+            'hi': "{number}. {name} जी - पॉलिसी {policy_number} ({product})\n"
+                  "   बकाया: {outstanding}\n"
+                  "   ड्यू डेट: {due_date}   स्थिति: {status}\n"
+                  "   बीमा राशि: {sum_assured}   फंड वैल्यू: {fund_value}",
+        }
+        self._language_scripts = {}  # language -> single_language_script(calling_script)
+        self._folder_ready = False
+        # Optional artifact_writer.ArtifactWriter; scripts are written inline without one
+        self.writer = None
+        # Continue vs discontinue figures per policy (policy_projection.py)
+        self.projections = ProjectionCache(db_path)
+
+    def script_template(self, language=None):
+        """Calling script template: bilingual, or single-language when the customer's language is known"""
+        if language is None:
+            return self.calling_script
+        template = self._language_scripts.get(language)
+        if template is None:
+            template = self._language_scripts[language] = single_language_script(self.calling_script, language)
+        return template
+
     def connect_to_db(self):
         """Connect to SQLite database (fallback method)"""
         try:
@@ -202,6 +339,7 @@ Loyalty Benefits: {loyalty_benefits}
                 return None
             
             conn = sqlite3.connect(self.db_path)
+            conn.row_factory = policy_record_factory
             return conn
         except Exception as e:
             print(f"❌ Error connecting to database: {e}")
@@ -209,36 +347,24 @@ Loyalty Benefits: {loyalty_benefits}
 
     def get_longest_overdue_customer(self):
         """Get customer with longest overdue premium"""
-        if self.use_mcp and MCP_AVAILABLE:
-            return self._get_longest_overdue_mcp()
-        else:
-            return self._get_longest_overdue_direct()
+        return self._get_longest_overdue_shared()
     
-    def _get_longest_overdue_mcp(self):
-        """Get customer using MCP server function"""
+    def _get_longest_overdue_shared(self):
+        """Get customer using the shared data layer (insurance_data.py)"""
         try:
-            print("🔧 Using MCP server for data retrieval...")
-            result = mcp_get_longest_overdue()
+            print("🔧 Using the shared data layer for data retrieval...")
+            with stage("db.longest_overdue"):
+                record = fetch_longest_overdue_record()
             
-            if result:
-                response_data = json.loads(result)
-                
-                if "error" in response_data:
-                    print(f"❌ {response_data['error']}")
-                    return None
-                
-                customer_data = response_data
-                print(f"✅ Found longest overdue customer: {customer_data['policy_holder_name']}")
-                print(f"📅 Due date: {customer_data['premium_due_date']}")
-                print(f"💰 Outstanding: {float(customer_data['outstanding_amount']):,.2f}")
-                
-                return customer_data
+            if record:
+                self._print_found(record)
+                return record
             else:
-                print("❌ No response from MCP server!")
+                print("❌ No overdue customers found!")
                 return None
                 
         except Exception as e:
-            print(f"❌ Error calling MCP server: {e}")
+            print(f"❌ Error reading from the data layer: {e}")
             print("📋 Falling back to direct database access...")
             return self._get_longest_overdue_direct()
     
@@ -250,30 +376,22 @@ Loyalty Benefits: {loyalty_benefits}
         
         try:
             print("🔧 Using direct database access...")
-            cursor = conn.cursor()
             
             # Get customer with longest overdue date (earliest due date)
-            query = """
+            query = f"""
                 SELECT * FROM policy_info
-                WHERE status = 'Discontinuance' OR status = 'overdue' OR outstanding_amount > 0
-                ORDER BY date(premium_due_date) ASC 
+                WHERE {OVERDUE_FILTER}
+                ORDER BY {OVERDUE_ORDER}
                 LIMIT 1
             """
             
-            cursor.execute(query)
-            result = cursor.fetchone()
+            # The row factory builds a PolicyRecord directly
+            with stage("db.longest_overdue"):
+                record = conn.execute(query).fetchone()
             
-            if result:
-                # Get column names
-                column_names = [description[0] for description in cursor.description]
-                # Convert to dictionary
-                customer_data = dict(zip(column_names, result))
-                
-                print(f"✅ Found longest overdue customer: {customer_data['policy_holder_name']}")
-                print(f"📅 Due date: {customer_data['premium_due_date']}")
-                print(f"💰 Outstanding: {customer_data['outstanding_amount']:,.2f}")
-                
-                return customer_data
+            if record:
+                self._print_found(record)
+                return record
             else:
                 print("❌ No overdue customers found!")
                 return None
@@ -284,6 +402,11 @@ Loyalty Benefits: {loyalty_benefits}
         finally:
             conn.close()
 
+    def _print_found(self, record):
+        print(f"✅ Found longest overdue customer: {record.policy_holder_name}")
+        print(f"📅 Due date: {record.premium_due_date}")
+        print(f"💰 Outstanding: {record.outstanding_amount:,.2f}")
+
     def format_currency(self, amount):
         """Format currency as plain number without commas or symbols"""
         if amount is None:
@@ -355,77 +478,126 @@ Loyalty Benefits: {loyalty_benefits}
         except:
             return f"{amount} rupees"
 
-    def create_customer_script_file(self, customer_data):
-        """Create personalized script file for customer"""
-        try:
-            # Create customer_details_script folder if it doesn't exist
-            folder_name = "customer_details_script"
+    def format_amount(self, amount):
+        """Amount in words followed by the numerical value in brackets"""
+        return f"{self.number_to_words(amount)} ({self.format_currency(amount)})"
+
+    def format_record(self, record):
+        """Placeholder values for the calling script template"""
+        projection = self.projections.get(record)
+        return {
+            'policy_holder_name': record.policy_holder_name,
+            'policy_number': record.policy_number,
+            'product_name': record.product_name,
+            'policy_start_date': record.policy_start_date or 'N/A',
+            'premium_due_date': record.premium_due_date or 'N/A',
+            'outstanding_amount': self.format_amount(record.outstanding_amount),
+            'total_premium_paid': self.format_amount(record.total_premium_paid),
+            'sum_assured': self.format_amount(record.sum_assured),
+            'fund_value': self.format_amount(record.fund_value),
+            'status': record.status,
+            'loyalty_benefits': self.format_amount(record.loyalty_benefits),
+            'projected_maturity_value': self.format_amount(projection['projected_maturity_value']),
+            'discontinued_value': self.format_amount(projection['discontinued_value']),
+            'premiums_to_pay': self.format_amount(projection['premiums_to_pay']),
+            'projected_loyalty_additions': self.format_amount(projection['loyalty_additions']),
+            'maturity_year': projection['maturity_year'],
+            'projection_basis': f"{CONTINUE_RETURN:.2%} a year fund growth less {EFFECTIVE_CHARGE:.2%} charges"
+        }
+
+    def _script_folder(self):
+        # Create customer_details_script folder if it doesn't exist (checked once per generator)
+        folder_name = "customer_details_script"
+        if not self._folder_ready:
             if not os.path.exists(folder_name):
                 os.makedirs(folder_name)
                 print(f"📁 Created folder: {folder_name}")
-            
-            # Format the data for placeholders with both numerical and word formats
-            outstanding_amt = customer_data.get('outstanding_amount', 0)
-            total_paid = customer_data.get('total_premium_paid', 0)
-            sum_assured_amt = customer_data.get('sum_assured', 0)
-            fund_value_amt = customer_data.get('fund_value', 0)
-            loyalty_amt = customer_data.get('loyalty_benefits', 0)
-            
-            formatted_data = {
-                'policy_holder_name': customer_data.get('policy_holder_name', 'Customer'),
-                'policy_number': customer_data.get('policy_number', 'N/A'),
-                'product_name': customer_data.get('product_name', 'Insurance Policy'),
-                'policy_start_date': customer_data.get('policy_start_date', 'N/A'),
-                'premium_due_date': customer_data.get('premium_due_date', 'N/A'),
-                'outstanding_amount': f"{self.number_to_words(outstanding_amt)} ({self.format_currency(outstanding_amt)})",
-                'total_premium_paid': f"{self.number_to_words(total_paid)} ({self.format_currency(total_paid)})",
-                'sum_assured': f"{self.number_to_words(sum_assured_amt)} ({self.format_currency(sum_assured_amt)})",
-                'fund_value': f"{self.number_to_words(fund_value_amt)} ({self.format_currency(fund_value_amt)})",
-                'status': customer_data.get('status', 'Discontinuance'),
-                'loyalty_benefits': f"{self.number_to_words(loyalty_amt)} ({self.format_currency(loyalty_amt)})"
-            }
-            
-            # Fill in the placeholders
-            personalized_script = self.calling_script.format(**formatted_data)
-            
-            # Create filename with customer name
-            customer_name = customer_data.get('policy_holder_name', 'Customer').replace(' ', '_')
-            filename = f"{customer_name}_calling_script.txt"
-            
-            # Full path including the folder
-            full_path = os.path.join(folder_name, filename)
-            
-            # Write to file
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(personalized_script)
-            
-            print(f"✅ Script file created: {full_path}")
-            return full_path
-            
+            self._folder_ready = True
+        return folder_name
+
+    def render_customer_script(self, record, language=None):
+        """Calling script text for one PolicyRecord"""
+        with stage("template.format"):
+            return self.script_template(language).format(**self.format_record(record))
+
+    def render_household_script(self, records, language=None):
+        """One combined calling script for all overdue PolicyRecords sharing a phone number"""
+        if len(records) == 1:
+            return self.render_customer_script(records[0], language)
+        primary = records[0]
+        
+        line_template = self.household_policy_lines.get(language, self.household_policy_lines[None])
+        policy_lines = []
+        for number, record in enumerate(records, 1):
+            policy_lines.append(line_template.format(
+                number=number, name=record.policy_holder_name, policy_number=record.policy_number,
+                product=record.product_name, outstanding=self.format_amount(record.outstanding_amount),
+                due_date=record.premium_due_date or 'N/A', status=record.status,
+                sum_assured=self.format_amount(record.sum_assured), fund_value=self.format_amount(record.fund_value)
+            ))
+        others = sorted({r.policy_holder_name for r in records[1:]} - {primary.policy_holder_name})
+        
+        return self.render_customer_script(primary, language) + self.household_scripts[language].format(
+            phone_number=primary.phone_number,
+            policy_count=len(records),
+            total_outstanding=self.format_amount(sum(r.outstanding_amount for r in records)),
+            policy_lines="\n\n".join(policy_lines),
+            policy_holder_name=primary.policy_holder_name,
+            policy_number=primary.policy_number,
+            other_holders=", ".join(others) or primary.policy_holder_name
+        )
+
+    def create_script(self, records, language=None):
+        """Render and save the script for a customer or household; returns (path, script text)
+
+        With self.writer set, the file is queued on the ArtifactWriter and
+        the caller uses the returned text instead of reading the file back.
+        Returns (None, None) on failure.
+        """
+        try:
+            script = self.render_household_script(records, language)
+            customer_name = records[0].policy_holder_name.replace(' ', '_')
+            suffix = "_household_calling_script.txt" if len(records) > 1 else "_calling_script.txt"
+            full_path = os.path.join(self._script_folder(), customer_name + suffix)
+            with stage("script.write"):
+                write_file(full_path, script, self.writer)
+            if len(records) > 1:
+                print(f"✅ Household script file created: {full_path} ({len(records)} policies)")
+            else:
+                print(f"✅ Script file created: {full_path}")
+            return full_path, script
         except Exception as e:
             print(f"❌ Error creating script file: {e}")
-            return None
+            return None, None
+
+    def create_customer_script_file(self, record, language=None):
+        """Create personalized script file for a PolicyRecord (language: 'en' / 'hi' if already known)"""
+        return self.create_script([record], language)[0]
+
+    def create_household_script_file(self, records, language=None):
+        """Create one combined script for all overdue PolicyRecords sharing a phone number"""
+        return self.create_script(records, language)[0]
 
     def generate_script_for_overdue_customer(self):
         """Main method to generate script for longest overdue customer"""
         print("🔍 Searching for longest overdue customer...")
         
         # Get customer data
-        customer_data = self.get_longest_overdue_customer()
-        if not customer_data:
+        record = self.get_longest_overdue_customer()
+        if not record:
             return None
         
         print("\n📋 Customer Details:")
-        print(f"   Name: {customer_data.get('policy_holder_name')}")
-        print(f"   Policy: {customer_data.get('policy_number')}")
-        print(f"   Product: {customer_data.get('product_name')}")
-        print(f"   Due Date: {customer_data.get('premium_due_date')}")
-        print(f"   Outstanding: {float(customer_data.get('outstanding_amount', 0)):,.2f}")
-        print(f"   Status: {customer_data.get('status')}")
+        print(f"   Name: {record.policy_holder_name}")
+        print(f"   Policy: {record.policy_number}")
+        print(f"   Product: {record.product_name}")
+        print(f"   Due Date: {record.premium_due_date}")
+        print(f"   Outstanding: {record.outstanding_amount:,.2f}")
+        print(f"   Status: {record.status}")
         
         # Create script file
         print("\n📝 Creating personalized calling script...")
-        filename = self.create_customer_script_file(customer_data)
+        filename = self.create_customer_script_file(record)
         
         if filename:
             print(f"\n🎉 Successfully created: {filename}")
@@ -441,13 +613,13 @@ Loyalty Benefits: {loyalty_benefits}
 
 def main():
     """Main function"""
-    print("🚀 Customer Script Generator with MCP Server")
+    print("🚀 Customer Script Generator")
     print("=" * 50)
     
-    if MCP_AVAILABLE:
-        print("✅ MCP Server integration available")
-    else:
-        print("⚠️ MCP Server not available, using direct database access")
+    # --profile: CPU, memory and stage report in profiles/ when the run ends
+    enable_from_argv('customer_script_generator')
+    
+    print("✅ Using the data layer shared with the MCP server (insurance_data.py)")
     
     print()
     
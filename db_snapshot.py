@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+DB Snapshot - point-in-time copy of the book for campaign reads
+
+Payment ingestion and bulk loads take write locks on insurance_db.sqlite.
+Campaign reads then have to wait on them: the overdue scan, household
+lookups, MCP queries and script data. In snapshot mode those reads go
+to a separate copy that no writer touches, so they never wait for a
+lock.
+
+How it works:
+- Each copy is taken with SQLite's online backup API into a temporary
+  file, so it is consistent even while writers are busy.
+- It is switched to rollback-journal mode, which lets readers open it
+  read-only. The phone index is added, and the time of the copy is
+  stamped in snapshot_meta.
+- The file is renamed over the previous snapshot. Connections already
+  open finish on the copy they started with; new ones get the fresh one.
+- SnapshotManager refreshes on a schedule and reports the snapshot's
+  age, so a stalled refresher is visible.
+
+Some things always use the live database:
+- the payment re-check right before dialing;
+- work-queue claims;
+- call history and language preferences.
+
+Usage:
+    python db_snapshot.py create
+    python db_snapshot.py watch --interval 300          # refresher for other processes
+    python db_snapshot.py age --json
+    DATABASE_SNAPSHOT=insurance_db.snapshot.sqlite python insurance_mcp_server.py
+    python campaign_pipeline.py --mock --snapshot --snapshot-interval 120
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import sqlite3
+import pathlib
+import argparse
+import threading
+
+import insurance_data
+from insurance_data import ensure_phone_index
+
+SNAPSHOT_PATH = os.getenv('DATABASE_SNAPSHOT') or 'insurance_db.snapshot.sqlite'
+REFRESH_INTERVAL = float(os.getenv('DATABASE_SNAPSHOT_INTERVAL', '300'))
+
+SNAPSHOT_META_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshot_meta (
+        taken_at REAL NOT NULL,
+        source TEXT NOT NULL,
+        copy_seconds REAL NOT NULL
+    );
+"""
+
+def create_snapshot(source=None, dest=SNAPSHOT_PATH, pages=-1, step_pause=0.0):
+    """Copy source to dest through the backup API and swap it in atomically
+
+    pages=-1 copies in one step under a single read lock. A positive value
+    copies in steps, releasing the lock between them. SQLite restarts the
+    copy if another connection writes mid-way, so steps suit a quiet
+    database with a very large file. Returns the snapshot's metadata.
+    """
+    source = source or insurance_data.DB_PATH
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Database file '{source}' not found!")
+    tmp_path = f"{dest}.tmp"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)  # left by a refresh that died half-way
+
+    started = time.perf_counter()
+    src = sqlite3.connect(source, timeout=60)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        taken_at = time.time()
+        src.backup(dst, pages=pages, sleep=step_pause)
+        copy_seconds = time.perf_counter() - started
+        # A WAL-mode source copies its WAL flag; read-only openers need the rollback journal
+        dst.execute("PRAGMA journal_mode=DELETE")
+        ensure_phone_index(dst)
+        dst.executescript(SNAPSHOT_META_SCHEMA)
+        with dst:
+            dst.execute("DELETE FROM snapshot_meta")
+            dst.execute("INSERT INTO snapshot_meta (taken_at, source, copy_seconds) VALUES (?, ?, ?)",
+                        (taken_at, os.path.abspath(source), copy_seconds))
+    except BaseException:
+        dst.close()
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    finally:
+        src.close()
+    dst.close()
+
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, dest)
+    return {'path': dest, 'taken_at': taken_at, 'copy_seconds': round(copy_seconds, 4),
+            'total_seconds': round(time.perf_counter() - started, 4), 'bytes': os.path.getsize(dest)}
+
+def snapshot_taken_at(path=SNAPSHOT_PATH):
+    """Time the snapshot was taken (epoch seconds), or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT taken_at FROM snapshot_meta").fetchone()
+        finally:
+            conn.close()
+        if row:
+            return row[0]
+    except sqlite3.Error:
+        pass
+    return os.path.getmtime(path)
+
+def snapshot_age(path=SNAPSHOT_PATH):
+    """Seconds since the snapshot was taken, or None"""
+    taken_at = snapshot_taken_at(path)
+    return None if taken_at is None else max(0.0, time.time() - taken_at)
+
+class SnapshotManager:
+    def __init__(self, source=None, path=SNAPSHOT_PATH, interval=REFRESH_INTERVAL, max_age=None):
+        self.source = source or insurance_data.DB_PATH
+        self.path = path
+        self.interval = interval
+        # Past max_age, reads fall back to the live database (default: three missed refreshes)
+        self.max_age = max_age if max_age is not None else interval * 3
+        self.refreshes = 0
+        self.failures = 0
+        self.last = None  # metadata of the latest snapshot
+        self.last_error = None
+        self._taken_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Take a new snapshot now; returns its metadata (raises on failure)"""
+        with self._lock:
+            try:
+                meta = create_snapshot(self.source, self.path)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                raise
+            self.refreshes += 1
+            self.last = meta
+            self._taken_at = meta['taken_at']
+            self.last_error = None
+            return meta
+
+    def start(self):
+        """Route campaign reads to the snapshot and keep it fresh in the background"""
+        age = snapshot_age(self.path)
+        if age is None or age >= self.interval:
+            self.refresh()
+        else:
+            self._taken_at = snapshot_taken_at(self.path)
+        insurance_data.use_snapshot(self.path, max_age=self.max_age)
+        self._thread = threading.Thread(target=self._loop, name='db-snapshot', daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(max(0.0, self.interval - (self.age_seconds() or 0.0))):
+            try:
+                meta = self.refresh()
+                print(f"📸 Snapshot refreshed in {meta['total_seconds']:.2f}s ({meta['bytes'] / 1024 / 1024:.1f} MB)")
+            except Exception as e:
+                print(f"⚠️  Snapshot refresh failed: {e}")
+                self._stop.wait(min(self.interval, 30))
+
+    def stop(self, use_live=True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if use_live:
+            insurance_data.use_snapshot(None)
+
+    def age_seconds(self):
+        if self._taken_at is None:
+            return None
+        return max(0.0, time.time() - self._taken_at)
+
+    def stats(self):
+        age = self.age_seconds()
+        return {
+            'path': self.path,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'interval_seconds': self.interval,
+            'max_age_seconds': self.max_age,
+            'stale': age is None or age > self.max_age,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_copy_seconds': self.last['copy_seconds'] if self.last else None,
+            'bytes': self.last['bytes'] if self.last else None,
+            'last_error': self.last_error,
+        }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Point-in-time snapshots of the insurance database")
+    parser.add_argument('--db', default=None, help="Live database (default: DATABASE_PATH)")
+    parser.add_argument('--path', default=SNAPSHOT_PATH, help="Snapshot file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help="Take one snapshot now")
+    create.add_argument('--pages', type=int, default=-1, help="Pages per backup step (-1: all at once)")
+    watch = commands.add_parser('watch', help="Refresh on a schedule until interrupted")
+    watch.add_argument('--interval', type=float, default=REFRESH_INTERVAL)
+    age = commands.add_parser('age', help="Report snapshot age")
+    age.add_argument('--json', action='store_true')
+    age.add_argument('--max-age', type=float, help="Exit 1 if older than this many seconds")
+    args = parser.parse_args()
+
+    if args.command == 'age':
+        taken_at = snapshot_taken_at(args.path)
+        seconds = None if taken_at is None else round(max(0.0, time.time() - taken_at), 1)
+        if args.json:
+            print(json.dumps({'path': args.path, 'taken_at': taken_at, 'age_seconds': seconds}))
+        elif seconds is None:
+            print(f"❌ No snapshot at {args.path}")
+        else:
+            print(f"📸 {args.path} is {seconds:.1f}s old")
+        if seconds is None or (args.max_age is not None and seconds > args.max_age):
+            sys.exit(1)
+        return
+
+    print("📸 DB Snapshot")
+    print("=" * 60)
+    try:
+        if args.command == 'create':
+            meta = create_snapshot(args.db, args.path, pages=args.pages)
+            print(f"✅ {meta['path']}: {meta['bytes'] / 1024 / 1024:.1f} MB, "
+                  f"copied in {meta['copy_seconds']:.3f}s ({meta['total_seconds']:.3f}s total)")
+            return
+        manager = SnapshotManager(args.db, args.path, interval=args.interval)
+        signal.signal(signal.SIGTERM, lambda signum, frame: manager._stop.set())
+        manager.start()
+        print(f"🔁 Refreshing {args.path} every {args.interval:.0f}s (Ctrl+C to stop)")
+        try:
+            while not manager._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        manager.stop()
+        print(f"🛑 Stopped after {manager.refreshes} refreshes")
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
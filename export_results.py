@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Export Results - columnar export of the book, call outcomes and transcripts
+
+Streams three datasets into a Hive-partitioned folder tree that pandas,
+DuckDB, Spark or pyarrow.dataset read directly:
+
+    policies/status=<status>/part-00000.parquet       policy_info
+    calls/call_month=<YYYY-MM>/part-00000.parquet     call_history
+    transcripts/call_month=<YYYY-MM>/part-00000.parquet
+                    header fields, turn counts and language parsed from
+                    Customer_transcripts/*.txt and the transcript archive
+
+Rows are read chunk_rows at a time and each chunk is written out before
+the next is read, so memory stays flat however large the book is. Files
+roll over at max_file_rows. Parquet needs pyarrow. Without it, or with
+--format csv, the same layout is written as CSV. Everything is written
+into <name>.partial and renamed once complete, so a reader never picks
+up half an export. _manifest.json records row counts, files and column
+types.
+
+The book is read through connect_for_reads, so with DATABASE_SNAPSHOT set
+the export is a consistent point-in-time copy.
+
+Usage:
+    python export_results.py
+    python export_results.py --datasets policies,calls --chunk-rows 100000
+    python export_results.py --format csv --out /tmp/exports
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+from datetime import date, datetime, timezone
+from urllib.parse import quote
+
+# pyarrow is optional; CSV (stdlib) is the fallback format
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from insurance_data import connect_for_reads, detect_call_language, _parse_date
+
+EXPORT_FOLDER = "exports"
+TRANSCRIPT_FOLDER = "Customer_transcripts"
+CHUNK_ROWS = 50000
+MAX_FILE_ROWS = 1000000
+HIVE_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Column kinds: text, int, real, date (ISO date), timestamp (ISO date-time, UTC)
+DATASETS = {
+    'policies': {
+        'partition': 'status',
+        'query': "SELECT id, policy_holder_name, policy_number, product_name, policy_start_date, "
+                 "premium_due_date, outstanding_amount, total_premium_paid, sum_assured, fund_value, "
+                 "loyalty_benefits, phone_number, status FROM policy_info",
+        'columns': (('id', 'int'), ('policy_holder_name', 'text'), ('policy_number', 'text'),
+                    ('product_name', 'text'), ('policy_start_date', 'date'), ('premium_due_date', 'date'),
+                    ('outstanding_amount', 'real'), ('total_premium_paid', 'real'), ('sum_assured', 'real'),
+                    ('fund_value', 'real'), ('loyalty_benefits', 'real'), ('phone_number', 'text')),
+    },
+    'calls': {
+        'partition': 'call_month',
+        'query': "SELECT id, call_id, policy_number, phone_number, started_at, ended_at, status, ended_reason, "
+                 "cost, transcript_path, recorded_at, "
+                 "COALESCE(substr(started_at, 1, 7), substr(recorded_at, 1, 7)) FROM call_history",
+        'columns': (('id', 'int'), ('call_id', 'text'), ('policy_number', 'text'), ('phone_number', 'text'),
+                    ('started_at', 'timestamp'), ('ended_at', 'timestamp'), ('status', 'text'),
+                    ('ended_reason', 'text'), ('cost', 'real'), ('transcript_path', 'text'),
+                    ('recorded_at', 'timestamp')),
+    },
+    'transcripts': {
+        'partition': 'call_month',
+        'columns': (('name', 'text'), ('customer', 'text'), ('call_id', 'text'), ('call_time', 'timestamp'),
+                    ('status', 'text'), ('started_at', 'timestamp'), ('ended_at', 'timestamp'),
+                    ('duration_seconds', 'real'), ('cost', 'real'), ('ended_reason', 'text'),
+                    ('agent_turns', 'int'), ('customer_turns', 'int'), ('customer_words', 'int'),
+                    ('language', 'text'), ('source', 'text')),
+    },
+}
+
+# --- transcript field extraction ---------------------------------------------
+
+# Speaker labels used for the agent in VAPI transcripts and our scripts
+AGENT_SPEAKERS = ('ai', 'assistant', 'bot', 'arjun', 'veena')
+_FIELD = re.compile(r'^(Customer|Call ID|Date|Status|Cost|Started At|Ended At|End Reason):\s*(.*)$')
+_SPEAKER = re.compile(r'^\[?([^:\]]{1,60})\]?:\s*(.*)$')
+
+def _parse_timestamp(value):
+    if not value or value == 'N/A':
+        return None
+    try:
+        stamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return stamp.astimezone(timezone.utc)  # naive header times are local
+
+def transcript_fields(name, text, source):
+    """One transcripts row from a transcript written by VAPIInsuranceBot.save_transcript"""
+    fields = {}
+    section = None
+    agent_turns = 0
+    customer_said = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('=== ') and stripped.endswith(' ==='):
+            section = stripped.strip('= ')
+            continue
+        if section == 'TRANSCRIPT':
+            match = _SPEAKER.match(stripped)
+            if match:
+                if match.group(1).strip().lower() in AGENT_SPEAKERS:
+                    agent_turns += 1
+                else:
+                    customer_said.append(match.group(2))
+            continue
+        match = _FIELD.match(stripped)
+        if match and match.group(1) not in fields:
+            fields[match.group(1)] = match.group(2).strip()
+
+    started_at = _parse_timestamp(fields.get('Started At'))
+    ended_at = _parse_timestamp(fields.get('Ended At'))
+    call_time = _parse_timestamp(fields.get('Date'))
+    if call_time is None:
+        from transcript_archive import parse_transcript_name
+        call_time = parse_transcript_name(name)[1]
+        call_time = call_time.astimezone(timezone.utc) if call_time else None
+    try:
+        cost = float(fields.get('Cost', '').lstrip('$'))
+    except ValueError:
+        cost = None
+    language, _ = detect_call_language({'messages': [{'role': 'user', 'message': said} for said in customer_said]})
+    # The header's "Duration" repeats the cost, so duration comes from the call timestamps
+    duration = (ended_at - started_at).total_seconds() if started_at and ended_at else None
+    month = (started_at or call_time).strftime('%Y-%m') if (started_at or call_time) else None
+    return (os.path.splitext(os.path.basename(name))[0], fields.get('Customer'),
+            None if fields.get('Call ID') in (None, 'N/A') else fields['Call ID'],
+            call_time, fields.get('Status'), started_at, ended_at, duration, cost,
+            None if fields.get('End Reason') in (None, 'N/A') else fields['End Reason'],
+            agent_turns, len(customer_said), sum(len(said.split()) for said in customer_said),
+            language, source, month)
+
+def iter_transcript_rows(folder=TRANSCRIPT_FOLDER, archive_root=None):
+    """Transcript rows from the archive, then loose .txt files not already archived"""
+    seen = set()
+    archive_root = archive_root or os.path.join(folder, 'archive')
+    if os.path.exists(os.path.join(archive_root, 'index.sqlite')):
+        from transcript_archive import TranscriptArchive
+        archive = TranscriptArchive(archive_root)
+        try:
+            for name, *_ in archive.list():
+                text = archive.read(name)
+                if text is not None:
+                    seen.add(name)
+                    yield transcript_fields(name, text, 'archive')
+        finally:
+            archive.close()
+    if os.path.isdir(folder):
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+            base, extension = os.path.splitext(entry.name)
+            if extension != '.txt' or base in seen or not entry.is_file():
+                continue
+            with open(entry.path, 'r', encoding='utf-8', errors='replace') as f:
+                yield transcript_fields(entry.name, f.read(), 'file')
+
+# --- partitioned writers -------------------------------------------------------
+
+def _arrow_type(kind):
+    return {'text': pa.string(), 'int': pa.int64(), 'real': pa.float64(), 'date': pa.date32(),
+            'timestamp': pa.timestamp('ms', tz='UTC')}[kind]
+
+def _arrow_array(values, kind):
+    """Typed Arrow array; ISO strings are cast in one go, with a per-value parse for odd rows"""
+    if kind in ('date', 'timestamp') and any(isinstance(value, str) for value in values):
+        try:
+            if kind == 'date':
+                return pa.array(values, pa.string()).cast(pa.date32())
+            return pa.array([_parse_timestamp(value) for value in values], _arrow_type(kind))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            values = [_parse_date(value) for value in values]
+    return pa.array(values, _arrow_type(kind))
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+class PartitionedWriter:
+    """Append rows to <root>/<dataset>/<partition>=<value>/part-NNNNN.<ext>, one open file per partition"""
+    def __init__(self, root, dataset, fmt, max_file_rows=MAX_FILE_ROWS):
+        spec = DATASETS[dataset]
+        self.folder = os.path.join(root, dataset)
+        self.partition = spec['partition']
+        self.columns = spec['columns']
+        self.fmt = fmt
+        self.max_file_rows = max_file_rows
+        self.schema = pa.schema([(name, _arrow_type(kind)) for name, kind in self.columns]) if fmt == 'parquet' else None
+        self._open = {}  # partition value -> [writer, file handle, rows in file, file number]
+        self.files = []
+        self.rows = 0
+
+    def write(self, rows):
+        """rows: tuples in column order followed by the partition value"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(row[-1], []).append(row)
+        for value, group in groups.items():
+            while group:
+                state = self._state(value)
+                room = self.max_file_rows - state[2]
+                part, group = group[:room], group[room:]
+                self._write_part(state, part)
+                state[2] += len(part)
+                self.rows += len(part)
+                if state[2] >= self.max_file_rows:
+                    self._close(value)
+
+    def _state(self, value):
+        state = self._open.get(value)
+        if state is not None:
+            return state
+        label = HIVE_NULL_PARTITION if value is None else quote(str(value), safe='')
+        folder = os.path.join(self.folder, f"{self.partition}={label}")
+        os.makedirs(folder, exist_ok=True)
+        number = sum(1 for path in self.files if os.path.dirname(path) == folder)
+        path = os.path.join(folder, f"part-{number:05d}.{self.fmt}")
+        if self.fmt == 'parquet':
+            state = [pq.ParquetWriter(path, self.schema, compression='zstd'), None, 0, path]
+        else:
+            handle = open(path, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(handle)
+            writer.writerow([name for name, _ in self.columns])
+            state = [writer, handle, 0, path]
+        self.files.append(path)
+        self._open[value] = state
+        return state
+
+    def _write_part(self, state, rows):
+        if self.fmt == 'parquet':
+            columns = list(zip(*rows))
+            state[0].write_table(pa.Table.from_arrays(
+                [_arrow_array(list(columns[i]), kind) for i, (_, kind) in enumerate(self.columns)],
+                schema=self.schema))
+        else:
+            state[0].writerows([_csv_value(value) for value in row[:-1]] for row in rows)
+
+    def _close(self, value):
+        writer, handle, _, _ = self._open.pop(value)
+        if handle is not None:
+            handle.close()
+        else:
+            writer.close()
+
+    def close(self):
+        for value in list(self._open):
+            self._close(value)
+
+# --- export --------------------------------------------------------------------
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _table_chunks(conn, query, size):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        cursor.execute(query)
+    except Exception as e:
+        if 'no such table' in str(e):
+            return  # e.g. no calls recorded yet
+        raise
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+def export_results(out=EXPORT_FOLDER, name=None, datasets=tuple(DATASETS), fmt=None,
+                   chunk_rows=CHUNK_ROWS, max_file_rows=MAX_FILE_ROWS, db_path=None,
+                   transcript_folder=TRANSCRIPT_FOLDER):
+    """Write the datasets to <out>/<name>; returns the manifest"""
+    fmt = fmt or ('parquet' if PYARROW_AVAILABLE else 'csv')
+    if fmt == 'parquet' and not PYARROW_AVAILABLE:
+        raise ValueError("Parquet export needs the 'pyarrow' package (pip install pyarrow); use --format csv")
+    unknown = set(datasets) - set(DATASETS)
+    if unknown:
+        raise ValueError(f"Unknown datasets: {', '.join(sorted(unknown))}")
+    name = name or datetime.now().strftime("export_%Y%m%d_%H%M%S")
+    final = os.path.join(out, name)
+    if os.path.exists(final):
+        raise FileExistsError(f"{final} already exists")
+    partial = final + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)  # left by an export that died half-way
+    os.makedirs(partial)
+
+    started = time.perf_counter()
+    manifest = {'format': fmt, 'created_at': datetime.now(timezone.utc).isoformat(), 'datasets': {}}
+    conn = connect_for_reads(db_path, records=False)
+    try:
+        for dataset in datasets:
+            dataset_started = time.perf_counter()
+            writer = PartitionedWriter(partial, dataset, fmt, max_file_rows)
+            try:
+                if dataset == 'transcripts':
+                    chunks = _chunks(iter_transcript_rows(transcript_folder), chunk_rows)
+                else:
+                    chunks = _table_chunks(conn, DATASETS[dataset]['query'], chunk_rows)
+                for rows in chunks:
+                    writer.write(rows)
+            finally:
+                writer.close()
+            manifest['datasets'][dataset] = {
+                'rows': writer.rows,
+                'partition': writer.partition,
+                'columns': dict(DATASETS[dataset]['columns']),
+                'files': [os.path.relpath(path, partial) for path in writer.files],
+                'seconds': round(time.perf_counter() - dataset_started, 3),
+            }
+    except BaseException:
+        conn.close()
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    conn.close()
+
+    manifest['seconds'] = round(time.perf_counter() - started, 3)
+    manifest['bytes'] = sum(os.path.getsize(os.path.join(root, filename))
+                            for root, _, filenames in os.walk(partial) for filename in filenames)
+    with open(os.path.join(partial, '_manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(partial, final)
+    manifest['path'] = final
+    return manifest
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Export policies, call outcomes and transcripts for analytics")
+    parser.add_argument('--out', default=EXPORT_FOLDER, help="Folder that receives the export")
+    parser.add_argument('--name', help="Export folder name (default: export_<timestamp>)")
+    parser.add_argument('--datasets', default=','.join(DATASETS), help=f"Comma-separated: {', '.join(DATASETS)}")
+    parser.add_argument('--format', choices=('parquet', 'csv'), help="Default: parquet if pyarrow is installed, else csv")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows read and written per step")
+    parser.add_argument('--max-file-rows', type=int, default=MAX_FILE_ROWS, help="Rows per file before rolling over")
+    parser.add_argument('--db', help="Database to export (default: DATABASE_PATH, or the snapshot if in use)")
+    args = parser.parse_args()
+
+    print("📦 Export Results")
+    print("=" * 60)
+    if args.format is None and not PYARROW_AVAILABLE:
+        print("⚠️  pyarrow not installed; writing CSV")
+    try:
+        manifest = export_results(args.out, args.name, [d.strip() for d in args.datasets.split(',') if d.strip()],
+                                  args.format, args.chunk_rows, args.max_file_rows, args.db)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    for dataset, info in manifest['datasets'].items():
+        partitions = len({os.path.dirname(path) for path in info['files']})
+        print(f"   📄 {dataset}: {info['rows']:,} rows in {len(info['files'])} files "
+              f"across {partitions} {info['partition']} partitions ({info['seconds']:.2f}s)")
+    print(f"✅ {manifest['path']} ({manifest['format']}, {manifest['bytes'] / 1024 / 1024:.1f} MB) "
+          f"in {manifest['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Fake VAPI Server - local stand-in for api.vapi.ai used in load tests
+
+Implements the endpoints the bot talks to (/health, /assistant, /call,
+/call/{id}) plus webhook callbacks, so VAPIInsuranceBot can run its real
+HTTP, retry and parsing code without placing phone calls.
+
+Every knob is configurable:
+• Latency distributions per request (const / uniform / lognormal / exp)
+• Error (HTTP 500) and rate-limit (HTTP 429 + Retry-After) injection
+• Call outcome model: answer rate, busy rate, ring time, talk duration
+• Transcript fixtures loaded from Customer_transcripts/*.txt
+• Reply gap per turn: the assistant's responseDelaySeconds and
+  llmRequestDelaySeconds plus a sampled pipeline delay
+• Time scale, so a five minute call can finish in a few milliseconds
+
+Usage:
+    python fake_vapi_server.py --port 8765 --time-scale 0.01 --rate-limit-rate 0.05
+    VAPI_BASE_URL=http://127.0.0.1:8765 VAPI_API_KEY=test VAPI_PHONE_NUMBER_ID=test python vapi_insurance_bot.py
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import uuid
+import heapq
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+TRANSCRIPT_FOLDER = "Customer_transcripts"
+
+# Fallback conversation when no transcript fixtures are available
+DEFAULT_FIXTURE = [
+    ('bot', "Hello और नमस्ते! Good Morning Sir, May I speak with {customer_name}?"),
+    ('user', "Yes, this is {customer_name} speaking."),
+    ('bot', "My name is Arjun, calling from ValuEnable Life Insurance about your pending premium."),
+    ('user', "Okay, I will pay it online today."),
+    ('bot', "Thank you for your time. धन्यवाद! Have a great day!"),
+]
+
+
+def parse_distribution(spec):
+    """Parse 'const:0.05', 'uniform:a,b', 'lognormal:mu,sigma' or 'exp:mean' into a sampler"""
+    kind, _, params = str(spec).partition(':')
+    if not params:
+        # A bare number means a constant
+        value = float(kind)
+        return lambda rng: value
+    values = [float(v) for v in params.split(',')]
+    kind = kind.lower()
+    if kind == 'const':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    if kind == 'exp':
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+def load_transcript_fixtures(folder=TRANSCRIPT_FOLDER):
+    """Load saved call transcripts as lists of (role, text) turns"""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.txt'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            continue
+
+        match = re.search(r"=== TRANSCRIPT ===\n(.*?)\n=== CALL METADATA ===", content, re.S)
+        customer = re.search(r"^Customer: (.+)$", content, re.M)
+        if not match:
+            continue
+
+        customer_name = customer.group(1).strip() if customer else None
+        turns = []
+        for line in match.group(1).strip().splitlines():
+            speaker, sep, text = line.partition(':')
+            if not sep or not text.strip():
+                continue
+            speaker = speaker.strip().strip('[]')
+            role = 'bot' if speaker in ('Arjun', 'Assistant', 'AI') else 'user'
+            text = text.strip()
+            if customer_name:
+                text = text.replace(customer_name, '{customer_name}')
+            turns.append((role, text))
+        if turns:
+            fixtures.append(turns)
+    return fixtures or [DEFAULT_FIXTURE]
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class FakeVAPIConfig:
+    def __init__(self, latency='const:0', error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, answer_rate=0.7, busy_rate=0.05,
+                 ring_seconds='uniform:5,25', talk_seconds='lognormal:5.0,0.5',
+                 time_scale=1.0, webhook_url=None, transcript_folder=TRANSCRIPT_FOLDER,
+                 seed=None, reply_seconds='lognormal:-0.7,0.5'):
+        self.latency = parse_distribution(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.answer_rate = answer_rate
+        self.busy_rate = busy_rate
+        self.ring_seconds = parse_distribution(ring_seconds)
+        self.talk_seconds = parse_distribution(talk_seconds)
+        self.time_scale = time_scale
+        self.webhook_url = webhook_url
+        self.fixtures = load_transcript_fixtures(transcript_folder)
+        self.seed = seed
+        self.reply_seconds = parse_distribution(reply_seconds)
+
+
+class FakeVAPIState:
+    """Assistants, calls and the webhook schedule shared by all handler threads"""
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.assistants = {}
+        self.calls = {}
+        self.stats = {'requests': 0, 'errors_injected': 0, 'rate_limited': 0,
+                      'assistants': 0, 'calls': 0, 'webhooks_sent': 0, 'webhooks_failed': 0}
+        self._webhooks = []
+        self._webhook_event = threading.Condition(self.lock)
+        self._running = True
+        self._webhook_thread = threading.Thread(target=self._webhook_loop, daemon=True)
+        self._webhook_thread.start()
+
+    def sample(self, sampler):
+        with self.lock:
+            return max(0.0, sampler(self.rng))
+
+    def roll(self, probability):
+        with self.lock:
+            return self.rng.random() < probability
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def create_assistant(self, payload):
+        assistant = dict(payload)
+        assistant['id'] = str(uuid.uuid4())
+        assistant['createdAt'] = iso(time.time())
+        with self.lock:
+            self.assistants[assistant['id']] = assistant
+            self.stats['assistants'] += 1
+        return assistant
+
+    def create_call(self, payload):
+        cfg = self.config
+        now = time.time()
+        with self.lock:
+            rng = self.rng
+            ring = max(0.0, cfg.ring_seconds(rng))
+            outcome = rng.random()
+            if outcome < cfg.answer_rate:
+                talk = max(1.0, cfg.talk_seconds(rng))
+                ended_reason = 'customer-ended-call'
+            elif outcome < cfg.answer_rate + cfg.busy_rate:
+                talk = 0.0
+                ended_reason = 'customer-busy'
+            else:
+                talk = 0.0
+                ended_reason = 'customer-did-not-answer'
+            fixture = rng.choice(cfg.fixtures)
+            # STT + LLM + TTS time before each reply, on top of the configured delays
+            pipeline = [max(0.0, cfg.reply_seconds(rng)) for _ in fixture]
+
+        scale = cfg.time_scale
+        call = {
+            'id': str(uuid.uuid4()),
+            'assistantId': payload.get('assistantId'),
+            'phoneNumberId': payload.get('phoneNumberId'),
+            'customer': payload.get('customer', {}),
+            'metadata': payload.get('metadata', {}),
+            'type': 'outboundPhoneCall',
+            'createdAt': iso(now),
+            # Wall-clock schedule (scaled); reported timestamps use model time
+            '_created': now,
+            '_answer_at': now + ring * scale,
+            '_end_at': now + (ring + talk) * scale,
+            '_ring': ring,
+            '_talk': talk,
+            '_ended_reason': ended_reason,
+            '_fixture': fixture,
+            '_pipeline': pipeline,
+        }
+        with self.lock:
+            self.calls[call['id']] = call
+            self.stats['calls'] += 1
+
+        webhook_url = self._webhook_url_for(call)
+        if webhook_url:
+            self._schedule_webhook(call['_answer_at'], webhook_url, call['id'], 'status-update')
+            self._schedule_webhook(call['_end_at'], webhook_url, call['id'], 'end-of-call-report')
+
+        return self.render_call(call, now)
+
+    def _webhook_url_for(self, call):
+        assistant = self.assistants.get(call.get('assistantId'), {})
+        return assistant.get('serverUrl') or self.config.webhook_url
+
+    def get_call(self, call_id):
+        with self.lock:
+            call = self.calls.get(call_id)
+        if not call:
+            return None
+        return self.render_call(call, time.time())
+
+    def render_call(self, call, now):
+        """Public view of a call at wall time `now`"""
+        view = {k: v for k, v in call.items() if not k.startswith('_')}
+        started_at = call['_created']
+        answered = call['_talk'] > 0
+
+        if now < call['_answer_at']:
+            view['status'] = 'ringing' if now - started_at > 0.5 * call['_ring'] * self.config.time_scale else 'queued'
+            return view
+        if answered and now < call['_end_at']:
+            view['status'] = 'in-progress'
+            view['startedAt'] = iso(started_at + call['_ring'])
+            return view
+
+        view['status'] = 'ended'
+        view['endedReason'] = call['_ended_reason']
+        if answered:
+            start = started_at + call['_ring']
+            end = start + call['_talk']
+            view['startedAt'] = iso(start)
+            view['endedAt'] = iso(end)
+            view['cost'] = round(call['_talk'] / 60 * 0.11, 4)
+            view['artifact'] = self._artifact(call, start, end)
+        else:
+            view['endedAt'] = iso(started_at + call['_ring'])
+            view['cost'] = 0
+        return view
+
+    def _artifact(self, call, start, end):
+        """Build transcript and timestamped messages by spreading the fixture over the talk time"""
+        customer_name = call['customer'].get('name') or 'Customer'
+        turns = call['_fixture']
+        assistant = self.assistants.get(call.get('assistantId'), {})
+        delay = float(assistant.get('responseDelaySeconds') or 0) + float(assistant.get('llmRequestDelaySeconds') or 0)
+        # Agent replies wait for the delays plus pipeline time; other turns follow after a short pause
+        gaps = [
+            delay + call['_pipeline'][i] if role == 'bot' and i and turns[i - 1][0] == 'user' else 0.3
+            for i, (role, _) in enumerate(turns)
+        ]
+        speech = max(0.5, ((end - start) - sum(gaps)) / max(1, len(turns)))
+        messages = []
+        lines = []
+        turn_end = start
+        for i, (role, text) in enumerate(turns):
+            text = text.replace('{customer_name}', customer_name)
+            turn_start = turn_end + gaps[i] if i else start
+            turn_end = turn_start + speech
+            messages.append({
+                'role': role,
+                'message': text,
+                'time': int(turn_start * 1000),
+                'endTime': int(turn_end * 1000),
+                'secondsFromStart': round(turn_start - start, 3),
+                'duration': round((turn_end - turn_start) * 1000, 1),
+            })
+            lines.append(f"{'AI' if role == 'bot' else 'User'}: {text}")
+        return {'transcript': "\n".join(lines), 'messages': messages}
+
+    def _schedule_webhook(self, when, url, call_id, kind):
+        with self._webhook_event:
+            heapq.heappush(self._webhooks, (when, url, call_id, kind))
+            self._webhook_event.notify()
+
+    def _webhook_loop(self):
+        while True:
+            with self._webhook_event:
+                while self._running and (not self._webhooks or self._webhooks[0][0] > time.time()):
+                    timeout = self._webhooks[0][0] - time.time() if self._webhooks else None
+                    self._webhook_event.wait(timeout)
+                if not self._running:
+                    return
+                _, url, call_id, kind = heapq.heappop(self._webhooks)
+            self._send_webhook(url, call_id, kind)
+
+    def _send_webhook(self, url, call_id, kind):
+        call = self.get_call(call_id)
+        if not call:
+            return
+        message = {'type': kind, 'call': call, 'timestamp': int(time.time() * 1000)}
+        if kind == 'status-update':
+            message['status'] = call['status']
+        else:
+            message['endedReason'] = call.get('endedReason')
+            message['artifact'] = call.get('artifact', {})
+        try:
+            request = Request(url, data=json.dumps({'message': message}).encode('utf-8'),
+                              headers={'Content-Type': 'application/json'}, method='POST')
+            urlopen(request, timeout=5).close()
+            self.count('webhooks_sent')
+        except Exception:
+            self.count('webhooks_failed')
+
+    def stop(self):
+        with self._webhook_event:
+            self._running = False
+            self._webhook_event.notify()
+
+
+class FakeVAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeVAPI/1.0'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _inject_faults(self):
+        """Apply latency, then maybe answer with an injected 429/500. Returns True if handled."""
+        state = self.state
+        state.count('requests')
+        delay = state.sample(state.config.latency)
+        if delay:
+            time.sleep(delay)
+        if state.roll(state.config.rate_limit_rate):
+            state.count('rate_limited')
+            self._send_json(429, {'message': 'Too Many Requests'},
+                            {'Retry-After': f"{state.config.retry_after:g}"})
+            return True
+        if state.roll(state.config.error_rate):
+            state.count('errors_injected')
+            self._send_json(500, {'message': 'Injected server error'})
+            return True
+        return False
+
+    def _authorized(self):
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send_json(401, {'message': 'Missing bearer token'})
+            return False
+        return True
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+            return
+        if self.path == '/stats':
+            with self.state.lock:
+                stats = dict(self.state.stats)
+            self._send_json(200, stats)
+            return
+        if not self._authorized() or self._inject_faults():
+            return
+
+        match = re.fullmatch(r'/call/([\w-]+)', self.path)
+        if match:
+            call = self.state.get_call(match.group(1))
+            if call:
+                self._send_json(200, call)
+            else:
+                self._send_json(404, {'message': 'Call not found'})
+            return
+        match = re.fullmatch(r'/assistant/([\w-]+)', self.path)
+        if match and match.group(1) in self.state.assistants:
+            self._send_json(200, self.state.assistants[match.group(1)])
+            return
+        self._send_json(404, {'message': 'Not found'})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except (ValueError, UnicodeDecodeError):
+            self._send_json(400, {'message': 'Invalid JSON body'})
+            return
+        if not self._authorized() or self._inject_faults():
+            return
+
+        if self.path == '/assistant':
+            self._send_json(201, self.state.create_assistant(payload))
+        elif self.path == '/call':
+            if not payload.get('assistantId') or not payload.get('customer', {}).get('number'):
+                self._send_json(400, {'message': 'assistantId and customer.number are required'})
+                return
+            self._send_json(201, self.state.create_call(payload))
+        else:
+            self._send_json(404, {'message': 'Not found'})
+
+
+class FakeVAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config, verbose=False):
+        super().__init__(address, FakeVAPIHandler)
+        self.state = FakeVAPIState(config)
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self):
+        """Serve from a daemon thread (for in-process load tests)"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        self.state.stop()
+        super().server_close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Local stand-in for the VAPI API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='const:0', help="Per-request latency distribution in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of an injected HTTP 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Probability of an injected HTTP 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--answer-rate', type=float, default=0.7)
+    parser.add_argument('--busy-rate', type=float, default=0.05)
+    parser.add_argument('--ring-seconds', default='uniform:5,25')
+    parser.add_argument('--talk-seconds', default='lognormal:5.0,0.5', help="Call duration distribution (seconds)")
+    parser.add_argument('--time-scale', type=float, default=1.0, help="Wall seconds per simulated call second")
+    parser.add_argument('--webhook-url', help="Default URL for status-update / end-of-call-report callbacks")
+    parser.add_argument('--transcripts', default=TRANSCRIPT_FOLDER, help="Folder of transcript fixtures")
+    parser.add_argument('--reply-seconds', default='lognormal:-0.7,0.5',
+                        help="Pipeline time before each agent reply, on top of the assistant's configured delays")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    config = FakeVAPIConfig(
+        latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after, answer_rate=args.answer_rate, busy_rate=args.busy_rate,
+        ring_seconds=args.ring_seconds, talk_seconds=args.talk_seconds, time_scale=args.time_scale,
+        webhook_url=args.webhook_url, transcript_folder=args.transcripts, seed=args.seed,
+        reply_seconds=args.reply_seconds,
+    )
+    server = FakeVAPIServer((args.host, args.port), config, verbose=args.verbose)
+
+    print("🎭 Fake VAPI Server")
+    print(f"🌐 Listening on {server.base_url}")
+    print(f"📚 Transcript fixtures: {len(config.fixtures)}")
+    print(f"⏱️  Time scale: {args.time_scale}x")
+    print("=" * 50)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
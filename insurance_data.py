@@ -0,0 +1,869 @@
+#!/usr/bin/env python3
+"""
+Insurance data access layer
+
+Plain functions over insurance_db.sqlite. The MCP server registers these
+as its tools/resources, and the script generator and bot call them
+directly, so neither has to construct a FastMCP server to read a row.
+"""
+
+import sqlite3
+import os
+import re
+import json
+import time
+import pathlib
+from datetime import date
+from typing import List, Union
+
+# Database path
+DB_PATH = os.getenv('DATABASE_PATH', "insurance_db.sqlite")
+
+def connect_to_db():
+    """Connect to SQLite database"""
+    try:
+        if not os.path.exists(DB_PATH):
+            raise FileNotFoundError(f"Database file '{DB_PATH}' not found!")
+        return sqlite3.connect(DB_PATH)
+    except Exception as e:
+        raise Exception(f"Error connecting to database: {e}")
+
+# Overdue selection and campaign order shared by every caller
+OVERDUE_FILTER = "status = 'Discontinuance' OR status = 'overdue' OR outstanding_amount > 0"
+OVERDUE_ORDER = "date(premium_due_date) ASC"
+
+POLICY_COLUMNS = (
+    'id', 'policy_holder_name', 'policy_number', 'product_name',
+    'policy_start_date', 'premium_due_date', 'outstanding_amount',
+    'total_premium_paid', 'sum_assured', 'fund_value', 'status',
+    'loyalty_benefits', 'phone_number'
+)
+DATE_COLUMNS = ('policy_start_date', 'premium_due_date')
+AMOUNT_COLUMNS = ('outstanding_amount', 'total_premium_paid', 'sum_assured', 'fund_value', 'loyalty_benefits')
+
+def is_overdue(record):
+    """Python twin of OVERDUE_FILTER for records already in memory"""
+    return record.status in ('Discontinuance', 'overdue') or record.outstanding_amount > 0
+
+def _parse_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_amount(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+class PolicyRecord:
+    """One policy_info row with parsed dates and numeric amounts
+
+    Uses __slots__ instead of a per-row dict, so million-row campaigns keep
+    a fixed, small footprint per customer and skip JSON round trips.
+    """
+    __slots__ = POLICY_COLUMNS
+    
+    def __init__(self, id=None, policy_holder_name='Customer', policy_number='N/A',
+                 product_name='Insurance Policy', policy_start_date=None, premium_due_date=None,
+                 outstanding_amount=0.0, total_premium_paid=0.0, sum_assured=0.0, fund_value=0.0,
+                 status='Discontinuance', loyalty_benefits=0.0, phone_number=''):
+        self.id = id
+        self.policy_holder_name = policy_holder_name
+        self.policy_number = policy_number
+        self.product_name = product_name
+        self.policy_start_date = _parse_date(policy_start_date)
+        self.premium_due_date = _parse_date(premium_due_date)
+        self.outstanding_amount = _parse_amount(outstanding_amount)
+        self.total_premium_paid = _parse_amount(total_premium_paid)
+        self.sum_assured = _parse_amount(sum_assured)
+        self.fund_value = _parse_amount(fund_value)
+        self.status = status
+        self.loyalty_benefits = _parse_amount(loyalty_benefits)
+        self.phone_number = phone_number
+    
+    @classmethod
+    def from_mapping(cls, data):
+        """Build from a dict (e.g. JSON returned by an MCP tool); unknown keys are ignored"""
+        return cls(**{key: data[key] for key in POLICY_COLUMNS if key in data})
+    
+    def to_dict(self):
+        """JSON-friendly dict in policy_info column order (dates as ISO strings)"""
+        data = {}
+        for key in POLICY_COLUMNS:
+            value = getattr(self, key)
+            data[key] = value.isoformat() if isinstance(value, date) else value
+        return data
+    
+    def __repr__(self):
+        return f"PolicyRecord({self.policy_number!r}, {self.policy_holder_name!r})"
+
+def policy_record_factory(cursor, row):
+    """sqlite3 row_factory that builds PolicyRecord objects straight from rows"""
+    names = tuple(description[0] for description in cursor.description)
+    if names == POLICY_COLUMNS:
+        return PolicyRecord(*row)
+    return PolicyRecord(**{name: value for name, value in zip(names, row) if name in POLICY_COLUMNS})
+
+def connect_for_records(db_path=None, **kwargs):
+    """Connection whose queries on policy_info yield PolicyRecord rows"""
+    db_path = db_path or DB_PATH
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database file '{db_path}' not found!")
+    conn = sqlite3.connect(db_path, **kwargs)
+    conn.row_factory = policy_record_factory
+    return conn
+
+# Point-in-time copy for campaign reads (db_snapshot.py); unset = read the live database.
+# Connections opened after a refresh see the new copy; open ones keep the one they started on.
+SNAPSHOT_PATH = os.getenv('DATABASE_SNAPSHOT') or None
+SNAPSHOT_MAX_AGE = float(os.getenv('DATABASE_SNAPSHOT_MAX_AGE', '0'))  # seconds; 0 = no limit
+
+def use_snapshot(path, max_age=None):
+    """Send campaign reads to a snapshot file (None switches back to the live database)"""
+    global SNAPSHOT_PATH, SNAPSHOT_MAX_AGE
+    SNAPSHOT_PATH = path
+    if max_age is not None:
+        SNAPSHOT_MAX_AGE = max_age
+
+def read_db_path():
+    """Snapshot path if one is in use and fresh enough, else the live database"""
+    path = SNAPSHOT_PATH
+    if not path:
+        return DB_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return DB_PATH  # not taken yet
+    if SNAPSHOT_MAX_AGE and time.time() - mtime > SNAPSHOT_MAX_AGE:
+        return DB_PATH  # the refresher has stalled; stale data is worse than a brief lock wait
+    return path
+
+def connect_for_reads(db_path=None, records=True, **kwargs):
+    """Connection for campaign queries: read-only on the snapshot when one is in use
+
+    records=False gives plain tuple rows. An explicit db_path other than
+    the live database is opened as-is.
+    """
+    if db_path and db_path != DB_PATH:
+        return connect_for_records(db_path, **kwargs)
+    path = read_db_path()
+    if path == DB_PATH:
+        if records:
+            return connect_for_records(**kwargs)
+        return connect_to_db()
+    conn = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True, **kwargs)
+    if records:
+        conn.row_factory = policy_record_factory
+    return conn
+
+# Sharded policy_info (shard_router.py). Only the MCP read tools are routed to
+# the shards; everything else reads and writes policy_info in DB_PATH, so it
+# refuses to run once a shard map exists instead of drifting from the shards
+DEFAULT_SHARD_MAP = os.path.join('shards', 'shard_map.json')
+
+def configured_shard_map():
+    """Shard map path if policy_info has been split (DATABASE_SHARD_MAP, or the default map exists), else None"""
+    path = os.getenv('DATABASE_SHARD_MAP')
+    if path:
+        return path
+    return DEFAULT_SHARD_MAP if os.path.exists(DEFAULT_SHARD_MAP) else None
+
+def require_unsharded(component):
+    """Raise RuntimeError if policy_info is sharded; for code that only knows the single database"""
+    shard_map = configured_shard_map()
+    if shard_map:
+        raise RuntimeError(
+            f"{component} reads and writes policy_info in {DB_PATH}, but it is sharded ({shard_map}) - "
+            f"only the MCP read tools use the shards; see 'Sharded Policy Book' in the README"
+        )
+
+def _plain_cursor(conn):
+    """Tuple-row cursor, even on a connection using policy_record_factory"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+def has_table(conn, name):
+    """True if the table exists; read paths check instead of creating it (ensure_schema does that)"""
+    return _plain_cursor(conn).execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+def fetch_longest_overdue_record(conn=None):
+    """PolicyRecord with the longest overdue premium, or None"""
+    own = conn is None
+    conn = conn or connect_for_reads()
+    try:
+        return conn.execute(
+            f"SELECT * FROM policy_info WHERE {OVERDUE_FILTER} ORDER BY {OVERDUE_ORDER} LIMIT 1"
+        ).fetchone()
+    finally:
+        if own:
+            conn.close()
+
+def fetch_record_by_policy(policy_number, conn=None):
+    """PolicyRecord for a policy number, or None"""
+    own = conn is None
+    conn = conn or connect_for_records()
+    try:
+        return conn.execute(
+            "SELECT * FROM policy_info WHERE policy_number = ?", (policy_number,)
+        ).fetchone()
+    finally:
+        if own:
+            conn.close()
+
+# Bound placeholders per IN (...) query; stays under SQLite's 999-variable
+# limit on older builds
+IN_CHUNK_SIZE = 500
+MAX_BATCH_POLICIES = 10000
+
+def fetch_policy_rows(policy_numbers, conn=None, chunk_size=IN_CHUNK_SIZE):
+    """Raw policy_info tuples for many policy numbers over one connection
+
+    Returns {policy_number: row}; numbers not in the table are simply absent.
+    """
+    own = conn is None
+    conn = conn or connect_for_reads(records=False)
+    try:
+        cursor = _plain_cursor(conn)
+        columns = ", ".join(POLICY_COLUMNS)
+        key = POLICY_COLUMNS.index('policy_number')
+        unique = list(dict.fromkeys(policy_numbers))
+        rows = {}
+        for start in range(0, len(unique), chunk_size):
+            chunk = unique[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in cursor.execute(
+                f"SELECT {columns} FROM policy_info WHERE policy_number IN ({placeholders})", chunk
+            ):
+                rows[row[key]] = row
+        return rows
+    finally:
+        if own:
+            conn.close()
+
+def iter_overdue_records(conn=None, limit=None, batch_size=1000):
+    """Stream overdue PolicyRecords in campaign order without materialising the book"""
+    own = conn is None
+    conn = conn or connect_for_reads()
+    try:
+        query = f"SELECT * FROM policy_info WHERE {OVERDUE_FILTER} ORDER BY {OVERDUE_ORDER}"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (int(limit),)
+        cursor = conn.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        if own:
+            conn.close()
+
+# Families often share one number; the index keeps household lookups cheap
+PHONE_INDEX_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_policy_info_phone ON policy_info (phone_number);
+"""
+
+def ensure_phone_index(conn):
+    """Create the phone_number index if missing"""
+    conn.executescript(PHONE_INDEX_SCHEMA)
+
+def normalize_e164(number, default_country='91'):
+    """Canonical +<country><number> form so '+91 98494 75949' and '09849475949' match"""
+    if not number:
+        return None
+    digits = re.sub(r'\D', '', str(number))
+    if len(digits) == 10:
+        digits = default_country + digits
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = default_country + digits[1:]
+    return '+' + digits if digits else None
+
+def normalize_phone_numbers(conn):
+    """Rewrite stored phone numbers in E.164 form; returns how many rows changed
+
+    Households are matched on the stored number, so the bot's lookup and
+    campaign_planner's grouping only agree once every number is canonical.
+    """
+    changed = []
+    for row_id, number in _plain_cursor(conn).execute("SELECT id, phone_number FROM policy_info"):
+        normalized = normalize_e164(number)
+        if normalized and normalized != number:
+            changed.append((normalized, row_id))
+    if changed:
+        with conn:
+            conn.executemany("UPDATE policy_info SET phone_number = ? WHERE id = ?", changed)
+    return len(changed)
+
+def fetch_household_records(phone_number, conn=None):
+    """Overdue PolicyRecords sharing one phone number, in campaign order"""
+    own = conn is None
+    conn = conn or connect_for_reads()
+    try:
+        # Stored numbers are E.164 (normalize_phone_numbers); the raw form
+        # still matches a row written before the migration ran
+        return conn.execute(
+            f"SELECT * FROM policy_info WHERE phone_number IN (?, ?) AND ({OVERDUE_FILTER}) ORDER BY {OVERDUE_ORDER}",
+            (normalize_e164(phone_number) or phone_number, phone_number)
+        ).fetchall()
+    finally:
+        if own:
+            conn.close()
+
+# Outcome of every call, per policy (a household call adds one row per policy)
+CALL_HISTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS call_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        call_id TEXT,
+        policy_number TEXT NOT NULL,
+        phone_number TEXT,
+        started_at TEXT,
+        ended_at TEXT,
+        status TEXT,
+        ended_reason TEXT,
+        cost REAL,
+        transcript_path TEXT,
+        recorded_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_call_history_policy ON call_history (policy_number, id);
+"""
+
+CALL_HISTORY_COLUMNS = ('call_id', 'started_at', 'ended_at', 'status', 'ended_reason', 'cost', 'transcript_path')
+
+def ensure_call_history(conn):
+    """Create the call_history table if missing"""
+    conn.executescript(CALL_HISTORY_SCHEMA)
+
+def record_call_history(call_data, records, transcript_path=None, conn=None):
+    """Store a finished call against every policy it covered"""
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        ensure_call_history(conn)
+        with conn:
+            conn.executemany(
+                "INSERT INTO call_history (call_id, policy_number, phone_number, started_at, ended_at, "
+                "status, ended_reason, cost, transcript_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(call_data.get('id'), record.policy_number, record.phone_number,
+                  call_data.get('startedAt'), call_data.get('endedAt'), call_data.get('status'),
+                  call_data.get('endedReason'), call_data.get('cost'), transcript_path)
+                 for record in records]
+            )
+    finally:
+        if own:
+            conn.close()
+
+def fetch_customer_context(policy_number, history_limit=10, conn=None):
+    """PolicyRecord plus its most recent calls (newest first) in one query
+
+    Returns (record, history) where history is a list of dicts; record is
+    None for an unknown policy. Without a call_history table (a database
+    not yet migrated) the history is empty.
+    """
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        if not has_table(conn, 'call_history'):
+            row = _plain_cursor(conn).execute(
+                f"SELECT {', '.join(POLICY_COLUMNS)} FROM policy_info WHERE policy_number = ?", (policy_number,)
+            ).fetchone()
+            return (PolicyRecord(*row) if row else None), []
+        policy_columns = ", ".join(f"p.{name}" for name in POLICY_COLUMNS)
+        history_columns = ", ".join(f"h.{name}" for name in CALL_HISTORY_COLUMNS)
+        rows = _plain_cursor(conn).execute(f"""
+            SELECT {policy_columns}, h.id, {history_columns}
+            FROM policy_info p
+            LEFT JOIN (
+                SELECT * FROM call_history WHERE policy_number = :policy
+                ORDER BY id DESC LIMIT :limit
+            ) h ON h.policy_number = p.policy_number
+            WHERE p.policy_number = :policy
+            ORDER BY h.id DESC
+        """, {'policy': policy_number, 'limit': history_limit}).fetchall()
+        if not rows:
+            return None, []
+        split = len(POLICY_COLUMNS)
+        record = PolicyRecord(*rows[0][:split])
+        history = [dict(zip(CALL_HISTORY_COLUMNS, row[split + 1:])) for row in rows if row[split] is not None]
+        return record, history
+    finally:
+        if own:
+            conn.close()
+
+# Language each policy holder spoke on their last completed call, so the
+# next call opens in it instead of asking (script Branch 0.0)
+SUPPORTED_LANGUAGES = ('en', 'hi')
+
+CUSTOMER_PREFERENCES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS customer_preferences (
+        policy_number TEXT PRIMARY KEY,
+        language TEXT NOT NULL,
+        source TEXT NOT NULL,
+        call_id TEXT,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+"""
+
+LANGUAGE_NAMES = {
+    'en': re.compile(r"\b(?:english|angrezi)\b|इंग्लिश|अंग्रेज़ी|अंग्रेजी", re.IGNORECASE),
+    'hi': re.compile(r"\bhindi\b|हिंदी|हिन्दी", re.IGNORECASE),
+}
+# "not Hindi", "Hindi nahi": a language named only to turn it down
+_NEGATED = re.compile(r"(?:\b(?:not|no|don't|dont|nahi|nahin)\s+(?:in\s+)?|नहीं\s+)$", re.IGNORECASE)
+_NEGATED_AFTER = re.compile(r"^\s*(?:\bnahi\b|\bnahin\b|नहीं)", re.IGNORECASE)
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_LETTERS = re.compile(r"[^\W\d_]")
+# Hindi typed out in Latin letters by the transcriber ("haan ji, kal tak kar dunga")
+_ROMAN_HINDI = re.compile(
+    r"\b(?:haan|haanji|nahi|nahin|ji|hai|hain|hoon|kya|kyun|theek|thik|accha|acha|boliye|bataiye|"
+    r"aap|aapka|aapki|mera|meri|mujhe|dunga|dungi|karunga|karungi|abhi|paisa|paise|bhai|samajh)\b",
+    re.IGNORECASE)
+CUSTOMER_SPEAKERS = ('user', 'customer')
+
+def ensure_customer_preferences(conn):
+    """Create the customer_preferences table if missing"""
+    conn.executescript(CUSTOMER_PREFERENCES_SCHEMA)
+
+def customer_utterances(call_data):
+    """What the customer said on a VAPI call, in order (artifact messages, else the transcript text)"""
+    artifact = call_data.get('artifact') or {}
+    messages = artifact.get('messages') or call_data.get('messages') or []
+    said = [m.get('message') or '' for m in messages if m.get('role') == 'user']
+    if said:
+        return said
+    transcript = artifact.get('transcript') or call_data.get('transcript') or ''
+    for line in transcript.splitlines():
+        speaker, _, text = line.partition(':')
+        if speaker.strip().strip('[]').lower() in CUSTOMER_SPEAKERS:
+            said.append(text.strip())
+    return said
+
+def _named_languages(text):
+    named = set()
+    for language, pattern in LANGUAGE_NAMES.items():
+        for match in pattern.finditer(text):
+            if not _NEGATED.search(text[:match.start()]) and not _NEGATED_AFTER.search(text[match.end():]):
+                named.add(language)
+    return named
+
+def detect_call_language(call_data, min_letters=40):
+    """(language, source) for a finished call, or (None, None) if it is unclear
+
+    source is 'selected' when the customer asked for a language by name
+    (the last such request wins), else 'detected' from the share of
+    Devanagari (or romanised Hindi words) in what they said.
+    """
+    said = customer_utterances(call_data)
+    for text in reversed(said):
+        named = _named_languages(text)
+        if len(named) == 1:
+            return named.pop(), 'selected'
+    text = ' '.join(said)
+    letters = len(_LETTERS.findall(text))
+    if letters < min_letters:
+        return None, None
+    hindi = len(_DEVANAGARI.findall(text)) + sum(len(word) for word in _ROMAN_HINDI.findall(text))
+    share = hindi / letters
+    if share >= 0.5:
+        return 'hi', 'detected'
+    if share <= 0.2:
+        return 'en', 'detected'
+    return None, None  # Hinglish: keep asking
+
+def record_language_preference(records, language, source, call_id=None, conn=None):
+    """Remember the language for every policy a call covered"""
+    if language not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"Unsupported language {language!r}; use one of {', '.join(SUPPORTED_LANGUAGES)}")
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        ensure_customer_preferences(conn)
+        with conn:
+            # A language the customer chose by name is not overwritten by a guess
+            conn.executemany("""
+                INSERT INTO customer_preferences (policy_number, language, source, call_id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (policy_number) DO UPDATE SET
+                    language = excluded.language, source = excluded.source, call_id = excluded.call_id,
+                    updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+                WHERE excluded.source = 'selected' OR customer_preferences.source != 'selected'
+            """, [(record.policy_number, language, source, call_id) for record in records])
+    finally:
+        if own:
+            conn.close()
+
+def fetch_language_preference(policy_number, conn=None):
+    """Stored language ('en' / 'hi') for a policy, or None (also before customer_preferences exists)"""
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        if not has_table(conn, 'customer_preferences'):
+            return None
+        row = _plain_cursor(conn).execute(
+            "SELECT language FROM customer_preferences WHERE policy_number = ?", (policy_number,)
+        ).fetchone()
+        return row[0] if row else None
+    finally:
+        if own:
+            conn.close()
+
+# Portfolio rollups: per-bucket counts and sums kept current by triggers, so
+# "outstanding by product/status/month" is a lookup, not a scan of the book
+ROLLUP_DIMENSIONS = {
+    'total': "'all'",
+    'product': "COALESCE({row}.product_name, 'Unknown')",
+    'status': "COALESCE({row}.status, 'Unknown')",
+    'due_month': "COALESCE(strftime('%Y-%m', {row}.premium_due_date), 'Unknown')",
+}
+ROLLUP_MEASURES = ('outstanding_amount', 'sum_assured', 'fund_value')
+
+ROLLUP_TABLE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS policy_rollups (
+        dimension TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        policy_count INTEGER NOT NULL DEFAULT 0,
+        outstanding_amount REAL NOT NULL DEFAULT 0,
+        sum_assured REAL NOT NULL DEFAULT 0,
+        fund_value REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, bucket)
+    );
+"""
+
+def _rollup_delta_sql(row, sign):
+    """Trigger statements adding (sign=+1) or removing (-1) one row's contribution"""
+    statements = []
+    for dimension, expression in ROLLUP_DIMENSIONS.items():
+        bucket = expression.format(row=row)
+        values = ", ".join(f"{sign} * COALESCE({row}.{measure}, 0)" for measure in ROLLUP_MEASURES)
+        updates = ", ".join(f"{measure} = {measure} + excluded.{measure}" for measure in ROLLUP_MEASURES)
+        statements.append(
+            f"INSERT INTO policy_rollups (dimension, bucket, policy_count, {', '.join(ROLLUP_MEASURES)}) "
+            f"VALUES ('{dimension}', {bucket}, {sign}, {values}) "
+            f"ON CONFLICT (dimension, bucket) DO UPDATE SET policy_count = policy_count + excluded.policy_count, {updates};"
+        )
+    return "\n        ".join(statements)
+
+ROLLUP_TRIGGERS_SCHEMA = f"""
+    CREATE TRIGGER IF NOT EXISTS policy_info_rollup_insert
+    AFTER INSERT ON policy_info BEGIN
+        {_rollup_delta_sql('NEW', 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS policy_info_rollup_update
+    AFTER UPDATE OF product_name, status, premium_due_date, {', '.join(ROLLUP_MEASURES)} ON policy_info BEGIN
+        {_rollup_delta_sql('OLD', -1)}
+        {_rollup_delta_sql('NEW', 1)}
+    END;
+    CREATE TRIGGER IF NOT EXISTS policy_info_rollup_delete
+    AFTER DELETE ON policy_info BEGIN
+        {_rollup_delta_sql('OLD', -1)}
+    END;
+"""
+
+def rebuild_rollups(conn):
+    """Recompute every rollup bucket from policy_info (one full scan per dimension)"""
+    with conn:
+        conn.execute("DELETE FROM policy_rollups")
+        sums = ", ".join(f"COALESCE(SUM({measure}), 0)" for measure in ROLLUP_MEASURES)
+        for dimension, expression in ROLLUP_DIMENSIONS.items():
+            bucket = expression.format(row='policy_info')
+            conn.execute(
+                f"INSERT INTO policy_rollups (dimension, bucket, policy_count, {', '.join(ROLLUP_MEASURES)}) "
+                f"SELECT '{dimension}', {bucket}, COUNT(*), {sums} FROM policy_info GROUP BY 2"
+            )
+
+def ensure_rollups(conn):
+    """Create the rollup table and triggers; the first time, backfill from the existing book"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'policy_rollups'"
+    ).fetchone()
+    if exists:
+        return False
+    conn.executescript(ROLLUP_TABLE_SCHEMA + ROLLUP_TRIGGERS_SCHEMA)
+    rebuild_rollups(conn)
+    return True
+
+def fetch_rollups(dimension=None, conn=None):
+    """Rollup rows as dicts, optionally for one dimension (empty buckets left out)
+
+    Read-only: raises LookupError if the rollups were never set up
+    (ensure_schema creates and backfills them).
+    """
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        if not has_table(conn, 'policy_rollups'):
+            raise LookupError("portfolio rollups are not set up - run python Data_Insertion/create_database.py --migrate")
+        query = f"SELECT dimension, bucket, policy_count, {', '.join(ROLLUP_MEASURES)} FROM policy_rollups WHERE policy_count > 0"
+        params = ()
+        if dimension:
+            query += " AND dimension = ?"
+            params = (dimension,)
+        query += " ORDER BY dimension, bucket"
+        names = ('dimension', 'bucket', 'policy_count') + ROLLUP_MEASURES
+        return [dict(zip(names, row)) for row in _plain_cursor(conn).execute(query, params)]
+    finally:
+        if own:
+            conn.close()
+
+# Change feed: every write to policy_info appends a row with a monotonically
+# increasing seq, so consumers apply deltas instead of rescanning the book
+CHANGE_FEED_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS policy_changelog (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        policy_number TEXT NOT NULL,
+        operation TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE TRIGGER IF NOT EXISTS policy_info_changelog_insert
+    AFTER INSERT ON policy_info BEGIN
+        INSERT INTO policy_changelog (policy_number, operation) VALUES (NEW.policy_number, 'insert');
+    END;
+    CREATE TRIGGER IF NOT EXISTS policy_info_changelog_update
+    AFTER UPDATE ON policy_info BEGIN
+        INSERT INTO policy_changelog (policy_number, operation)
+        SELECT OLD.policy_number, 'delete' WHERE OLD.policy_number <> NEW.policy_number;
+        INSERT INTO policy_changelog (policy_number, operation) VALUES (NEW.policy_number, 'update');
+    END;
+    CREATE TRIGGER IF NOT EXISTS policy_info_changelog_delete
+    AFTER DELETE ON policy_info BEGIN
+        INSERT INTO policy_changelog (policy_number, operation) VALUES (OLD.policy_number, 'delete');
+    END;
+"""
+
+def ensure_change_feed(conn):
+    """Create the changelog table and triggers if they are missing"""
+    conn.executescript(CHANGE_FEED_SCHEMA)
+
+def latest_change_seq(conn):
+    """Highest changelog seq (0 when the feed is empty)"""
+    return _plain_cursor(conn).execute("SELECT COALESCE(MAX(seq), 0) FROM policy_changelog").fetchone()[0]
+
+def fetch_changes_since(since_seq, limit=1000, conn=None):
+    """Changes after since_seq as (seq, policy_number, operation, changed_at, PolicyRecord or None)
+
+    Only the newest change per policy in the window is returned, joined with
+    the current row, so a consumer can apply it without another lookup.
+    """
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        columns = ", ".join(f"p.{name}" for name in POLICY_COLUMNS)
+        rows = _plain_cursor(conn).execute(f"""
+            SELECT c.seq, c.policy_number, c.operation, c.changed_at, {columns}
+            FROM (
+                SELECT MAX(seq) AS seq FROM (
+                    SELECT seq, policy_number FROM policy_changelog
+                    WHERE seq > ? ORDER BY seq LIMIT ?
+                ) GROUP BY policy_number
+            ) latest
+            JOIN policy_changelog c ON c.seq = latest.seq
+            LEFT JOIN policy_info p ON p.policy_number = c.policy_number
+            ORDER BY c.seq
+        """, (since_seq, limit)).fetchall()
+        changes = []
+        for row in rows:
+            record = PolicyRecord(*row[4:]) if row[4] is not None else None
+            changes.append((row[0], row[1], row[2], row[3], record))
+        return changes
+    finally:
+        if own:
+            conn.close()
+
+def prune_changelog(before_seq, conn=None):
+    """Drop changelog rows every consumer has already applied"""
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM policy_changelog WHERE seq < ?", (before_seq,)).rowcount
+    finally:
+        if own:
+            conn.close()
+
+def ensure_schema(conn):
+    """Create every table, trigger and index the campaign code relies on (idempotent)
+
+    Run at setup: Data_Insertion/create_database.py, or its --migrate on an
+    existing database. Read paths assume this has run and never issue DDL.
+    """
+    ensure_change_feed(conn)
+    ensure_phone_index(conn)
+    normalize_phone_numbers(conn)
+    ensure_call_history(conn)
+    ensure_customer_preferences(conn)
+    ensure_rollups(conn)
+
+# Database schema (exposed by the MCP server as schema://insurance)
+# Schema text per database, reused until PRAGMA schema_version changes
+_schema_cache = {}
+
+def get_schema() -> str:
+    """Provide the insurance database schema as a resource"""
+    conn = connect_to_db()
+    try:
+        # schema_version is bumped by SQLite on every DDL change, so a single
+        # header read tells us whether the cached text is still valid
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        cached = _schema_cache.get(DB_PATH)
+        if cached and cached[0] == version:
+            return cached[1]
+        schema = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        text = "\n".join(sql[0] for sql in schema if sql[0])
+        _schema_cache[DB_PATH] = (version, text)
+        return text
+    except Exception as e:
+        return f"Error getting schema: {str(e)}"
+    finally:
+        conn.close()
+
+# Customer with the longest overdue premium
+def get_longest_overdue_customer() -> str:
+    """Get customer with longest overdue premium"""
+    try:
+        record = fetch_longest_overdue_record()
+        if record:
+            return json.dumps(record.to_dict())
+        return json.dumps({"error": "No overdue customers found"})
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+# Customer lookup by policy number
+def get_customer_by_policy(policy_number: str) -> str:
+    """Get customer data by policy number"""
+    try:
+        record = fetch_record_by_policy(policy_number)
+        if record:
+            return json.dumps(record.to_dict())
+        return json.dumps({"error": f"No customer found with policy number: {policy_number}"})
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+# All customers with overdue premiums
+def get_all_overdue_customers() -> str:
+    """Get all customers with overdue premiums"""
+    try:
+        return json.dumps([record.to_dict() for record in iter_overdue_records()])
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+# Batch lookup: one connection, chunked IN queries, columnar result
+def get_customers_by_policies(policy_numbers: Union[List[str], str]) -> str:
+    """Get many customers at once by policy number (columnar JSON plus the numbers not found)"""
+    if isinstance(policy_numbers, str):
+        policy_numbers = re.split(r'[\s,]+', policy_numbers)
+    requested = list(dict.fromkeys(str(number).strip() for number in policy_numbers if str(number).strip()))
+    if len(requested) > MAX_BATCH_POLICIES:
+        return json.dumps({"error": f"At most {MAX_BATCH_POLICIES} policy numbers per call (got {len(requested)})"})
+    try:
+        rows = fetch_policy_rows(requested)
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+    
+    found = [rows[number] for number in requested if number in rows]
+    columns = {name: [row[index] for row in found] for index, name in enumerate(POLICY_COLUMNS)}
+    return json.dumps({
+        "count": len(found),
+        "columns": columns,
+        "missing": [number for number in requested if number not in rows]
+    }, separators=(',', ':'))
+
+# Portfolio summary from the trigger-maintained rollups
+def get_portfolio_rollup(dimension: str = "") -> str:
+    """Get outstanding amount, sum assured, fund value and policy counts by product, status or due month"""
+    if dimension and dimension not in ROLLUP_DIMENSIONS:
+        return json.dumps({"error": f"Unknown dimension '{dimension}'. Use one of: {', '.join(ROLLUP_DIMENSIONS)}"})
+    try:
+        rollup = {}
+        for row in fetch_rollups(dimension or None):
+            bucket = rollup.setdefault(row['dimension'], {})
+            bucket[row['bucket']] = {
+                'policy_count': row['policy_count'],
+                # Sums are float accumulators; rounding hides drift from repeated +/- updates
+                **{measure: round(row[measure], 2) for measure in ROLLUP_MEASURES}
+            }
+        return json.dumps(rollup)
+    except LookupError as e:
+        return json.dumps({"error": str(e)})
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+def get_portfolio_summary() -> str:
+    """Provide portfolio rollups for every dimension as a resource"""
+    return get_portfolio_rollup()
+
+# Custom SQL queries (with safety checks)
+def execute_safe_query(sql: str) -> str:
+    """Execute safe SQL queries (SELECT only)"""
+    # Basic safety check - only allow SELECT statements
+    if not sql.strip().upper().startswith('SELECT'):
+        return json.dumps({"error": "Only SELECT queries are allowed for security"})
+    
+    conn = connect_for_reads(records=False)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        results = cursor.fetchall()
+        
+        if results:
+            column_names = [description[0] for description in cursor.description]
+            if len(results) == 1:
+                # Single result - return as dict
+                result_data = dict(zip(column_names, results[0]))
+                conn.close()
+                return json.dumps(result_data, default=str)
+            else:
+                # Multiple results - return as list of dicts
+                result_list = []
+                for result in results:
+                    result_data = dict(zip(column_names, result))
+                    result_list.append(result_data)
+                conn.close()
+                return json.dumps(result_list, default=str)
+        else:
+            conn.close()
+            return json.dumps([])
+            
+    except Exception as e:
+        conn.close()
+        return json.dumps({"error": f"SQL execution error: {str(e)}"})
+
+# Incremental change feed on policy_info
+def get_policy_changes_since(since_seq: int = 0, limit: int = 1000) -> str:
+    """Get policy changes after a changelog sequence number"""
+    try:
+        conn = connect_to_db()
+        try:
+            if not has_table(conn, 'policy_changelog'):
+                return json.dumps({"error": "change feed is not set up - run python Data_Insertion/create_database.py --migrate"})
+            changes = fetch_changes_since(since_seq, limit, conn)
+            latest = latest_change_seq(conn)
+        finally:
+            conn.close()
+        
+        last_seq = changes[-1][0] if changes else max(since_seq, 0)
+        return json.dumps({
+            "changes": [
+                {
+                    "seq": seq,
+                    "policy_number": policy_number,
+                    "operation": operation,
+                    "changed_at": changed_at,
+                    "record": record.to_dict() if record else None
+                }
+                for seq, policy_number, operation, changed_at, record in changes
+            ],
+            "last_seq": last_seq,
+            "has_more": latest > last_seq
+        })
+    except Exception as e:
+        return json.dumps({"error": f"Change feed error: {str(e)}"})
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Latency Analyzer - dead air per conversation turn, by assistant configuration
+
+save_transcript writes a JSON file next to each .txt transcript. It holds
+VAPI's per-message timestamps and the latency-relevant assistant settings
+(LLM, voice, transcriber, response delays). This tool reads those files
+and measures each turn's latency: the time from the end of the
+customer's speech to the start of the agent's reply. It reports
+p50/p95/p99 for each configuration, so settings can be compared on real
+calls. Replies that start before the customer stops (barge-ins) are
+counted separately and left out of the percentiles.
+
+Usage:
+    python latency_analyzer.py
+    python latency_analyzer.py --by voice --by responseDelaySeconds
+    python latency_analyzer.py --folder Customer_transcripts --json
+"""
+
+import os
+import sys
+import glob
+import json
+import hashlib
+import argparse
+
+TRANSCRIPT_FOLDER = "Customer_transcripts"
+AGENT_ROLES = ('bot', 'assistant')
+
+def latency_profile(assistant_config):
+    """Settings that affect turn latency, plus a short fingerprint to group calls by"""
+    model = assistant_config.get('model') or {}
+    voice = assistant_config.get('voice') or {}
+    transcriber = assistant_config.get('transcriber') or {}
+    profile = {
+        'model': f"{model.get('provider', '?')}/{model.get('model', '?')}",
+        'maxTokens': model.get('maxTokens'),
+        'voice': f"{voice.get('provider', '?')}/{voice.get('model', '?')}",
+        'transcriber': f"{transcriber.get('provider', '?')}/{transcriber.get('model', '?')}/{transcriber.get('language', '?')}",
+        'responseDelaySeconds': assistant_config.get('responseDelaySeconds'),
+        'llmRequestDelaySeconds': assistant_config.get('llmRequestDelaySeconds'),
+    }
+    profile['fingerprint'] = hashlib.sha1(json.dumps(profile, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+    return profile
+
+def timed_messages(call_data):
+    """Per-message timing from a VAPI call object (artifact.messages, else top-level messages)"""
+    messages = (call_data.get('artifact') or {}).get('messages') or call_data.get('messages') or []
+    keep = ('role', 'message', 'time', 'endTime', 'secondsFromStart', 'duration')
+    return [{key: message[key] for key in keep if key in message} for message in messages]
+
+def turn_latencies(messages):
+    """Seconds from the end of customer speech to the start of each agent reply (negative = barge-in)"""
+    latencies = []
+    user_end = None
+    for message in sorted(messages, key=lambda m: m.get('time') or 0):
+        role = message.get('role')
+        start = message.get('time')
+        if start is None:
+            continue
+        if role == 'user':
+            end = message.get('endTime') or start + (message.get('duration') or 0)
+            # Several consecutive user segments are one turn; it ends with the last one
+            user_end = end if user_end is None else max(user_end, end)
+        elif role in AGENT_ROLES:
+            if user_end is not None:
+                latencies.append((start - user_end) / 1000)
+            user_end = None
+        # system / tool messages neither start nor end a turn
+    return latencies
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def load_calls(folder=TRANSCRIPT_FOLDER):
+    """Timing files written by save_transcript (raw VAPI call JSON dumps also work)"""
+    calls = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Skipping {path}: {e}")
+            continue
+        if not isinstance(data, dict):
+            continue
+        profile = data.get('assistant_profile')
+        if not profile and isinstance(data.get('assistant'), dict):
+            profile = latency_profile(data['assistant'])  # call created with an inline assistant
+        messages = data['messages'] if isinstance(data.get('messages'), list) else timed_messages(data)
+        calls.append({'path': path, 'profile': profile or {'fingerprint': 'unknown'}, 'messages': messages})
+    return calls
+
+def analyze(calls, group_by=('fingerprint',)):
+    """Latency summary per configuration group, sorted by p95 (worst first)"""
+    groups = {}
+    for call in calls:
+        key = tuple(str(call['profile'].get(field, '?')) for field in group_by)
+        group = groups.setdefault(key, {'calls': 0, 'latencies': [], 'barge_ins': 0, 'profile': call['profile']})
+        group['calls'] += 1
+        for latency in turn_latencies(call['messages']):
+            if latency < 0:
+                group['barge_ins'] += 1
+            else:
+                group['latencies'].append(latency)
+
+    summary = []
+    for key, group in groups.items():
+        latencies = group['latencies']
+        summary.append({
+            'group': dict(zip(group_by, key)),
+            'profile': group['profile'] if group_by == ('fingerprint',) else None,
+            'calls': group['calls'],
+            'turns': len(latencies),
+            'barge_ins': group['barge_ins'],
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3) if latencies else 0.0,
+        })
+    return sorted(summary, key=lambda row: row['p95'], reverse=True)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Turn latency percentiles by assistant configuration")
+    parser.add_argument('--folder', default=TRANSCRIPT_FOLDER, help="Folder with the transcript timing files")
+    parser.add_argument('--by', action='append', help="Profile field to group by (repeatable; default: fingerprint)")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    calls = load_calls(args.folder)
+    summary = analyze(calls, tuple(args.by or ('fingerprint',)))
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return
+
+    print("⏱️  Turn Latency Analyzer")
+    print("=" * 60)
+    if not calls:
+        print(f"❌ No call timing files in {args.folder} (save_transcript writes one per call)")
+        sys.exit(1)
+    print(f"📞 {len(calls)} calls")
+    for row in summary:
+        label = ", ".join(f"{field}={value}" for field, value in row['group'].items())
+        print(f"\n🔧 {label}")
+        profile = row['profile']
+        if profile and profile.get('fingerprint') != 'unknown':
+            print(f"   {profile.get('model')} | {profile.get('voice')} | {profile.get('transcriber')} | "
+                  f"responseDelay {profile.get('responseDelaySeconds')}s, llmDelay {profile.get('llmRequestDelaySeconds')}s")
+        if not row['turns']:
+            print(f"   {row['calls']} calls, no timed turns")
+            continue
+        print(f"   {row['calls']} calls, {row['turns']} turns, {row['barge_ins']} barge-ins")
+        print(f"   p50 {row['p50']:.2f}s  p95 {row['p95']:.2f}s  p99 {row['p99']:.2f}s  "
+              f"(mean {row['mean']:.2f}s, max {row['max']:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Pacing Controller - adaptive concurrent-dial limit (AIMD with an answer-rate cap)
+
+A fixed line count either idles when answer rates drop or floods VAPI
+when they rise. The controller watches the signals the bot already sees:
+- call outcomes from monitor_call (answered / no-answer / failed, from endedReason)
+- VAPI response latency
+- HTTP 429s and 5xx errors
+
+It re-evaluates the dial limit once per window:
+- On congestion the limit is cut multiplicatively. Congestion means any
+  429, too many errors or failed calls, or a median latency over target.
+  The target defaults to latency_factor x the best window median seen
+  (windows with at least min_samples responses), so it follows whatever
+  latency VAPI has when it is not loaded.
+- Otherwise the limit grows by one, but only if the current limit was
+  actually holding dials back.
+- With answered_capacity set (how many live conversations we can take
+  at once), the limit is also capped at capacity / recent answer rate.
+  When answer rates drop, more calls ring at once; when they rise, fewer do.
+
+CampaignPipeline(pacing=...) and VAPIInsuranceBot(pacing=...) feed and
+obey it. The simulate command replays a campaign on
+campaign_simulator's virtual clock, with a VAPI that throttles and slows
+down past its capacity. It compares fixed line counts against the
+controller for tuning.
+
+Usage:
+    python pacing_controller.py simulate --capacity 30 --answer-rate 9-12:0.5,12-14:0.25,14-21:0.45
+    python pacing_controller.py simulate --fixed 10,20,40 --max-limit 60 --limit 5000
+"""
+
+import math
+import time
+import argparse
+import threading
+
+from campaign_simulator import DB_PATH, CampaignSimulation, load_campaign_customers, parse_answer_profile
+
+# monitor_call endedReason values for calls nobody picked up
+NO_ANSWER_REASONS = {
+    'customer-did-not-answer', 'customer-busy', 'voicemail',
+    'customer-did-not-give-microphone-permission', 'twilio-failed-to-connect-call',
+}
+
+def classify_call(call_data):
+    """'answered', 'no_answer' or 'failed' for a monitor_call result (None = monitor timeout)"""
+    if not call_data:
+        return 'failed'
+    reason = (call_data.get('endedReason') or '').lower()
+    if reason in NO_ANSWER_REASONS:
+        return 'no_answer'
+    if call_data.get('status') == 'failed' or 'error' in reason or 'failed' in reason:
+        return 'failed'
+    return 'answered'
+
+class PacingController:
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=50, window_seconds=30.0,
+                 target_latency=None, latency_factor=2.0, min_samples=8, max_error_rate=0.05, max_failure_rate=0.2,
+                 increase=1, decrease=0.7, answered_capacity=None, clock=None):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window_seconds = window_seconds
+        self.target_latency = target_latency
+        self.latency_factor = latency_factor
+        self.min_samples = min_samples
+        self.baseline_latency = None  # lowest window median seen, drifting up slowly so it can recover
+        self.max_error_rate = max_error_rate
+        self.max_failure_rate = max_failure_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.answered_capacity = answered_capacity
+        self.clock = clock or time
+        self.in_flight = 0
+        self.answer_rate = None  # EWMA over answered / (answered + no_answer)
+        self.history = []  # (time, limit, reason) for every change
+        self.totals = {'responses': 0, 'rate_limited': 0, 'errors': 0,
+                       'answered': 0, 'no_answer': 0, 'failed': 0}
+        self._condition = threading.Condition()
+        self._reset_window(self.clock.time())
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._latencies = []
+        self._window = {'responses': 0, 'rate_limited': 0, 'errors': 0, 'answered': 0, 'no_answer': 0, 'failed': 0}
+        self._saturated = False
+
+    # --- signals ---------------------------------------------------------
+
+    def record_response(self, latency, status_code):
+        """One VAPI HTTP attempt (status_code None = connection error / timeout)"""
+        with self._condition:
+            self.totals['responses'] += 1
+            if status_code is not None and status_code < 400:
+                self._latencies.append(latency)  # rejections return fast; they would hide slowdowns
+            self._window['responses'] += 1
+            if status_code == 429:
+                self._window['rate_limited'] += 1
+                self.totals['rate_limited'] += 1
+            elif status_code is None or status_code >= 500:
+                self._window['errors'] += 1
+                self.totals['errors'] += 1
+            self._maybe_adjust()
+
+    def record_outcome(self, outcome):
+        """'answered', 'no_answer' or 'failed' (see classify_call)"""
+        with self._condition:
+            self._window[outcome] += 1
+            self.totals[outcome] += 1
+            if outcome != 'failed':
+                answered = 1.0 if outcome == 'answered' else 0.0
+                self.answer_rate = answered if self.answer_rate is None else 0.95 * self.answer_rate + 0.05 * answered
+            self._maybe_adjust()
+
+    # --- admission -------------------------------------------------------
+
+    def has_capacity(self):
+        """True if another dial may start now; a refusal counts as the limit being reached"""
+        with self._condition:
+            if self.in_flight < self.limit:
+                return True
+            self._saturated = True
+            return False
+
+    def started(self):
+        with self._condition:
+            self.in_flight += 1
+
+    def acquire(self, timeout=None):
+        """Block until a dial slot is free; returns False on timeout"""
+        with self._condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.in_flight >= self.limit:
+                self._saturated = True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # Wake periodically: the limit can also rise on a window boundary
+                self._condition.wait(min(remaining, 1.0) if remaining is not None else 1.0)
+                self._maybe_adjust()
+            self.in_flight += 1
+            return True
+
+    def release(self, outcome=None):
+        """Free a dial slot, optionally recording the call's outcome"""
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._condition.notify()
+        if outcome is not None:
+            self.record_outcome(outcome)
+
+    # --- control law -----------------------------------------------------
+
+    def _maybe_adjust(self):
+        """Called with the lock held; re-evaluate the limit once per window"""
+        now = self.clock.time()
+        if now - self._window_start < self.window_seconds:
+            return
+        window = self._window
+        responses = window['responses']
+        calls = window['answered'] + window['no_answer'] + window['failed']
+        timed = len(self._latencies) >= self.min_samples  # too few samples say nothing about latency
+        median = sorted(self._latencies)[len(self._latencies) // 2] if timed else 0.0
+        reason = None
+        if window['rate_limited']:
+            reason = f"{window['rate_limited']} rate-limited"
+        elif responses and window['errors'] / responses > self.max_error_rate:
+            reason = f"{window['errors']}/{responses} server errors"
+        elif timed and median > self._latency_target():
+            reason = f"median latency {median:.2f}s"
+        elif calls and window['failed'] / calls > self.max_failure_rate:
+            reason = f"{window['failed']}/{calls} calls failed"
+
+        if timed:
+            self.baseline_latency = median if self.baseline_latency is None else min(median, self.baseline_latency * 1.01)
+
+        limit = self.limit
+        if reason and self.in_flight > self.limit:
+            # Dials started under a higher limit are still draining; their
+            # congestion was already answered by the last cut
+            reason = None
+        elif reason:
+            limit = max(self.min_limit, min(limit - 1, int(limit * self.decrease)))
+        elif self._saturated:
+            limit = min(self.max_limit, limit + self.increase)
+            reason = 'limit reached without congestion'
+        if self.answered_capacity and self.answer_rate:
+            cap = max(self.min_limit, math.ceil(self.answered_capacity / max(self.answer_rate, 0.05)))
+            if limit > cap:
+                limit, reason = cap, f"answer-rate cap ({self.answer_rate:.0%} answered)"
+        if limit != self.limit:
+            self.history.append((now, limit, reason))
+            if limit > self.limit:
+                self._condition.notify(limit - self.limit)
+            self.limit = limit
+        self._reset_window(now)
+
+    def _latency_target(self):
+        if self.target_latency is not None:
+            return self.target_latency
+        return float('inf') if self.baseline_latency is None else self.baseline_latency * self.latency_factor
+
+    def snapshot(self):
+        with self._condition:
+            return {'limit': self.limit, 'in_flight': self.in_flight,
+                    'answer_rate': round(self.answer_rate, 3) if self.answer_rate is not None else None,
+                    'changes': len(self.history), **self.totals}
+
+class PacedCampaignSimulation(CampaignSimulation):
+    """CampaignSimulation with a dial limit and a VAPI limited to `capacity` concurrent calls
+
+    capacity is a number or hourly bands ('9-12:40,12-14:15,14-21:30'),
+    e.g. when other campaigns share the VAPI account. Setup latency
+    bends upward as concurrency approaches capacity (x2 at full load). Dials beyond capacity are rejected with a 429. As in the bot's
+    _request, the line waits `retry_seconds` and retries the same dial.
+    pacing=None runs a fixed `lines` limit against the same model.
+    """
+
+    def __init__(self, customers, pacing=None, capacity=None, retry_seconds=5.0, **kwargs):
+        if pacing is not None:
+            kwargs['lines'] = pacing.max_limit
+        super().__init__(customers, **kwargs)
+        self.pacing = pacing
+        self.capacity = parse_answer_profile(str(capacity)) if capacity else None
+        self.retry_seconds = retry_seconds
+        self.stats['rate_limited'] = 0
+        self._backing_off = 0  # lines waiting out a 429
+        self.limit_trace = []  # (simulated hour, limit)
+        if pacing is not None:
+            pacing.clock = self.clock
+            pacing._reset_window(self.clock.time())
+
+    def _in_flight(self):
+        return self.lines - self.free_lines
+
+    def _utilization(self):
+        if not self.capacity:
+            return 0.0
+        capacity = max(1.0, self.capacity(self._datetime(self.clock.time()).hour))
+        return (self._in_flight() - self._backing_off) / capacity
+
+    def _has_free_line(self):
+        if self.free_lines <= 0:
+            return False
+        return self.pacing is None or self.pacing.has_capacity()
+
+    def _setup_latency(self, now):
+        latency = super()._setup_latency(now) * (1.0 + min(1.0, self._utilization()) ** 8)
+        if self.pacing is not None:
+            self.pacing.record_response(latency, 201)
+        return latency
+
+    def _start_call(self, index, now):
+        if self.pacing is not None:
+            self.pacing.started()
+            if not self.limit_trace or self.limit_trace[-1][1] != self.pacing.limit:
+                self.limit_trace.append((round(now / 3600, 2), self.pacing.limit))
+        self._dial(index)
+
+    def _dial(self, index):
+        now = self.clock.time()
+        # Only calls actually connected to VAPI count against its capacity
+        if self._utilization() > 1.0:
+            self.stats['rate_limited'] += 1
+            if self.pacing is not None:
+                self.pacing.record_response(0.2, 429)
+            self._backing_off += 1
+            self.busy_seconds += self.retry_seconds
+            self.clock.schedule(now + self.retry_seconds, self._retry, index)
+            return
+        super()._start_call(index, now)
+
+    def _retry(self, index):
+        self._backing_off -= 1
+        self._dial(index)
+
+    def _finish_call(self, index, outcome):
+        if self.pacing is not None:
+            self.pacing.release({'answered': 'answered', 'timeout': 'failed'}.get(outcome, 'no_answer'))
+        super()._finish_call(index, outcome)
+
+def simulate(customers, pacing=None, **kwargs):
+    simulation = PacedCampaignSimulation(customers, pacing=pacing, **kwargs)
+    forecast = simulation.run()
+    forecast['connected_per_hour'] = round(forecast['answered'] / forecast['calling_hours'], 1) if forecast['calling_hours'] else 0.0
+    forecast['limit_trace'] = simulation.limit_trace
+    return forecast
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Adaptive dial pacing")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sim = commands.add_parser('simulate', help="Compare fixed line counts with the controller on a virtual clock")
+    sim.add_argument('--db', default=DB_PATH)
+    sim.add_argument('--limit', type=int, help="Only simulate the first N overdue policies")
+    sim.add_argument('--capacity', default='9-12:40,12-14:15,14-18:30,18-21:40',
+                     help="Concurrent calls VAPI accepts: a number or hourly bands")
+    sim.add_argument('--answered-capacity', type=int, help="Live conversations we can take at once (answer-rate cap)")
+    sim.add_argument('--answer-rate', default='9-12:0.5,12-14:0.25,14-18:0.45,18-21:0.6')
+    sim.add_argument('--fixed', default='10,30,60', help="Fixed line counts to compare")
+    sim.add_argument('--initial-limit', type=int, default=4)
+    sim.add_argument('--max-limit', type=int, default=100)
+    sim.add_argument('--window', type=float, default=30.0, help="Seconds between limit adjustments")
+    sim.add_argument('--decrease', type=float, default=0.7)
+    sim.add_argument('--target-latency', type=float, help="Absolute median latency limit (default: latency factor x best seen)")
+    sim.add_argument("--latency-factor", type=float, default=2.0)
+    sim.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    customers = load_campaign_customers(args.db, args.limit)
+    if not customers:
+        print("❌ No overdue customers found!")
+        return
+    common = dict(capacity=args.capacity, answer_rate=args.answer_rate, seed=args.seed)
+
+    print("🎚️  Pacing Simulation")
+    print("=" * 60)
+    print(f"👥 {len(customers):,} customers, VAPI capacity {args.capacity} concurrent calls")
+    for lines in [int(value) for value in args.fixed.split(',') if value]:
+        result = simulate(customers, lines=lines, **common)
+        print(f"   📞 fixed {lines:>3}: {result['connected_per_hour']:>7,.1f} connected/h, "
+              f"{result['rate_limited']:,} rate-limited, done in {result['calling_hours']} calling hours")
+    pacing = PacingController(initial_limit=args.initial_limit, max_limit=args.max_limit,
+                              window_seconds=args.window, decrease=args.decrease,
+                              target_latency=args.target_latency, latency_factor=args.latency_factor,
+                              answered_capacity=args.answered_capacity)
+    result = simulate(customers, pacing=pacing, **common)
+    limits = [limit for _, limit in result['limit_trace']]
+    print(f"   🎚️  adaptive : {result['connected_per_hour']:>7,.1f} connected/h, "
+          f"{result['rate_limited']:,} rate-limited, done in {result['calling_hours']} calling hours")
+    if limits:
+        print(f"      limit ranged {min(limits)}-{max(limits)} over {len(pacing.history)} adjustments")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Payment Ingester - reconcile payments into policy_info as they arrive
+
+Tails *.csv / *.jsonl files in an inbox directory (and an in-process
+queue fed through submit()), applies payments to policy_info in batched
+transactions and drops paid customers from a running OverdueQueue, so a
+customer who just paid is not dialed again.
+
+Each payment needs policy_number and amount; payment_id and paid_at are
+optional. Payments are recorded in policy_payments keyed by payment_id,
+so replaying a file never double-counts. A file line without one gets
+an id from its file and position. A queued payment without one gets a
+random id, so only an explicit payment_id makes resubmitting it safe.
+
+The read position of each inbox file is stored with its inode. A file
+that is replaced (new inode) or truncated under the same name is read
+again from the start, under a new generation, so its lines get new ids.
+
+Usage:
+    python payment_ingester.py --inbox payments_inbox
+    python payment_ingester.py --inbox payments_inbox --once
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import argparse
+from datetime import datetime
+
+import insurance_data
+
+PAYMENTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS policy_payments (
+        payment_id TEXT PRIMARY KEY,
+        policy_number TEXT NOT NULL,
+        amount REAL NOT NULL,
+        paid_at TEXT,
+        source TEXT,
+        result TEXT NOT NULL,
+        applied_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_policy_payments_policy ON policy_payments (policy_number);
+    CREATE TABLE IF NOT EXISTS payment_feed_offsets (
+        source TEXT PRIMARY KEY,
+        offset INTEGER NOT NULL,
+        inode INTEGER,
+        generation INTEGER NOT NULL DEFAULT 0
+    );
+"""
+
+# Applied in SQL so concurrent writers never lose an update
+APPLY_PAYMENT_SQL = """
+    UPDATE policy_info
+    SET outstanding_amount = MAX(outstanding_amount - :amount, 0),
+        total_premium_paid = total_premium_paid + :amount,
+        status = CASE WHEN outstanding_amount - :amount <= 0 THEN 'Active' ELSE status END
+    WHERE policy_number = :policy_number
+    RETURNING outstanding_amount, status
+"""
+
+FEED_EXTENSIONS = ('.csv', '.jsonl')
+
+def ensure_payment_tables(conn):
+    """Create the payment ledger and feed offset tables if missing"""
+    conn.executescript(PAYMENTS_SCHEMA)
+    # Offsets tables created before files were tracked by inode
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(payment_feed_offsets)")}
+    if 'inode' not in columns:
+        conn.execute("ALTER TABLE payment_feed_offsets ADD COLUMN inode INTEGER")
+    if 'generation' not in columns:
+        conn.execute("ALTER TABLE payment_feed_offsets ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+
+def parse_payment(data, default_id=None, source=None):
+    """Normalise one payment mapping; raises ValueError on bad input"""
+    policy_number = str(data.get('policy_number') or '').strip()
+    if not policy_number:
+        raise ValueError("payment without policy_number")
+    amount = float(str(data.get('amount', '')).replace(',', '').replace('₹', '').strip())
+    if amount <= 0:
+        raise ValueError(f"non-positive amount {amount} for {policy_number}")
+    payment_id = str(data.get('payment_id') or default_id or '').strip()
+    if not payment_id:
+        raise ValueError(f"payment for {policy_number} has no payment_id")
+    return {
+        'payment_id': payment_id,
+        'policy_number': policy_number,
+        'amount': amount,
+        'paid_at': data.get('paid_at') or datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+    }
+
+class PaymentIngester:
+    def __init__(self, inbox=None, db_path=None, campaign_queue=None, batch_size=500, poll_interval=1.0):
+        # Payments applied to DATABASE_PATH would never reach the shards the MCP tools read
+        insurance_data.require_unsharded("The payment ingester")
+        self.inbox = inbox
+        self.db_path = db_path or insurance_data.DB_PATH
+        self.campaign_queue = campaign_queue
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.pending = queue.Queue()
+        self.stats = {'applied': 0, 'duplicates': 0, 'unmatched': 0, 'invalid': 0, 'paid_in_full': 0, 'batches': 0}
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Database file '{self.db_path}' not found!")
+        # Autocommit mode; batches open their own BEGIN IMMEDIATE transaction
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        ensure_payment_tables(self.conn)
+        if inbox:
+            os.makedirs(inbox, exist_ok=True)
+
+    def submit(self, payment):
+        """Queue a payment mapping from another thread (local queue feed)"""
+        self.pending.put(payment)
+
+    def _load_offsets(self):
+        """{file name: (offset, inode, generation)}"""
+        return {source: (offset, inode, generation) for source, offset, inode, generation in
+                self.conn.execute("SELECT source, offset, inode, generation FROM payment_feed_offsets")}
+
+    def _read_new_lines(self, path, offset):
+        """Complete lines appended since offset, as (line_end_offset, text)"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        lines = []
+        position = offset
+        for raw in data.splitlines(keepends=True):
+            if not raw.endswith(b'\n'):
+                break  # writer is mid-line; pick it up next poll
+            position += len(raw)
+            lines.append((position, raw.decode('utf-8').strip()))
+        return lines
+
+    def scan_inbox(self):
+        """New payments from the inbox files as (payment, source, (offset, inode, generation)) tuples"""
+        if not self.inbox or not os.path.isdir(self.inbox):
+            return []
+        offsets = self._load_offsets()
+        found = []
+        for name in sorted(os.listdir(self.inbox)):
+            if not name.endswith(FEED_EXTENSIONS):
+                continue
+            path = os.path.join(self.inbox, name)
+            stat = os.stat(path)
+            offset, inode, generation = offsets.get(name, (0, None, 0))
+            if offset and (stat.st_size < offset or (inode is not None and inode != stat.st_ino)):
+                print(f"🔄 {name} was replaced or truncated - reading it again from the start")
+                offset, generation = 0, generation + 1
+                found.append((None, name, (0, stat.st_ino, generation)))
+            if stat.st_size <= offset:
+                continue
+            # Lines of a re-read file must not collide with the ids its old lines got
+            prefix = name if generation == 0 else f"{name}~{generation}"
+            header = None
+            if name.endswith('.csv'):
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    first = f.readline()
+                if not first.endswith('\n'):
+                    continue
+                header = next(csv.reader([first]))
+                offset = max(offset, len(first.encode('utf-8')))
+            for end, line in self._read_new_lines(path, offset):
+                position = (end, stat.st_ino, generation)
+                if not line:
+                    found.append((None, name, position))
+                    continue
+                try:
+                    data = dict(zip(header, next(csv.reader([line])))) if header else json.loads(line)
+                    found.append((parse_payment(data, default_id=f"{prefix}:{end}", source=name), name, position))
+                except (ValueError, StopIteration) as e:
+                    print(f"⚠️  Skipping bad payment line in {name}: {e}")
+                    self.stats['invalid'] += 1
+                    found.append((None, name, position))
+        return found
+
+    def drain_submitted(self):
+        found = []
+        while True:
+            try:
+                data = self.pending.get_nowait()
+            except queue.Empty:
+                return found
+            try:
+                # No natural position to derive an id from, unlike a file line
+                found.append((parse_payment(data, default_id=f"queue:{uuid.uuid4().hex}", source='queue'), None, None))
+            except ValueError as e:
+                print(f"⚠️  Skipping bad queued payment: {e}")
+                self.stats['invalid'] += 1
+
+    def apply_batch(self, items):
+        """Apply payments and advance feed offsets in one transaction; returns policies paid in full"""
+        paid_in_full = []
+        changed = False
+        offsets = {}
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for payment, source, position in items:
+                if source is not None:
+                    offsets[source] = position
+                if payment is None:
+                    continue
+                row = self.conn.execute(
+                    "SELECT 1 FROM policy_payments WHERE payment_id = ?", (payment['payment_id'],)
+                ).fetchone()
+                if row:
+                    self.stats['duplicates'] += 1
+                    continue
+                updated = self.conn.execute(APPLY_PAYMENT_SQL, payment).fetchone()
+                result = 'applied' if updated else 'unmatched'
+                self.conn.execute(
+                    "INSERT INTO policy_payments (payment_id, policy_number, amount, paid_at, source, result) "
+                    "VALUES (:payment_id, :policy_number, :amount, :paid_at, :source, :result)",
+                    dict(payment, result=result)
+                )
+                if not updated:
+                    print(f"⚠️  Payment {payment['payment_id']} for unknown policy {payment['policy_number']}")
+                    self.stats['unmatched'] += 1
+                    continue
+                changed = True
+                self.stats['applied'] += 1
+                if updated[0] <= 0:
+                    paid_in_full.append(payment['policy_number'])
+            self.conn.executemany(
+                "INSERT INTO payment_feed_offsets (source, offset, inode, generation) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET offset = excluded.offset, inode = excluded.inode, "
+                "generation = excluded.generation",
+                [(source, *position) for source, position in offsets.items()]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.stats['batches'] += 1
+        self.stats['paid_in_full'] += len(paid_in_full)
+
+        if self.campaign_queue is not None and changed:
+            for policy_number in paid_in_full:
+                self.campaign_queue.discard(policy_number)
+            # Partial payments change amounts/order; the change feed carries them
+            self.campaign_queue.refresh()
+        return paid_in_full
+
+    def poll_once(self):
+        """Ingest everything currently available; returns the number of payments applied"""
+        before = self.stats['applied']
+        items = self.drain_submitted() + self.scan_inbox()
+        for start in range(0, len(items), self.batch_size):
+            paid = self.apply_batch(items[start:start + self.batch_size])
+            for policy_number in paid:
+                print(f"💰 {policy_number} paid in full - removed from campaign")
+        return self.stats['applied'] - before
+
+    def run(self, stop_event=None):
+        """Poll until stop_event is set (or forever)"""
+        print(f"👀 Watching {self.inbox or 'local queue'} for payments (every {self.poll_interval}s)")
+        while stop_event is None or not stop_event.is_set():
+            try:
+                self.poll_once()
+            except sqlite3.Error as e:
+                print(f"❌ Error applying payments: {e}")
+            if stop_event is not None:
+                stop_event.wait(self.poll_interval)
+            else:
+                time.sleep(self.poll_interval)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Apply payment feeds to policy_info")
+    parser.add_argument('--inbox', default='payments_inbox', help="Directory of *.csv / *.jsonl payment files")
+    parser.add_argument('--db', help="Database path (default: DATABASE_PATH or insurance_db.sqlite)")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--once', action='store_true', help="Ingest what is there now and exit")
+    args = parser.parse_args()
+
+    print("💳 Payment Ingester")
+    print("=" * 60)
+    try:
+        ingester = PaymentIngester(args.inbox, args.db, batch_size=args.batch_size, poll_interval=args.poll_interval)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    try:
+        if args.once:
+            applied = ingester.poll_once()
+            print(f"✅ Applied {applied} payments")
+        else:
+            ingester.run()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping payment ingester")
+    finally:
+        print(f"📊 {ingester.stats}")
+        ingester.close()
+
+if __name__ == "__main__":
+    main()
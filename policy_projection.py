@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Policy Projection - continue vs discontinue figures for every policy
+
+The calling script used to quote today's fund value as the amount "you
+will receive at maturity". This module projects, per policy:
+
+    continue     pay the arrears now and every premium to maturity; the
+                 fund grows at CONTINUE_RETURN less EFFECTIVE_CHARGE and
+                 earns loyalty additions of LOYALTY_RATE a year
+    discontinue  the fund moves to the Discontinued Life Fund at
+                 DISCONTINUED_RETURN until the lock-in ends (paid out
+                 then, or now if the lock-in is over); life cover and
+                 loyalty additions stop
+
+The book has no premium or term columns, so the annual premium is
+total_premium_paid divided by the premiums paid so far (whole years from
+start to the current due date), and every policy has the script's
+POLICY_TERM_YEARS term. Policies already past it are projected one year
+ahead.
+
+build_projections() runs the whole book in one pass, vectorised with
+NumPy (a pure-Python loop when NumPy is not installed), and caches the
+results in policy_projections. ProjectionCache serves them to the
+script generator and recomputes any policy whose inputs have changed
+since the cache was built.
+
+Usage:
+    python policy_projection.py build
+    python policy_projection.py show PN1000
+    python policy_projection.py bench --rows 100000
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import random
+import hashlib
+import struct
+import importlib.util
+import sqlite3
+import argparse
+import threading
+import collections
+from datetime import date, timedelta
+
+# NumPy is optional; the pure-Python loop gives the same figures, just slower.
+# It is imported only on the vectorised path: the script generator imports
+# this module at bot start-up, and loading NumPy there costs ~60 ms
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+def _numpy():
+    import numpy
+    return numpy
+
+from insurance_data import connect_to_db, connect_for_reads, _parse_date
+
+# Projection assumptions; the return and charge figures are the ones the script already quotes
+POLICY_TERM_YEARS = int(os.getenv('POLICY_TERM_YEARS', '10'))
+LOCK_IN_YEARS = 5
+CONTINUE_RETURN = float(os.getenv('PROJECTION_CONTINUE_RETURN', '0.0545'))  # Bond Fund, 5-year annualised
+EFFECTIVE_CHARGE = float(os.getenv('PROJECTION_EFFECTIVE_CHARGE', '0.0161'))
+DISCONTINUED_RETURN = float(os.getenv('PROJECTION_DISCONTINUED_RETURN', '0.043'))  # Discontinued Life Fund
+LOYALTY_RATE = float(os.getenv('PROJECTION_LOYALTY_RATE', '0.0025'))  # of the fund, credited yearly
+
+ASSUMPTIONS = {
+    'term_years': POLICY_TERM_YEARS, 'lock_in_years': LOCK_IN_YEARS,
+    'continue_return': CONTINUE_RETURN, 'effective_charge': EFFECTIVE_CHARGE,
+    'discontinued_return': DISCONTINUED_RETURN, 'loyalty_rate': LOYALTY_RATE,
+}
+# Seeds every inputs key, so rows cached under other assumptions never match
+MODEL_SEED = int(hashlib.sha1(json.dumps(ASSUMPTIONS, sort_keys=True).encode()).hexdigest()[:16], 16)
+
+PROJECTION_MAX_AGE_DAYS = 30  # remaining years shift as time passes; recompute older rows
+PROJECTION_CACHE_SIZE = int(os.getenv('PROJECTION_CACHE_SIZE', '4096'))
+
+INPUT_COLUMNS = ('policy_number', 'policy_start_date', 'premium_due_date', 'outstanding_amount',
+                 'total_premium_paid', 'sum_assured', 'fund_value')
+PROJECTION_COLUMNS = ('annual_premium', 'remaining_years', 'maturity_year', 'projected_maturity_value',
+                      'discontinued_value', 'premiums_to_pay', 'loyalty_additions', 'lost_cover')
+
+POLICY_PROJECTIONS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS policy_projections (
+        policy_number TEXT PRIMARY KEY,
+        inputs_key INTEGER NOT NULL,
+        as_of TEXT NOT NULL,
+        annual_premium REAL NOT NULL,
+        remaining_years INTEGER NOT NULL,
+        maturity_year INTEGER NOT NULL,
+        projected_maturity_value REAL NOT NULL,
+        discontinued_value REAL NOT NULL,
+        premiums_to_pay REAL NOT NULL,
+        loyalty_additions REAL NOT NULL,
+        lost_cover REAL NOT NULL
+    );
+"""
+
+def ensure_policy_projections(conn):
+    """Create the policy_projections table if missing"""
+    conn.executescript(POLICY_PROJECTIONS_SCHEMA)
+
+# Inputs keys are a 64-bit FNV-1a style mix of the date day numbers and the
+# amounts' IEEE bits: cheap to compute per record and vectorisable for the book
+_FNV_PRIME = 0x100000001b3
+_MASK = (1 << 64) - 1
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def inputs_key(start, due, outstanding, total_paid, sum_assured, fund_value):
+    """Signed 64-bit fingerprint of everything a projection depends on (apart from today's date)
+
+    start/due are datetime.date or None; amounts are floats.
+    """
+    key = MODEL_SEED
+    for day in (start, due):
+        value = day.toordinal() - _EPOCH_ORDINAL if day else -1
+        key = ((key ^ (value & _MASK)) * _FNV_PRIME) & _MASK
+    for amount in (outstanding, total_paid, sum_assured, fund_value):
+        bits = struct.unpack('<Q', struct.pack('<d', float(amount or 0.0)))[0]
+        key = ((key ^ bits) * _FNV_PRIME) & _MASK
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+def record_inputs_key(record):
+    return inputs_key(record.policy_start_date, record.premium_due_date, record.outstanding_amount,
+                      record.total_premium_paid, record.sum_assured, record.fund_value)
+
+def _inputs_keys(start_days, due_days, amounts):
+    """inputs_key over whole columns (days as float64 with NaN for unknown dates)"""
+    np = _numpy()
+    keys = np.full(len(start_days), MODEL_SEED, dtype='uint64')
+    prime = np.uint64(_FNV_PRIME)
+    for days in (start_days, due_days):
+        keys = (keys ^ np.where(np.isnan(days), -1, days).astype('int64').view('uint64')) * prime
+    for amount in amounts:
+        keys = (keys ^ amount.view('uint64')) * prime
+    return keys.view('int64')
+
+# --- projection engines ----------------------------------------------------
+
+def _growth():
+    return (1 + CONTINUE_RETURN) * (1 - EFFECTIVE_CHARGE) - 1
+
+def project_arrays(start_days, due_days, outstanding, total_paid, sum_assured, fund_value, today_days):
+    """Vectorised projection over NumPy arrays (dates as days since the epoch, NaN if unknown)
+
+    Returns a dict of arrays keyed by PROJECTION_COLUMNS.
+    """
+    np = _numpy()
+    start_days = np.where(np.isnan(start_days), today_days, start_days)
+    due_days = np.where(np.isnan(due_days), today_days, due_days)
+    years_elapsed = np.maximum(0.0, (today_days - start_days) / 365.25)
+    premiums_paid = np.maximum(1.0, np.round((due_days - start_days) / 365.25))
+    premium = total_paid / premiums_paid
+    remaining = np.maximum(1.0, np.ceil(POLICY_TERM_YEARS - years_elapsed - 1e-9))
+
+    growth = _growth()
+    fund = fund_value + outstanding
+    loyalty = np.zeros_like(fund)
+    for year in range(1, int(remaining.max(initial=1)) + 1):
+        active = year <= remaining
+        grown = fund * (1 + growth)
+        credit = grown * LOYALTY_RATE
+        grown = grown + credit
+        # The next premium goes in at the start of every later policy year
+        grown = grown + np.where(year < remaining, premium, 0.0)
+        fund = np.where(active, grown, fund)
+        loyalty = loyalty + np.where(active, credit, 0.0)
+
+    years_to_lock_in = np.maximum(0.0, LOCK_IN_YEARS - years_elapsed)
+    discontinued = fund_value * (1 + DISCONTINUED_RETURN) ** years_to_lock_in
+
+    return {
+        'annual_premium': premium,
+        'remaining_years': remaining,
+        'maturity_year': date.fromordinal(int(today_days) + _EPOCH_ORDINAL).year + remaining,
+        'projected_maturity_value': fund,
+        'discontinued_value': discontinued,
+        'premiums_to_pay': outstanding + premium * (remaining - 1),
+        'loyalty_additions': loyalty,
+        'lost_cover': sum_assured,
+    }
+
+def project_one(start, due, outstanding, total_paid, sum_assured, fund_value, today):
+    """Pure-Python projection of one policy (dates as datetime.date or None)"""
+    start = start or today
+    due = due or today
+    years_elapsed = max(0.0, (today - start).days / 365.25)
+    premiums_paid = max(1.0, float(round((due - start).days / 365.25)))
+    premium = total_paid / premiums_paid
+    remaining = max(1, math.ceil(POLICY_TERM_YEARS - years_elapsed - 1e-9))
+
+    growth = _growth()
+    fund = fund_value + outstanding
+    loyalty = 0.0
+    for year in range(1, remaining + 1):
+        fund *= 1 + growth
+        credit = fund * LOYALTY_RATE
+        fund += credit
+        loyalty += credit
+        if year < remaining:
+            fund += premium
+
+    discontinued = fund_value * (1 + DISCONTINUED_RETURN) ** max(0.0, LOCK_IN_YEARS - years_elapsed)
+    return {
+        'annual_premium': premium,
+        'remaining_years': remaining,
+        'maturity_year': today.year + remaining,
+        'projected_maturity_value': fund,
+        'discontinued_value': discontinued,
+        'premiums_to_pay': outstanding + premium * (remaining - 1),
+        'loyalty_additions': loyalty,
+        'lost_cover': sum_assured,
+    }
+
+def _rounded(projection):
+    """Whole rupees and whole years, as stored and quoted"""
+    return {key: int(round(value)) if key in ('remaining_years', 'maturity_year') else round(float(value))
+            for key, value in projection.items()}
+
+def _date_days(values):
+    """ISO date strings (or None) -> float64 days since the epoch, NaN where unparseable"""
+    np = _numpy()
+    try:
+        dates = np.array(values, dtype='datetime64[D]')
+    except ValueError:
+        parsed = [_parse_date(value) for value in values]
+        return np.array([d.toordinal() - _EPOCH_ORDINAL if d else np.nan for d in parsed], dtype='float64')
+    days = dates.astype('int64').astype('float64')
+    days[np.isnat(dates)] = np.nan
+    return days
+
+def project_rows(rows, today=None, use_numpy=None):
+    """Project INPUT_COLUMNS tuples
+
+    Returns (policy_number, inputs_key, *PROJECTION_COLUMNS) tuples, ready
+    for policy_projections.
+    """
+    today = today or date.today()
+    use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+    if not rows:
+        return []
+    if not use_numpy:
+        projected = []
+        for policy_number, start, due, *amounts in rows:
+            start, due = _parse_date(start), _parse_date(due)
+            amounts = [amount or 0.0 for amount in amounts]
+            values = _rounded(project_one(start, due, *amounts, today))
+            projected.append((policy_number, inputs_key(start, due, *amounts),
+                              *(values[name] for name in PROJECTION_COLUMNS)))
+        return projected
+
+    np = _numpy()
+    columns = list(zip(*rows))
+    start_days, due_days = _date_days(list(columns[1])), _date_days(list(columns[2]))
+    amounts = [np.nan_to_num(np.array(column, dtype='float64')) for column in columns[3:]]
+    arrays = project_arrays(start_days, due_days, *amounts, today_days=float(today.toordinal() - _EPOCH_ORDINAL))
+    return list(zip(columns[0], _inputs_keys(start_days, due_days, amounts).tolist(),
+                    *(np.rint(arrays[name]).astype('int64').tolist() for name in PROJECTION_COLUMNS)))
+
+def project_record(record, today=None):
+    """Projection for one PolicyRecord (pure Python; no NumPy start-up for a single policy)"""
+    return _rounded(project_one(record.policy_start_date, record.premium_due_date,
+                                record.outstanding_amount, record.total_premium_paid,
+                                record.sum_assured, record.fund_value, today or date.today()))
+
+# --- book-wide pass and cache ----------------------------------------------
+
+def build_projections(conn=None, batch_size=50000, today=None, use_numpy=None):
+    """Project every policy in the book and replace the cached rows; returns run stats"""
+    own = conn is None
+    conn = conn or connect_to_db()
+    today = today or date.today()
+    as_of = today.isoformat()
+    started = time.perf_counter()
+    policies = 0
+    compute_seconds = 0.0
+    try:
+        ensure_policy_projections(conn)
+        reader = conn.cursor()
+        reader.row_factory = None
+        reader.execute(f"SELECT {', '.join(INPUT_COLUMNS)} FROM policy_info")
+        with conn:
+            conn.execute("DELETE FROM policy_projections")
+            while True:
+                rows = reader.fetchmany(batch_size)
+                if not rows:
+                    break
+                computed = time.perf_counter()
+                projected = project_rows(rows, today, use_numpy)
+                compute_seconds += time.perf_counter() - computed
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO policy_projections (as_of, policy_number, inputs_key, "
+                    f"{', '.join(PROJECTION_COLUMNS)}) VALUES ({', '.join('?' * (3 + len(PROJECTION_COLUMNS)))})",
+                    [(as_of, *row) for row in projected]
+                )
+                policies += len(rows)
+    finally:
+        if own:
+            conn.close()
+    engine = 'numpy' if (NUMPY_AVAILABLE if use_numpy is None else use_numpy) else 'python'
+    return {'policies': policies, 'engine': engine,
+            'compute_seconds': round(compute_seconds, 4), 'total_seconds': round(time.perf_counter() - started, 4)}
+
+def fetch_projection(policy_number, conn=None):
+    """Cached projection row for a policy as a dict (with inputs_key and as_of), or None"""
+    own = conn is None
+    conn = conn or connect_to_db()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            row = cursor.execute(
+                f"SELECT inputs_key, as_of, {', '.join(PROJECTION_COLUMNS)} FROM policy_projections "
+                f"WHERE policy_number = ?", (policy_number,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None  # table not built yet
+        if row is None:
+            return None
+        return dict(zip(('inputs_key', 'as_of') + PROJECTION_COLUMNS, row))
+    finally:
+        if own:
+            conn.close()
+
+class ProjectionCache:
+    """Projections for script rendering: memory, then policy_projections, then computed
+
+    A cached row is used only if its inputs key matches the record being
+    rendered and it is under PROJECTION_MAX_AGE_DAYS old, so a payment or
+    fund update since the last build never shows an out-of-date figure.
+    """
+    def __init__(self, db_path=None, max_entries=PROJECTION_CACHE_SIZE):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()  # policy_number -> (inputs_key, as_of, projection)
+        self._lock = threading.Lock()
+        self._table_missing = False
+        self.stats = {'memory_hits': 0, 'table_hits': 0, 'computed': 0}
+
+    def get(self, record, today=None):
+        today = today or date.today()
+        key = record_inputs_key(record)
+        oldest = (today - timedelta(days=PROJECTION_MAX_AGE_DAYS)).isoformat()
+        with self._lock:
+            entry = self._entries.get(record.policy_number)
+            if entry and entry[0] == key and entry[1] >= oldest:
+                self._entries.move_to_end(record.policy_number)
+                self.stats['memory_hits'] += 1
+                return entry[2]
+
+        projection = None
+        as_of = today.isoformat()
+        if not self._table_missing:
+            try:
+                conn = connect_for_reads(self.db_path, records=False)
+                try:
+                    row = fetch_projection(record.policy_number, conn)
+                finally:
+                    conn.close()
+            except Exception:
+                row = None
+            if row is None and not self._has_table():
+                self._table_missing = True
+            if row and row['inputs_key'] == key and row['as_of'] >= oldest:
+                as_of = row['as_of']
+                projection = {name: int(row[name]) for name in PROJECTION_COLUMNS}
+        with self._lock:
+            if projection is None:
+                projection = project_record(record, today)
+                self.stats['computed'] += 1
+            else:
+                self.stats['table_hits'] += 1
+            self._entries[record.policy_number] = (key, as_of, projection)
+            self._entries.move_to_end(record.policy_number)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return projection
+
+    def _has_table(self):
+        try:
+            conn = connect_for_reads(self.db_path, records=False)
+            try:
+                return conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'policy_projections'"
+                ).fetchone() is not None
+            finally:
+                conn.close()
+        except Exception:
+            return False
+
+# --- CLI -------------------------------------------------------------------
+
+def _synthetic_rows(count, seed=7):
+    rng = random.Random(seed)
+    today = date.today()
+    rows = []
+    for i in range(count):
+        start = today - timedelta(days=rng.randint(365, 14 * 365))
+        due = today - timedelta(days=rng.randint(0, 400))
+        premium = rng.uniform(2000, 60000)
+        rows.append((f"PN{i}", start.isoformat(), due.isoformat(), premium * rng.choice((0, 1, 2)),
+                     premium * rng.randint(1, 12), premium * rng.uniform(10, 60), premium * rng.uniform(2, 15)))
+    return rows
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Continue vs discontinue projections per policy")
+    parser.add_argument('--python', action='store_true', help="Use the pure-Python engine even if NumPy is installed")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Project the whole book into policy_projections")
+    build.add_argument('--batch-size', type=int, default=50000)
+    show = commands.add_parser('show', help="Projection for one policy")
+    show.add_argument('policy_number')
+    bench = commands.add_parser('bench', help="Time both engines on synthetic policies")
+    bench.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+    use_numpy = False if args.python else None
+
+    print("📈 Policy Projection")
+    print("=" * 60)
+    try:
+        if args.command == 'build':
+            stats = build_projections(batch_size=args.batch_size, use_numpy=use_numpy)
+            print(f"✅ {stats['policies']} policies projected with {stats['engine']} in "
+                  f"{stats['compute_seconds']:.3f}s ({stats['total_seconds']:.3f}s including the database)")
+        elif args.command == 'show':
+            from insurance_data import fetch_record_by_policy
+            record = fetch_record_by_policy(args.policy_number)
+            if record is None:
+                print(f"❌ Policy {args.policy_number} not found")
+                sys.exit(1)
+            print(json.dumps({'policy_number': record.policy_number, **ProjectionCache().get(record),
+                              'assumptions': ASSUMPTIONS}, indent=2))
+        else:
+            if not NUMPY_AVAILABLE:
+                print("⚠️  NumPy not installed; timing the pure-Python engine only")
+            rows = _synthetic_rows(args.rows)
+            engines = [False] + ([True] if NUMPY_AVAILABLE else [])
+            results = {}
+            for engine in engines:
+                started = time.perf_counter()
+                results[engine] = project_rows(rows, use_numpy=engine)
+                elapsed = time.perf_counter() - started
+                print(f"⏱️  {'numpy' if engine else 'python'}: {args.rows} policies in {elapsed:.3f}s "
+                      f"({args.rows / elapsed:,.0f}/s)")
+            if len(results) == 2:
+                differing = sum(1 for a, b in zip(results[False], results[True])
+                                if a[1] != b[1] or any(abs(x - y) > 1 for x, y in zip(a[2:], b[2:])))
+                print(f"🔍 {differing} policies differ by more than one rupee between engines")
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
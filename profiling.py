@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Profiling - opt-in CPU, memory and stage timing for the bot, script generator and MCP server
+
+Run an entry point with --profile to record one report folder per run:
+    profiles/<entry>-<YYYYmmdd-HHMMSS>-<pid>/
+        cpu.pstats       cProfile of the main thread (snakeviz, pstats)
+        stacks.folded    sampled stacks of every thread (flamegraph.pl, speedscope)
+        report.json      wall-clock stages, top functions, top allocations
+
+Code marks its stages with `with stage("http.POST /call"):`. With profiling
+off, stage() returns a shared no-op object, and profiled() returns the
+function unchanged. That keeps the cost when off within
+OFF_OVERHEAD_BUDGET_NS per stage; `python profiling.py overhead` checks
+it on the current machine.
+
+Usage:
+    python vapi_insurance_bot.py --mock --profile
+    python customer_script_generator.py --profile
+    python insurance_mcp_server.py --profile
+    python profiling.py overhead
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+from datetime import datetime
+
+# cProfile, pstats, tracemalloc and argparse are imported only once
+# profiling is switched on: the bot imports this module at start-up
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+OFF_OVERHEAD_BUDGET_NS = 1000  # cost of one disabled stage() block
+TOP_N = 30
+
+_active = None  # the running Profiler, if any
+
+class _NullStage:
+    """Shared no-op context manager returned while profiling is off"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record_stage(self.name, time.perf_counter() - self.start)
+        return False
+
+def stage(name):
+    """Time one stage of the run (no-op unless profiling is on)"""
+    profiler = _active
+    if profiler is None:
+        return NULL_STAGE
+    return _Stage(profiler, name)
+
+def record_stage(name, seconds):
+    """Add an externally timed stage (no-op unless profiling is on)"""
+    profiler = _active
+    if profiler is not None:
+        profiler.record_stage(name, seconds)
+
+def profiled(fn=None, name=None):
+    """Decorator timing every call of fn as a stage; fn is returned as-is when profiling is off at decoration time"""
+    if fn is None:
+        return lambda f: profiled(f, name)
+    if _active is None:
+        return fn
+    label = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with stage(label):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def is_enabled():
+    return _active is not None
+
+class Profiler:
+    def __init__(self, entry, output_dir=PROFILE_DIR, sample_interval=SAMPLE_INTERVAL):
+        self.entry = entry
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self._stages = {}  # name -> [count, total seconds, max seconds]
+        self._stacks = {}  # folded stack -> samples
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._sampler_seconds = 0.0
+        import cProfile
+        self._cpu = cProfile.Profile()
+        self._started = None
+        self._baseline = None
+
+    def record_stage(self, name, seconds):
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry is None:
+                self._stages[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def start(self):
+        global _active
+        self._started = time.perf_counter()
+        self._started_at = datetime.now()
+        import tracemalloc
+        tracemalloc.start()
+        self._baseline = tracemalloc.take_snapshot()
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiling-sampler', daemon=True)
+        self._sampler.start()
+        self._cpu.enable()
+        _active = self
+        return self
+
+    def _sample_loop(self):
+        """Folded stacks of every other thread, one sample per interval"""
+        own = threading.get_ident()
+        labels = {}
+        while not self._stop_event.wait(self.sample_interval):
+            begin = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in labels:
+                    labels = {thread.ident: thread.name for thread in threading.enumerate()}
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(labels.get(ident, f"thread-{ident}"))
+                key = ';'.join(reversed(frames))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self._sampler_seconds += time.perf_counter() - begin
+
+    def stop(self):
+        """Stop collecting and write the report folder; returns its path"""
+        global _active
+        if _active is self:
+            _active = None
+        self._cpu.disable()
+        wall = time.perf_counter() - self._started
+        self._stop_event.set()
+        self._sampler.join()
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        folder = os.path.join(self.output_dir, f"{self.entry}-{self._started_at:%Y%m%d-%H%M%S}-{os.getpid()}")
+        os.makedirs(folder, exist_ok=True)
+        self._cpu.dump_stats(os.path.join(folder, 'cpu.pstats'))
+        with open(os.path.join(folder, 'stacks.folded'), 'w', encoding='utf-8') as f:
+            for key, count in sorted(self._stacks.items()):
+                f.write(f"{key} {count}\n")
+
+        report = {
+            'entry': self.entry,
+            'started_at': self._started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(wall, 4),
+            'stages': self._stage_report(wall),
+            'cpu_top': self._cpu_report(),
+            'samples': sum(self._stacks.values()),
+            'sample_interval_ms': self.sample_interval * 1000,
+            'sampler_overhead_seconds': round(self._sampler_seconds, 4),
+            'memory': self._memory_report(snapshot, current, peak),
+        }
+        with open(os.path.join(folder, 'report.json'), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self._print_summary(report, folder)
+        return folder
+
+    def _stage_report(self, wall):
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            name: {
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'mean_ms': round(total * 1000 / count, 3),
+                'max_ms': round(longest * 1000, 3),
+                'share': round(total / wall, 4) if wall else 0.0,
+            }
+            for name, (count, total, longest) in stages
+        }
+
+    def _cpu_report(self):
+        import pstats
+        stats = pstats.Stats(self._cpu)
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': function,
+                'file': filename,
+                'line': line,
+                'calls': calls,
+                'self_ms': round(tottime * 1000, 3),
+                'cumulative_ms': round(cumtime * 1000, 3),
+            })
+        rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+        return rows[:TOP_N]
+
+    def _memory_report(self, snapshot, current, peak):
+        import tracemalloc
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        snapshot = snapshot.filter_traces(ignore)
+        growth = snapshot.compare_to(self._baseline.filter_traces(ignore), 'lineno')
+        return {
+            'current_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'top_allocations': [
+                {'where': str(stat.traceback[0]), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP_N]
+            ],
+            'top_growth': [
+                {'where': str(stat.traceback[0]), 'size_diff_kb': round(stat.size_diff / 1024, 1),
+                 'count_diff': stat.count_diff}
+                for stat in growth[:TOP_N] if stat.size_diff > 0
+            ],
+        }
+
+    def _print_summary(self, report, folder):
+        print(f"\n🔬 Profile ({report['wall_seconds']:.2f}s wall, {report['samples']} samples, "
+              f"peak {report['memory']['peak_kb'] / 1024:.1f} MB) -> {folder}")
+        for name, entry in list(report['stages'].items())[:10]:
+            print(f"   ⏱️  {name}: {entry['total_ms']:.1f} ms over {entry['count']} "
+                  f"({entry['share'] * 100:.1f}% of wall)")
+
+def enable_from_argv(entry, argv=None):
+    """Start profiling if --profile was passed; the report is written at exit"""
+    argv = sys.argv if argv is None else argv
+    if '--profile' not in argv or _active is not None:
+        return None
+    argv.remove('--profile')
+    profiler = Profiler(entry).start()
+
+    def finish():
+        try:
+            profiler.stop()
+        except Exception as e:
+            print(f"⚠️  Could not write profile: {e}")
+    atexit.register(finish)
+    return profiler
+
+def measure_off_overhead(iterations=200_000):
+    """Nanoseconds one disabled `with stage(...)` block adds over an empty loop"""
+    if _active is not None:
+        raise RuntimeError("Profiling is on; the off-path cost can only be measured with it off")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with stage("overhead"):
+            pass
+    return max(0.0, (time.perf_counter() - start - empty) / iterations * 1e9)
+
+def main():
+    """Main function"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Profiling helpers")
+    commands = parser.add_subparsers(dest='command', required=True)
+    overhead = commands.add_parser('overhead', help="Check the cost of stage() with profiling off")
+    overhead.add_argument('--budget-ns', type=float, default=OFF_OVERHEAD_BUDGET_NS)
+    args = parser.parse_args()
+
+    print("🔬 Profiling")
+    print("=" * 60)
+    cost = measure_off_overhead()
+    if cost > args.budget_ns:
+        print(f"❌ Disabled stage() costs {cost:.0f} ns (budget {args.budget_ns:.0f} ns)")
+        sys.exit(1)
+    print(f"✅ Disabled stage() costs {cost:.0f} ns (budget {args.budget_ns:.0f} ns)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Shard Router - policy_info split across several SQLite files
+
+One insurance_db.sqlite caps both the size of the book and write
+concurrency, since SQLite allows one writer per file. Here policy_info is
+spread over N shard files. Each policy lives in the shard chosen by a
+jump consistent hash of crc32(policy_number), so:
+
+- a lookup by policy number opens exactly one shard;
+- overdue queries scatter to every shard in parallel (one thread each),
+  and the shards' ordered results are merged with a k-way heap merge
+  (heapq.merge) into the same campaign order a single database gives;
+- growing from N to N+1 shards moves only about 1/(N+1) of the rows.
+
+A JSON shard map lists the shard files. Routers re-read it whenever it
+changes, so a rebalance takes effect without restarts. Scatter queries
+keep only the rows a shard owns under the current map. Rows copied to
+their new shard but not yet deleted from the old one are therefore never
+returned twice.
+
+Rebalancing (split, then rebalance --shards M):
+1. copy every row whose shard changes to its new shard;
+2. swap the shard map atomically;
+3. delete the moved rows from their old shards, and drop emptied files.
+
+Only policy_info is sharded, and only the MCP policy tools read the
+shards. Call history, preferences, the change feed, rollups and
+execute_safe_query stay on insurance_db.sqlite, whose own policy_info
+copy is left untouched by split. Nothing writes to the shards: the
+payment ingester, work queue, campaign queue, bot and script generator
+only know the single database, so they refuse to start while a shard map
+is configured (insurance_data.require_unsharded) instead of letting the
+two copies drift apart.
+
+Usage:
+    python shard_router.py split --shards 4                  # writes shards/shard_map.json
+    python insurance_mcp_server.py                           # picks up shards/shard_map.json
+    DATABASE_SHARD_MAP=elsewhere/shard_map.json python insurance_mcp_server.py
+    python shard_router.py rebalance --shards 6
+    python shard_router.py status
+    python shard_router.py overdue --limit 5
+    python shard_router.py lookup PN1000
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import heapq
+import sqlite3
+import argparse
+import itertools
+import threading
+from datetime import date
+from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor
+
+import insurance_data
+from insurance_data import (
+    OVERDUE_FILTER,
+    POLICY_COLUMNS,
+    MAX_BATCH_POLICIES,
+    DEFAULT_SHARD_MAP,
+    connect_for_records,
+    fetch_policy_rows,
+    ensure_phone_index,
+)
+
+SHARD_MAP_PATH = os.getenv('DATABASE_SHARD_MAP') or DEFAULT_SHARD_MAP
+SHARD_FILE = "policy_info_{index:03d}.sqlite"
+COPY_BATCH = 10000
+
+# Per-shard campaign order; policy_number breaks ties so the merged order is total
+SHARD_OVERDUE_ORDER = "date(premium_due_date) ASC, policy_number ASC"
+
+def jump_hash(key, buckets):
+    """Jump consistent hash (Lamping & Veach): bucket in [0, buckets) for a 64-bit key"""
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+def shard_index(policy_number, shard_count):
+    """Shard holding a policy number under a map of shard_count shards"""
+    return jump_hash(zlib.crc32(str(policy_number).encode('utf-8')), shard_count)
+
+def overdue_key(record):
+    """Python twin of SHARD_OVERDUE_ORDER (SQLite sorts NULL dates first)"""
+    due = record.premium_due_date
+    return (due is not None, due or date.min, record.policy_number)
+
+# --- shard map -----------------------------------------------------------------
+
+def read_shard_map(path=SHARD_MAP_PATH):
+    """Shard file paths (resolved against the map's folder) in shard order"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    folder = os.path.dirname(os.path.abspath(path))
+    return [os.path.join(folder, shard) for shard in data['shards']]
+
+def write_shard_map(shard_paths, path=SHARD_MAP_PATH):
+    """Replace the shard map atomically; routers pick it up on their next query"""
+    folder = os.path.dirname(os.path.abspath(path))
+    data = {'hash': 'crc32-jump', 'shards': [os.path.relpath(os.path.abspath(p), folder) for p in shard_paths],
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class ShardRouter:
+    def __init__(self, map_path=SHARD_MAP_PATH):
+        self.map_path = map_path
+        self._state = ([], None)  # (shard paths, thread pool with one worker per shard)
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._users = {}  # pool -> scatters still submitting to it
+        self._refresh()
+
+    @property
+    def shards(self):
+        return self._state[0]
+
+    def _refresh(self):
+        """(shards, pool) for the current shard map, re-read if it has changed"""
+        mtime = os.stat(self.map_path).st_mtime_ns
+        if mtime == self._mtime:
+            return self._state
+        with self._lock:
+            if mtime != self._mtime:
+                shards = read_shard_map(self.map_path)
+                old_pool = self._state[1]
+                self._state = (shards, ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix='shard'))
+                self._mtime = mtime
+                # A scatter still using the old pool shuts it down when it is done (_release)
+                if old_pool is not None and old_pool not in self._users:
+                    old_pool.shutdown(wait=False)
+            return self._state
+
+    def _acquire(self):
+        """(shards, pool) for the current map, with the pool kept open until _release"""
+        self._refresh()
+        with self._lock:
+            shards, pool = self._state
+            if pool is None:
+                raise RuntimeError("ShardRouter is closed")
+            self._users[pool] = self._users.get(pool, 0) + 1
+            return shards, pool
+
+    def _release(self, pool):
+        with self._lock:
+            self._users[pool] -= 1
+            if self._users[pool]:
+                return
+            del self._users[pool]
+            retired = pool is not self._state[1]
+        if retired:
+            pool.shutdown(wait=False)
+
+    def shard_for(self, policy_number):
+        shards = self._refresh()[0]
+        return shards[shard_index(policy_number, len(shards))]
+
+    def _scatter(self, work):
+        """Run work(index, path, shard_count) on every shard in parallel; results in shard order"""
+        shards, pool = self._acquire()
+        try:
+            futures = [pool.submit(work, index, path, len(shards)) for index, path in enumerate(shards)]
+            return [future.result() for future in futures]
+        finally:
+            self._release(pool)
+
+    def fetch_record_by_policy(self, policy_number):
+        """PolicyRecord from the one shard that owns the policy, or None"""
+        conn = connect_for_records(self.shard_for(policy_number))
+        try:
+            return conn.execute("SELECT * FROM policy_info WHERE policy_number = ?", (policy_number,)).fetchone()
+        finally:
+            conn.close()
+
+    def fetch_overdue_records(self, limit=None, batch_size=1000):
+        """Overdue PolicyRecords from all shards, merged into campaign order"""
+        query = f"SELECT * FROM policy_info WHERE {OVERDUE_FILTER} ORDER BY {SHARD_OVERDUE_ORDER}"
+
+        def shard_overdue(index, path, shard_count):
+            conn = connect_for_records(path)
+            try:
+                # LIMIT lets SQLite keep a top-N sort instead of ordering the whole shard
+                rows = conn.execute(query + " LIMIT ?", (limit,)).fetchall() if limit is not None else None
+                owned = [record for record in rows or () if shard_index(record.policy_number, shard_count) == index]
+                if limit is None or (len(owned) < limit and len(rows) == limit):
+                    # Everything, or a mid-rebalance shard whose first rows have already moved away
+                    owned = []
+                    cursor = conn.execute(query)
+                    while limit is None or len(owned) < limit:
+                        batch = cursor.fetchmany(batch_size)
+                        if not batch:
+                            break
+                        owned.extend(record for record in batch
+                                     if shard_index(record.policy_number, shard_count) == index)
+                return owned[:limit] if limit is not None else owned
+            finally:
+                conn.close()
+
+        merged = heapq.merge(*self._scatter(shard_overdue), key=overdue_key)
+        return list(itertools.islice(merged, limit)) if limit is not None else list(merged)
+
+    def fetch_policy_rows(self, policy_numbers):
+        """{policy_number: raw row} for many policies, each shard asked only for its own"""
+        def shard_rows(index, path, shard_count):
+            wanted = [number for number in numbers if shard_index(number, shard_count) == index]
+            if not wanted:
+                return {}
+            conn = sqlite3.connect(path)
+            try:
+                return fetch_policy_rows(wanted, conn)
+            finally:
+                conn.close()
+
+        numbers = list(dict.fromkeys(policy_numbers))
+        rows = {}
+        for found in self._scatter(shard_rows):
+            rows.update(found)
+        return rows
+
+    def shard_stats(self):
+        """Rows, misplaced rows (awaiting a rebalance's clean-up) and bytes per shard"""
+        def stats(index, path, shard_count):
+            conn = sqlite3.connect(path)
+            try:
+                numbers = [row[0] for row in conn.execute("SELECT policy_number FROM policy_info")]
+            finally:
+                conn.close()
+            misplaced = sum(1 for number in numbers if shard_index(number, shard_count) != index)
+            return {'shard': index, 'path': path, 'rows': len(numbers), 'misplaced': misplaced,
+                    'bytes': os.path.getsize(path)}
+        return self._scatter(stats)
+
+    def close(self):
+        with self._lock:
+            shards, pool = self._state
+            self._state = (shards, None)
+            busy = pool in self._users
+        if pool is not None and not busy:
+            pool.shutdown(wait=True)
+
+_default_router = None
+_default_lock = threading.Lock()
+
+def default_router():
+    """Router over DATABASE_SHARD_MAP, created on first use"""
+    global _default_router
+    if _default_router is None:
+        with _default_lock:
+            if _default_router is None:
+                _default_router = ShardRouter()
+    return _default_router
+
+# --- MCP tools (registered under insurance_data's tool names, with the same JSON) ----
+
+def sharded_get_longest_overdue_customer() -> str:
+    """Get customer with longest overdue premium"""
+    try:
+        records = default_router().fetch_overdue_records(limit=1)
+        if records:
+            return json.dumps(records[0].to_dict())
+        return json.dumps({"error": "No overdue customers found"})
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+def sharded_get_customer_by_policy(policy_number: str) -> str:
+    """Get customer data by policy number"""
+    try:
+        record = default_router().fetch_record_by_policy(policy_number)
+        if record:
+            return json.dumps(record.to_dict())
+        return json.dumps({"error": f"No customer found with policy number: {policy_number}"})
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+def sharded_get_all_overdue_customers() -> str:
+    """Get all customers with overdue premiums"""
+    try:
+        return json.dumps([record.to_dict() for record in default_router().fetch_overdue_records()])
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+def sharded_get_customers_by_policies(policy_numbers: Union[List[str], str]) -> str:
+    """Get many customers at once by policy number (columnar JSON plus the numbers not found)"""
+    if isinstance(policy_numbers, str):
+        policy_numbers = re.split(r'[\s,]+', policy_numbers)
+    requested = list(dict.fromkeys(str(number).strip() for number in policy_numbers if str(number).strip()))
+    if len(requested) > MAX_BATCH_POLICIES:
+        return json.dumps({"error": f"At most {MAX_BATCH_POLICIES} policy numbers per call (got {len(requested)})"})
+    try:
+        rows = default_router().fetch_policy_rows(requested)
+    except Exception as e:
+        return json.dumps({"error": f"Database query error: {str(e)}"})
+
+    found = [rows[number] for number in requested if number in rows]
+    columns = {name: [row[index] for row in found] for index, name in enumerate(POLICY_COLUMNS)}
+    return json.dumps({
+        "count": len(found),
+        "columns": columns,
+        "missing": [number for number in requested if number not in rows]
+    }, separators=(',', ':'))
+
+# --- split and rebalance ---------------------------------------------------------
+
+def _create_shard(path, table_sql):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")  # readers never wait on this shard's writer
+    conn.execute(table_sql)
+    ensure_phone_index(conn)
+    conn.commit()
+    return conn
+
+def _policy_table_sql(conn):
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'policy_info'").fetchone()
+    if row is None:
+        raise ValueError("No policy_info table to shard")
+    return row[0].replace('CREATE TABLE policy_info', 'CREATE TABLE IF NOT EXISTS policy_info', 1)
+
+def _insert_sql():
+    # Upsert rather than INSERT OR REPLACE, whose implicit delete fires no delete trigger
+    updates = ", ".join(f"{name} = excluded.{name}" for name in POLICY_COLUMNS if name not in ('id', 'policy_number'))
+    return (f"INSERT INTO policy_info ({', '.join(POLICY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(POLICY_COLUMNS))}) "
+            f"ON CONFLICT (policy_number) DO UPDATE SET {updates}")
+
+def split_database(shard_count, source=None, map_path=SHARD_MAP_PATH):
+    """Spread policy_info from the single database over shard_count new shard files"""
+    source = source or insurance_data.DB_PATH
+    if os.path.exists(map_path):
+        raise FileExistsError(f"{map_path} already exists; use rebalance to change the shard count")
+    folder = os.path.dirname(os.path.abspath(map_path))
+    os.makedirs(folder, exist_ok=True)
+    paths = [os.path.join(folder, SHARD_FILE.format(index=index)) for index in range(shard_count)]
+    existing = [path for path in paths if os.path.exists(path)]
+    if existing:
+        raise FileExistsError(f"Shard files already exist: {', '.join(existing)}")
+
+    src = sqlite3.connect(source)
+    shards = []
+    try:
+        table_sql = _policy_table_sql(src)
+        shards = [_create_shard(path, table_sql) for path in paths]
+        cursor = src.execute(f"SELECT {', '.join(POLICY_COLUMNS)} FROM policy_info")
+        key = POLICY_COLUMNS.index('policy_number')
+        counts = [0] * shard_count
+        while True:
+            batch = cursor.fetchmany(COPY_BATCH)
+            if not batch:
+                break
+            buckets = [[] for _ in range(shard_count)]
+            for row in batch:
+                buckets[shard_index(row[key], shard_count)].append(row)
+            for index, rows in enumerate(buckets):
+                if rows:
+                    shards[index].executemany(_insert_sql(), rows)
+                    counts[index] += len(rows)
+        for conn in shards:
+            conn.commit()
+    finally:
+        src.close()
+        for conn in shards:
+            conn.close()
+    write_shard_map(paths, map_path)
+    return counts
+
+def rebalance(shard_count, map_path=SHARD_MAP_PATH):
+    """Move rows to a new shard count; returns {'moved': n, 'removed_shards': [...]}"""
+    old_paths = read_shard_map(map_path)
+    folder = os.path.dirname(os.path.abspath(map_path))
+    new_paths = old_paths[:shard_count] + [os.path.join(folder, SHARD_FILE.format(index=index))
+                                          for index in range(len(old_paths), shard_count)]
+    key = POLICY_COLUMNS.index('policy_number')
+
+    first = sqlite3.connect(old_paths[0])
+    try:
+        table_sql = _policy_table_sql(first)
+    finally:
+        first.close()
+    targets = {index: _create_shard(path, table_sql) for index, path in enumerate(new_paths)
+               if index >= len(old_paths)}
+    for index in range(min(len(old_paths), shard_count)):
+        targets[index] = sqlite3.connect(new_paths[index])
+
+    # 1. Copy rows whose shard changes; the old map still routes every read to the original
+    moved = 0
+    try:
+        for index, path in enumerate(old_paths):
+            src = sqlite3.connect(path)
+            try:
+                cursor = src.execute(f"SELECT {', '.join(POLICY_COLUMNS)} FROM policy_info")
+                while True:
+                    batch = cursor.fetchmany(COPY_BATCH)
+                    if not batch:
+                        break
+                    buckets = {}
+                    for row in batch:
+                        target = shard_index(row[key], shard_count)
+                        if target != index:
+                            buckets.setdefault(target, []).append(row)
+                    for target, rows in buckets.items():
+                        targets[target].executemany(_insert_sql(), rows)
+                        moved += len(rows)
+            finally:
+                src.close()
+            for conn in targets.values():
+                conn.commit()
+    finally:
+        for conn in targets.values():
+            conn.close()
+
+    # 2. Switch routing; scatter queries ignore the copies left behind from here on
+    write_shard_map(new_paths, map_path)
+
+    # 3. Clean up the rows that moved away, then the shards no longer in the map
+    for index, path in enumerate(old_paths[:shard_count]):
+        conn = sqlite3.connect(path)
+        try:
+            stale = [number for (number,) in conn.execute("SELECT policy_number FROM policy_info")
+                     if shard_index(number, shard_count) != index]
+            with conn:
+                for start in range(0, len(stale), 500):
+                    chunk = stale[start:start + 500]
+                    conn.execute(f"DELETE FROM policy_info WHERE policy_number IN ({', '.join('?' * len(chunk))})",
+                                 chunk)
+        finally:
+            conn.close()
+    removed = old_paths[shard_count:]
+    for path in removed:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return {'moved': moved, 'removed_shards': removed}
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Sharded policy_info: split, rebalance and query")
+    parser.add_argument('--map', default=SHARD_MAP_PATH, help="Shard map file (default: DATABASE_SHARD_MAP)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    split = commands.add_parser('split', help="Shard the single database")
+    split.add_argument('--shards', type=int, required=True)
+    split.add_argument('--db', default=None, help="Source database (default: DATABASE_PATH)")
+    grow = commands.add_parser('rebalance', help="Change the number of shards")
+    grow.add_argument('--shards', type=int, required=True)
+    commands.add_parser('status', help="Rows and size per shard")
+    overdue = commands.add_parser('overdue', help="Longest overdue customers across all shards")
+    overdue.add_argument('--limit', type=int, default=10)
+    lookup = commands.add_parser('lookup', help="One policy, from its shard")
+    lookup.add_argument('policy_number')
+    args = parser.parse_args()
+
+    print("🧩 Shard Router")
+    print("=" * 60)
+    try:
+        if args.command in ('split', 'rebalance') and args.shards < 1:
+            raise ValueError("--shards must be at least 1")
+        if args.command == 'split':
+            started = time.perf_counter()
+            counts = split_database(args.shards, args.db, args.map)
+            print(f"✅ {sum(counts):,} policies split over {args.shards} shards in "
+                  f"{time.perf_counter() - started:.2f}s: {', '.join(f'{c:,}' for c in counts)}")
+            print(f"🗺️  Shard map: {args.map}")
+            return
+        if args.command == 'rebalance':
+            started = time.perf_counter()
+            result = rebalance(args.shards, args.map)
+            print(f"✅ Rebalanced to {args.shards} shards in {time.perf_counter() - started:.2f}s; "
+                  f"{result['moved']:,} policies moved")
+            for path in result['removed_shards']:
+                print(f"   🗑️  Removed {path}")
+        router = ShardRouter(args.map)
+        try:
+            if args.command == 'lookup':
+                record = router.fetch_record_by_policy(args.policy_number)
+                if record is None:
+                    print(f"❌ Policy {args.policy_number} not found")
+                    sys.exit(1)
+                print(f"📍 {router.shard_for(args.policy_number)}")
+                print(json.dumps(record.to_dict(), indent=2))
+            elif args.command == 'overdue':
+                started = time.perf_counter()
+                records = router.fetch_overdue_records(limit=args.limit)
+                elapsed = time.perf_counter() - started
+                for record in records:
+                    print(f"   📅 {record.premium_due_date}  {record.policy_number}  {record.policy_holder_name}  "
+                          f"{record.outstanding_amount:,.2f}")
+                print(f"⏱️  {len(records)} records from {len(router.shards)} shards in {elapsed * 1000:.1f} ms")
+            else:
+                for shard in router.shard_stats():
+                    note = f", {shard['misplaced']:,} awaiting clean-up" if shard['misplaced'] else ""
+                    print(f"   🧩 {shard['shard']}: {shard['rows']:,} policies, "
+                          f"{shard['bytes'] / 1024 / 1024:.1f} MB{note}  ({shard['path']})")
+        finally:
+            router.close()
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import sqlite3
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import insurance_data
+from synthetic_policy_book import generate_policy_book
+
+BOOK_ROWS = 500
+BOOK_SEED = 7
+
+@pytest.fixture
+def policy_book(tmp_path, monkeypatch):
+    """A small synthetic book set up like create_database.py, used as the live database"""
+    path = str(tmp_path / 'insurance_db.sqlite')
+    generate_policy_book(path, BOOK_ROWS, BOOK_SEED)
+    conn = sqlite3.connect(path)
+    try:
+        insurance_data.ensure_schema(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    monkeypatch.setattr(insurance_data, 'DB_PATH', path)
+    monkeypatch.setenv('DATABASE_PATH', path)
+    # Side folders (payments_inbox/, dnc/, profiles/ ...) land in the temp dir
+    monkeypatch.chdir(tmp_path)
+    return path
+
+def execute(path, sql, params=()):
+    """Run one write statement on its own connection (like another process would)"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            return conn.execute(sql, params).rowcount
+    finally:
+        conn.close()
@@ -0,0 +1,21 @@
+import os
+import stat
+
+import pytest
+
+from artifact_writer import ArtifactWriter
+
+@pytest.mark.parametrize('fsync', ['always', 'batch', 'never'])
+def test_files_get_the_umask_mode_without_changing_it(tmp_path, fsync):
+    previous = os.umask(0o027)
+    try:
+        with ArtifactWriter(fsync=fsync) as writer:
+            writer.write(str(tmp_path / 'calls' / 'a.txt'), "hello")
+            writer.write_json(str(tmp_path / 'calls' / 'b.json'), {'ok': True})
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(previous)
+    assert (tmp_path / 'calls' / 'a.txt').read_text() == "hello"
+    for name in ('a.txt', 'b.json'):
+        assert stat.S_IMODE(os.stat(tmp_path / 'calls' / name).st_mode) == 0o640
+    assert [p for p in os.listdir(tmp_path / 'calls') if p.startswith('.tmp-')] == []
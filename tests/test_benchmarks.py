@@ -0,0 +1,20 @@
+import insurance_data
+from conftest import BOOK_SEED
+from run_benchmarks import BenchmarkSuite
+from synthetic_policy_book import generate_policy_book
+
+def test_each_size_benchmarks_its_own_book(tmp_path, monkeypatch):
+    # _use_book rebinds these; let monkeypatch put them back
+    monkeypatch.setattr(insurance_data, 'DB_PATH', insurance_data.DB_PATH)
+    monkeypatch.setenv('DATABASE_PATH', insurance_data.DB_PATH)
+    monkeypatch.chdir(tmp_path)
+    for rows in (50, 120):
+        path = str(tmp_path / f"book_{rows}.sqlite")
+        generate_policy_book(path, rows, BOOK_SEED)
+        bot = BenchmarkSuite(path, rows)._mock_bot()
+        assert bot.db_path == insurance_data.DB_PATH == path
+        conn = insurance_data.connect_to_db()
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM policy_info").fetchone()[0] == rows
+        finally:
+            conn.close()
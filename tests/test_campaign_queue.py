@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+import pytest
+
+from conftest import BOOK_SEED, execute
+
+import insurance_data
+from synthetic_policy_book import generate_policy_book
+from campaign_queue import OverdueQueue
+from insurance_data import (connect_to_db, fetch_changes_since, get_policy_changes_since, latest_change_seq,
+                            iter_overdue_records)
+
+def _first_active(path):
+    conn = connect_to_db()
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT policy_number FROM policy_info WHERE status = 'Active' AND outstanding_amount = 0 LIMIT 2")]
+    finally:
+        conn.close()
+
+def test_changes_collapse_to_latest_per_policy(policy_book):
+    first, second = _first_active(policy_book)
+    for amount in (100, 200, 300):
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = ? WHERE policy_number = ?", (amount, first))
+    execute(policy_book, "DELETE FROM policy_info WHERE policy_number = ?", (second,))
+
+    changes = fetch_changes_since(0)
+    assert [(c[1], c[2]) for c in changes] == [(first, 'update'), (second, 'delete')]
+    assert changes[0][4].outstanding_amount == 300
+    assert changes[1][4] is None
+    assert changes[-1][0] == latest_change_seq(connect_to_db())
+
+def test_changes_page_by_window(policy_book):
+    first, second = _first_active(policy_book)
+    for amount in (100, 200, 300):
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = ? WHERE policy_number = ?", (amount, first))
+    execute(policy_book, "UPDATE policy_info SET outstanding_amount = 50 WHERE policy_number = ?", (second,))
+
+    page = fetch_changes_since(0, limit=2)
+    assert [c[1] for c in page] == [first]
+    rest = fetch_changes_since(page[-1][0], limit=2)
+    assert [c[1] for c in rest] == [first, second]
+    assert fetch_changes_since(rest[-1][0], limit=2) == []
+
+def test_queue_matches_book_after_refresh(policy_book):
+    queue = OverdueQueue()
+    try:
+        assert len(queue) == sum(1 for _ in iter_overdue_records())
+        first, second = _first_active(policy_book)
+        paid = queue.peek().policy_number
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = 0, status = 'Active' WHERE policy_number = ?", (paid,))
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = 10 WHERE policy_number = ?", (first,))
+        queue.refresh()
+        assert paid not in queue
+        assert first in queue
+        assert len(queue) == sum(1 for _ in iter_overdue_records())
+    finally:
+        queue.close()
+
+def test_queue_refresh_pages_past_short_windows(policy_book):
+    queue = OverdueQueue(refresh_batch=3)
+    try:
+        first, second = _first_active(policy_book)
+        # Four changes to one policy fill the first window, which collapses to a single row
+        for amount in (100, 200, 300, 400):
+            execute(policy_book, "UPDATE policy_info SET outstanding_amount = ? WHERE policy_number = ?", (amount, first))
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = 10 WHERE policy_number = ?", (second,))
+        queue.refresh()
+        assert first in queue and second in queue
+        assert queue.last_seq == latest_change_seq(connect_to_db())
+    finally:
+        queue.close()
+
+def test_unmigrated_database_is_not_altered(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.sqlite')
+    generate_policy_book(path, 50, BOOK_SEED)
+    monkeypatch.setattr(insurance_data, 'DB_PATH', path)
+    assert '--migrate' in json.loads(get_policy_changes_since(0))['error']
+    with pytest.raises(LookupError, match='--migrate'):
+        OverdueQueue(path)
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'policy_changelog'").fetchone() is None
+    finally:
+        conn.close()
@@ -0,0 +1,47 @@
+from conftest import execute
+
+from campaign_queue import OverdueQueue
+from campaign_simulator import CampaignSimulation, VirtualClock, load_campaign_customers
+from dnc_filter import DNCFilter, build_dnc_file
+from insurance_data import iter_overdue_records
+from vapi_insurance_bot import VAPIInsuranceBot
+
+def _dnc(tmp_path, numbers):
+    source = tmp_path / 'dnc.txt'
+    source.write_text("".join(f"{number}\n" for number in numbers))
+    build_dnc_file([str(source)], str(tmp_path / 'dnc.dnc'))
+    return DNCFilter(str(tmp_path / 'dnc.dnc'))
+
+def test_simulation_dials_what_run_campaign_dials(policy_book, tmp_path):
+    overdue = list(iter_overdue_records())
+    first, second, blocked = overdue[0], overdue[5], overdue[9]
+    # One shared household number, and one number on the do-not-call list
+    execute(policy_book, "UPDATE policy_info SET phone_number = ? WHERE policy_number = ?",
+            (first.phone_number, second.policy_number))
+
+    bot = VAPIInsuranceBot(mock_mode=True, clock=VirtualClock(), campaign_queue=OverdueQueue(),
+                           dnc_filter=_dnc(tmp_path, [blocked.phone_number]))
+    dialed, covered = [], set()
+    make_call, finish_household = bot.make_call, bot.finish_household
+
+    def record_dial(assistant_id, record):
+        dialed.append(record.policy_number)
+        return make_call(assistant_id, record)
+
+    def record_finish(household):
+        covered.update(member.policy_number for member in household)
+        finish_household(household)
+
+    bot.make_call, bot.finish_household = record_dial, record_finish
+    while bot.run_campaign():
+        pass
+
+    customers = load_campaign_customers(policy_book, dnc=_dnc(tmp_path, [blocked.phone_number]))
+    assert [household.primary.policy_number for household in customers] == dialed
+    assert second.policy_number not in dialed and blocked.policy_number not in dialed
+    # The bot also closes the skipped do-not-call household without dialing it
+    assert {p for household in customers for p in household.policy_numbers} == covered - {blocked.policy_number}
+    assert covered == {record.policy_number for record in overdue}
+
+    forecast = CampaignSimulation(customers, lines=1).run()
+    assert forecast['customers'] == forecast['dials'] == len(dialed)
@@ -0,0 +1,36 @@
+import sqlite3
+
+from conftest import BOOK_SEED
+
+from synthetic_policy_book import generate_policy_book
+from insurance_data import fetch_customer_context, iter_overdue_records, record_call_history
+
+def _tables(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+def test_context_includes_recent_calls_newest_first(policy_book):
+    record = next(iter_overdue_records())
+    for index in range(3):
+        record_call_history({'id': f"call-{index}", 'status': 'ended'}, [record])
+    fetched, history = fetch_customer_context(record.policy_number, history_limit=2)
+    assert fetched.policy_number == record.policy_number
+    assert [call['call_id'] for call in history] == ['call-2', 'call-1']
+    assert fetch_customer_context('NOPE') == (None, [])
+
+def test_context_on_unmigrated_database_is_read_only(tmp_path):
+    path = str(tmp_path / 'old.sqlite')
+    generate_policy_book(path, 50, BOOK_SEED)
+    before = _tables(path)
+    conn = sqlite3.connect(path)
+    try:
+        policy_number = conn.execute("SELECT policy_number FROM policy_info LIMIT 1").fetchone()[0]
+        record, history = fetch_customer_context(policy_number, conn=conn)
+    finally:
+        conn.close()
+    assert record.policy_number == policy_number
+    assert history == []
+    assert _tables(path) == before
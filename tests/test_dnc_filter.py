@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from dnc_filter import DNCFilter, build_dnc_file, e164_key
+
+def _build(tmp_path, numbers, name='dnc_numbers.dnc'):
+    source = tmp_path / 'numbers.txt'
+    source.write_text("number\n" + "".join(f"{number}\n" for number in numbers))
+    path = str(tmp_path / 'dnc' / name)
+    return path, build_dnc_file([str(source)], path)
+
+def test_lookup_normalises_numbers(tmp_path):
+    path, count = _build(tmp_path, ['+919849475949', '09812345678', '98123 45678', 'junk'])
+    assert count == 2
+    dnc = DNCFilter(path)
+    assert dnc.is_blocked('+919849475949')
+    assert dnc.is_blocked('+91 98494 75949')
+    assert dnc.is_blocked('9812345678')
+    assert not dnc.is_blocked('+919800000000')
+    assert not dnc.is_blocked('')
+    assert e164_key('+919849475949') == 919849475949
+
+def test_missing_list_blocks_every_number(tmp_path):
+    dnc = DNCFilter(str(tmp_path / 'missing.dnc'), allow_missing=False)
+    assert dnc.missing
+    assert dnc.is_blocked('+919800000000')
+
+def test_missing_list_opt_out(tmp_path):
+    dnc = DNCFilter(str(tmp_path / 'missing.dnc'), allow_missing=True)
+    assert not dnc.missing
+    assert not dnc.is_blocked('+919800000000')
+
+def test_list_that_appears_later_is_loaded(tmp_path):
+    dnc = DNCFilter(str(tmp_path / 'dnc' / 'dnc_numbers.dnc'), check_interval=0, allow_missing=False)
+    assert dnc.is_blocked('+919800000000')
+    _build(tmp_path, ['+919849475949'])
+    assert not dnc.is_blocked('+919800000000')
+    assert dnc.is_blocked('+919849475949')
+    assert not dnc.missing
+
+    # Deleted again: back to refusing every number
+    os.unlink(dnc.path)
+    assert dnc.is_blocked('+919800000000')
+
+def test_bot_refuses_to_dial_without_a_list(policy_book, tmp_path, monkeypatch):
+    from campaign_simulator import VirtualClock
+    from vapi_insurance_bot import VAPIInsuranceBot
+
+    bot = VAPIInsuranceBot(mock_mode=True, clock=VirtualClock(),
+                           dnc_filter=DNCFilter(str(tmp_path / 'missing.dnc'), allow_missing=False))
+    monkeypatch.setattr(bot, 'create_vapi_assistant', lambda *args: pytest.fail("prepared a call without a DNC list"))
+    assert not bot.run_campaign()
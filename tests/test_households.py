@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from conftest import execute
+
+from campaign_planner import plan_campaign
+from campaign_simulator import VirtualClock
+from customer_script_generator import CustomerScriptGenerator
+from dnc_filter import DNCFilter, build_dnc_file
+from insurance_data import (fetch_household_records, fetch_record_by_policy, iter_overdue_records,
+                            normalize_phone_numbers)
+from vapi_insurance_bot import VAPIInsuranceBot
+
+def _overdue(count):
+    return [record for _, record in zip(range(count), iter_overdue_records())]
+
+def _share_phone(policy_book, records, number):
+    for record in records:
+        execute(policy_book, "UPDATE policy_info SET phone_number = ? WHERE policy_number = ?",
+                (number, record.policy_number))
+
+def test_household_lookup_matches_planner_after_normalising(policy_book):
+    first, second = _overdue(2)
+    national = '0' + first.phone_number[-10:]
+    _share_phone(policy_book, [second], national)
+    # Before the migration the bot's exact match misses the national-format row
+    assert second.policy_number not in {r.policy_number for r in fetch_household_records(first.phone_number)}
+
+    conn = sqlite3.connect(policy_book)
+    try:
+        assert normalize_phone_numbers(conn) == 1
+    finally:
+        conn.close()
+    assert fetch_record_by_policy(second.policy_number).phone_number == first.phone_number
+
+    planned = next(h for h in plan_campaign() if h.primary.policy_number == first.policy_number)
+    looked_up = fetch_household_records(first.phone_number)
+    assert [r.policy_number for r in looked_up] == planned.policy_numbers
+    assert second.policy_number in planned.policy_numbers
+    # A raw number passed in by a caller still finds the household
+    assert [r.policy_number for r in fetch_household_records(national)] == planned.policy_numbers
+
+def test_hindi_household_addendum(policy_book):
+    first, second = _overdue(2)
+    _share_phone(policy_book, [second], first.phone_number)
+    household = fetch_household_records(first.phone_number)
+    generator = CustomerScriptGenerator(policy_book)
+    hindi = generator.render_household_script(household, 'hi')
+    english = generator.render_household_script(household, 'en')
+    assert 'पॉलिसी' in hindi and second.policy_number in hindi
+    assert 'पॉलिसी' not in english and second.policy_number in english
+
+@pytest.fixture
+def bot(policy_book, tmp_path):
+    with open(tmp_path / 'dnc.txt', 'w') as f:
+        f.write("")
+    build_dnc_file([str(tmp_path / 'dnc.txt')], str(tmp_path / 'dnc.dnc'))
+    return VAPIInsuranceBot(mock_mode=True, clock=VirtualClock(), dnc_filter=DNCFilter(str(tmp_path / 'dnc.dnc')))
+
+def test_paid_primary_hands_the_call_to_the_next_member(policy_book, bot, monkeypatch):
+    first, second = _overdue(2)
+    _share_phone(policy_book, [second], first.phone_number)
+    dialed = []
+    create_assistant = bot.create_vapi_assistant
+    make_call = bot.make_call
+
+    def pay_primary_then_create(record, script, language=None):
+        # The primary pays while the first assistant is being prepared
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = 0, status = 'Active' WHERE policy_number = ?",
+                (first.policy_number,))
+        return create_assistant(record, script, language)
+
+    def record_call(assistant_id, record):
+        dialed.append(record.policy_number)
+        return make_call(assistant_id, record)
+
+    monkeypatch.setattr(bot, 'create_vapi_assistant', pay_primary_then_create)
+    monkeypatch.setattr(bot, 'make_call', record_call)
+    assert bot.run_campaign()
+    assert dialed == [second.policy_number]
+
+def test_household_paid_in_full_is_not_called(policy_book, bot, monkeypatch):
+    first, second = _overdue(2)
+    _share_phone(policy_book, [second], first.phone_number)
+    create_assistant = bot.create_vapi_assistant
+
+    def pay_all_then_create(record, script, language=None):
+        execute(policy_book, "UPDATE policy_info SET outstanding_amount = 0, status = 'Active' WHERE phone_number = ?",
+                (first.phone_number,))
+        return create_assistant(record, script, language)
+
+    monkeypatch.setattr(bot, 'create_vapi_assistant', pay_all_then_create)
+    monkeypatch.setattr(bot, 'make_call', lambda *args: pytest.fail("a paid household was dialed"))
+    assert bot.run_campaign()
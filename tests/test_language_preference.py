@@ -0,0 +1,44 @@
+import sqlite3
+
+from conftest import BOOK_SEED
+
+from synthetic_policy_book import generate_policy_book
+from insurance_data import fetch_language_preference, iter_overdue_records, record_language_preference
+
+def test_selected_language_survives_a_detected_guess(policy_book):
+    record = next(iter_overdue_records())
+    assert fetch_language_preference(record.policy_number) is None
+    record_language_preference([record], 'hi', 'selected', call_id='c1')
+    record_language_preference([record], 'en', 'detected', call_id='c2')
+    assert fetch_language_preference(record.policy_number) == 'hi'
+    record_language_preference([record], 'en', 'selected', call_id='c3')
+    assert fetch_language_preference(record.policy_number) == 'en'
+
+def test_lookup_on_unmigrated_database_is_read_only(tmp_path):
+    path = str(tmp_path / 'old.sqlite')
+    generate_policy_book(path, 50, BOOK_SEED)
+    conn = sqlite3.connect(path)
+    try:
+        policy_number = conn.execute("SELECT policy_number FROM policy_info LIMIT 1").fetchone()[0]
+        assert fetch_language_preference(policy_number, conn=conn) is None
+        assert conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'customer_preferences'").fetchone() is None
+    finally:
+        conn.close()
+
+def _count(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_mock_campaign_stores_no_history_or_language(policy_book):
+    from campaign_simulator import VirtualClock
+    from dnc_filter import DNCFilter
+    from vapi_insurance_bot import VAPIInsuranceBot
+
+    bot = VAPIInsuranceBot(mock_mode=True, clock=VirtualClock(), dnc_filter=DNCFilter(allow_missing=True))
+    assert bot.run_campaign()
+    assert _count(policy_book, 'call_history') == 0
+    assert _count(policy_book, 'customer_preferences') == 0
@@ -0,0 +1,119 @@
+import os
+import json
+
+import pytest
+
+from conftest import execute
+
+from payment_ingester import PaymentIngester
+from campaign_queue import OverdueQueue
+from insurance_data import fetch_record_by_policy, iter_overdue_records
+
+@pytest.fixture
+def ingester(policy_book):
+    ingester = PaymentIngester('payments_inbox')
+    yield ingester
+    ingester.close()
+
+def _overdue(count):
+    return [record for _, record in zip(range(count), iter_overdue_records())]
+
+def _write_jsonl(path, payments, mode='w'):
+    with open(path, mode, encoding='utf-8') as f:
+        for payment in payments:
+            f.write(json.dumps(payment) + '\n')
+
+def test_file_payments_apply_once(ingester):
+    first, second = _overdue(2)
+    path = os.path.join('payments_inbox', 'bank.jsonl')
+    _write_jsonl(path, [
+        {'payment_id': 'P1', 'policy_number': first.policy_number, 'amount': first.outstanding_amount},
+        {'policy_number': second.policy_number, 'amount': 1},
+    ])
+    assert ingester.poll_once() == 2
+    assert fetch_record_by_policy(first.policy_number).outstanding_amount == 0
+    assert fetch_record_by_policy(first.policy_number).status == 'Active'
+    assert fetch_record_by_policy(second.policy_number).outstanding_amount == second.outstanding_amount - 1
+
+    # Nothing new: the stored offset skips the file
+    assert ingester.poll_once() == 0
+
+    # A replay from scratch (lost offsets) hits the ledger instead of paying twice
+    execute(ingester.db_path, "DELETE FROM payment_feed_offsets")
+    assert ingester.poll_once() == 0
+    assert ingester.stats['duplicates'] == 2
+    assert fetch_record_by_policy(second.policy_number).outstanding_amount == second.outstanding_amount - 1
+
+def test_partial_line_waits_for_newline(ingester):
+    first, = _overdue(1)
+    path = os.path.join('payments_inbox', 'bank.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'payment_id': 'P1', 'policy_number': first.policy_number, 'amount': 1}))
+    assert ingester.poll_once() == 0
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert ingester.poll_once() == 1
+
+def test_csv_payments(ingester):
+    first, = _overdue(1)
+    with open(os.path.join('payments_inbox', 'upi.csv'), 'w', encoding='utf-8') as f:
+        f.write("payment_id,policy_number,amount\n")
+        f.write(f"U1,{first.policy_number},\"1,000\"\n")
+    assert ingester.poll_once() == 1
+    assert fetch_record_by_policy(first.policy_number).outstanding_amount == max(first.outstanding_amount - 1000, 0)
+
+def test_queued_payment_without_id(ingester):
+    first, = _overdue(1)
+    ingester.submit({'policy_number': first.policy_number, 'amount': 5})
+    ingester.submit({'policy_number': first.policy_number, 'amount': 5})
+    assert ingester.poll_once() == 2
+    assert ingester.stats['invalid'] == 0
+
+    ingester.submit({'payment_id': 'Q1', 'policy_number': first.policy_number, 'amount': 5})
+    ingester.submit({'payment_id': 'Q1', 'policy_number': first.policy_number, 'amount': 5})
+    assert ingester.poll_once() == 1
+    assert ingester.stats['duplicates'] == 1
+    assert fetch_record_by_policy(first.policy_number).outstanding_amount == first.outstanding_amount - 15
+
+def test_bad_and_unknown_payments(ingester):
+    first, = _overdue(1)
+    ingester.submit({'policy_number': first.policy_number, 'amount': -3})
+    ingester.submit({'policy_number': 'NOPE', 'amount': 10})
+    assert ingester.poll_once() == 0
+    assert ingester.stats['invalid'] == 1
+    assert ingester.stats['unmatched'] == 1
+
+def test_replaced_and_truncated_files_are_read_again(ingester):
+    first, second, third = _overdue(3)
+    path = os.path.join('payments_inbox', 'bank.jsonl')
+    _write_jsonl(path, [{'policy_number': first.policy_number, 'amount': 1},
+                        {'policy_number': first.policy_number, 'amount': 1}])
+    assert ingester.poll_once() == 2
+
+    # Replaced under the same name by a shorter file: same size check would skip it
+    replacement = path + '.new'
+    _write_jsonl(replacement, [{'policy_number': second.policy_number, 'amount': 1}])
+    os.replace(replacement, path)
+    assert ingester.poll_once() == 1
+
+    # Truncated in place and rewritten
+    _write_jsonl(path, [])
+    assert ingester.poll_once() == 0
+    _write_jsonl(path, [{'policy_number': third.policy_number, 'amount': 1}], mode='a')
+    assert ingester.poll_once() == 1
+    assert fetch_record_by_policy(third.policy_number).outstanding_amount == third.outstanding_amount - 1
+    assert ingester.stats['duplicates'] == 0
+
+def test_paid_customers_leave_the_queue(policy_book):
+    queue = OverdueQueue()
+    ingester = PaymentIngester(campaign_queue=queue)
+    try:
+        first, second = _overdue(2)
+        ingester.submit({'policy_number': first.policy_number, 'amount': first.outstanding_amount})
+        ingester.submit({'policy_number': second.policy_number, 'amount': 1})
+        ingester.poll_once()
+        assert first.policy_number not in queue
+        assert second.policy_number in queue
+    finally:
+        ingester.close()
+        queue.close()
@@ -0,0 +1,30 @@
+from datetime import date
+
+import pytest
+
+from policy_projection import (NUMPY_AVAILABLE, _synthetic_rows, build_projections, fetch_projection,
+                               project_record, project_rows)
+from insurance_data import iter_overdue_records
+
+TODAY = date(2026, 1, 15)
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="NumPy not installed")
+def test_numpy_and_python_engines_agree():
+    rows = _synthetic_rows(2000)
+    # Unknown and malformed dates take the fallback paths of both engines
+    rows += [('PNX1', None, None, 100.0, 5000.0, 100000.0, 20000.0),
+             ('PNX2', 'not a date', '2025-02-30', None, 0.0, 50000.0, None)]
+    python = project_rows(rows, TODAY, use_numpy=False)
+    vectorised = project_rows(rows, TODAY, use_numpy=True)
+    assert [row[:2] for row in python] == [row[:2] for row in vectorised]
+    for a, b in zip(python, vectorised):
+        # Float summation order differs, so rounding can land a rupee apart
+        assert all(abs(x - y) <= 1 for x, y in zip(a[2:], b[2:])), (a, b)
+
+def test_cached_projection_matches_single_record(policy_book):
+    stats = build_projections(today=TODAY)
+    assert stats['policies'] > 0
+    record = next(iter_overdue_records())
+    cached = fetch_projection(record.policy_number)
+    single = project_record(record, TODAY)
+    assert all(abs(cached[name] - value) <= 1 for name, value in single.items())
@@ -0,0 +1,63 @@
+import json
+import sqlite3
+
+import pytest
+
+from conftest import BOOK_SEED, execute
+
+from synthetic_policy_book import generate_policy_book
+import insurance_data
+from shard_router import _insert_sql
+from insurance_data import (POLICY_COLUMNS, ROLLUP_DIMENSIONS, ROLLUP_MEASURES, fetch_rollups,
+                            get_portfolio_rollup)
+
+def _grouped(path):
+    """Rollups recomputed with a GROUP BY over the live table"""
+    conn = sqlite3.connect(path)
+    try:
+        expected = {}
+        for dimension, expression in ROLLUP_DIMENSIONS.items():
+            bucket = expression.format(row='policy_info')
+            sums = ", ".join(f"SUM({measure})" for measure in ROLLUP_MEASURES)
+            for row in conn.execute(f"SELECT {bucket}, COUNT(*), {sums} FROM policy_info GROUP BY 1"):
+                expected[(dimension, row[0])] = (row[1],) + tuple(round(value, 2) for value in row[2:])
+        return expected
+    finally:
+        conn.close()
+
+def _rollups():
+    return {(row['dimension'], row['bucket']): (row['policy_count'],) +
+            tuple(round(row[measure], 2) for measure in ROLLUP_MEASURES) for row in fetch_rollups()}
+
+def test_rollups_match_group_by_after_writes(policy_book):
+    assert _rollups() == _grouped(policy_book)
+    conn = sqlite3.connect(policy_book)
+    try:
+        first, second, third = [row[0] for row in conn.execute("SELECT policy_number FROM policy_info LIMIT 3")]
+        replaced = conn.execute(f"SELECT {', '.join(POLICY_COLUMNS)} FROM policy_info WHERE policy_number = ?",
+                                (third,)).fetchone()
+    finally:
+        conn.close()
+
+    execute(policy_book, "UPDATE policy_info SET outstanding_amount = outstanding_amount + 1000, "
+                         "status = 'Lapsed', premium_due_date = '2031-01-15' WHERE policy_number = ?", (first,))
+    execute(policy_book, "DELETE FROM policy_info WHERE policy_number = ?", (second,))
+    # Re-writing an existing policy the way the loaders do
+    changed = list(replaced)
+    changed[POLICY_COLUMNS.index('product_name')] = 'Replaced Plan'
+    changed[POLICY_COLUMNS.index('sum_assured')] = 123456.0
+    execute(policy_book, _insert_sql(), changed)
+    assert _rollups() == _grouped(policy_book)
+
+def test_reading_rollups_never_creates_them(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.sqlite')
+    generate_policy_book(path, 50, BOOK_SEED)
+    monkeypatch.setattr(insurance_data, 'DB_PATH', path)
+    with pytest.raises(LookupError, match='--migrate'):
+        fetch_rollups()
+    assert '--migrate' in json.loads(get_portfolio_rollup())['error']
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'policy_rollups'").fetchone() is None
+    finally:
+        conn.close()
@@ -0,0 +1,87 @@
+import os
+import json
+import threading
+
+import pytest
+
+import shard_router
+from shard_router import (ShardRouter, overdue_key, rebalance, read_shard_map, split_database, write_shard_map,
+                          sharded_get_customers_by_policies, sharded_get_longest_overdue_customer)
+from insurance_data import (fetch_policy_rows, fetch_record_by_policy, get_customers_by_policies,
+                            get_longest_overdue_customer, iter_overdue_records)
+
+@pytest.fixture
+def router(policy_book, monkeypatch):
+    map_path = os.path.join('shards', 'shard_map.json')
+    split_database(3, policy_book, map_path)
+    router = ShardRouter(map_path)
+    monkeypatch.setattr(shard_router, '_default_router', router)
+    yield router
+    router.close()
+
+def _single_overdue():
+    # The single database orders by due date only; shards break ties on policy_number
+    return sorted(iter_overdue_records(), key=overdue_key)
+
+def test_scatter_gather_matches_single_database(router):
+    single = _single_overdue()
+    assert [r.policy_number for r in router.fetch_overdue_records()] == [r.policy_number for r in single]
+    assert [r.policy_number for r in router.fetch_overdue_records(limit=7)] == [r.policy_number for r in single[:7]]
+
+    sample = [r.policy_number for r in single[::25]] + ['NOPE']
+    assert router.fetch_policy_rows(sample) == fetch_policy_rows(sample)
+    for number in sample[:-1]:
+        assert router.fetch_record_by_policy(number).to_dict() == fetch_record_by_policy(number).to_dict()
+    assert router.fetch_record_by_policy('NOPE') is None
+
+def test_sharded_tools_return_the_same_json(router):
+    numbers = [r.policy_number for r in _single_overdue()[:40]] + ['NOPE']
+    assert json.loads(sharded_get_customers_by_policies(numbers)) == json.loads(get_customers_by_policies(numbers))
+    longest = json.loads(sharded_get_longest_overdue_customer())
+    assert longest['premium_due_date'] == json.loads(get_longest_overdue_customer())['premium_due_date']
+
+def test_rebalance_keeps_results(router):
+    before = [r.policy_number for r in router.fetch_overdue_records()]
+    result = rebalance(5, router.map_path)
+    assert result['moved'] > 0
+    assert len(read_shard_map(router.map_path)) == 5
+    assert [r.policy_number for r in router.fetch_overdue_records()] == before
+    assert sum(shard['misplaced'] for shard in router.shard_stats()) == 0
+
+def test_map_swaps_during_queries_never_break_a_scatter(router):
+    shards = read_shard_map(router.map_path)
+    errors = []
+    stop = threading.Event()
+
+    def query():
+        while not stop.is_set():
+            try:
+                router.fetch_overdue_records(limit=3)
+            except Exception as e:  # RuntimeError from a pool shut down under a scatter
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=query) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for swap in range(1, 101):
+            write_shard_map(shards, router.map_path)
+            os.utime(router.map_path, ns=(0, swap * 1000))  # a new mtime every time
+            router.shard_for('PN1000')
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert errors == []
+    assert router._users == {}
+
+def test_single_database_components_refuse_to_run_when_sharded(router):
+    from payment_ingester import PaymentIngester
+    from work_queue import WorkQueue
+    from campaign_queue import OverdueQueue
+    from vapi_insurance_bot import VAPIInsuranceBot
+
+    for start in (PaymentIngester, WorkQueue, OverdueQueue, lambda: VAPIInsuranceBot(mock_mode=True)):
+        with pytest.raises(RuntimeError, match='sharded'):
+            start()
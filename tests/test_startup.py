@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import subprocess
+
+from conftest import ROOT
+
+def _loaded_after(code, modules, env=None):
+    """Which of `modules` a fresh interpreter has imported after running `code`"""
+    probe = f"{code}\nimport sys, json\nprint(json.dumps([m for m in {list(modules)!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=ROOT, VAPI_SKIP_DOTENV='1', VAPI_NON_INTERACTIVE='1',
+                                     **(env or {})))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_bot_start_up_skips_analysis_modules(policy_book):
+    loaded = _loaded_after("import vapi_insurance_bot as b; b.VAPIInsuranceBot(mock_mode=True)",
+                           ['latency_analyzer'], {'DATABASE_PATH': policy_book})
+    assert loaded == []
+
+def test_numpy_loads_only_for_book_wide_projections(policy_book):
+    assert _loaded_after("import vapi_insurance_bot as b; b.VAPIInsuranceBot(mock_mode=True)",
+                         ['numpy'], {'DATABASE_PATH': policy_book}) == []
+    assert _loaded_after("import policy_projection as p; p.project_rows(p._synthetic_rows(10), use_numpy=True)",
+                         ['numpy']) == ['numpy']
+
+def test_profiling_tools_load_only_when_profiling(policy_book):
+    heavy = ['cProfile', 'pstats', 'tracemalloc']
+    assert _loaded_after("import vapi_insurance_bot as b; b.VAPIInsuranceBot(mock_mode=True)",
+                         heavy, {'DATABASE_PATH': policy_book}) == []
+    assert _loaded_after("import profiling", heavy + ['argparse']) == []
+    # pstats is only needed for the report written at stop()
+    assert _loaded_after("import profiling; profiling.Profiler('t').start()", heavy) == ['cProfile', 'tracemalloc']
+
+def test_benchmark_gate_flags_slow_cold_starts():
+    from run_benchmarks import check_startup_budget
+
+    results = {'10k:startup.python': {'median_ms': 60.0},
+               '10k:startup.import_insurance_data': {'median_ms': 75.0},
+               '10k:startup.bot_non_interactive': {'median_ms': 180.0},
+               '10k:mcp.get_longest_overdue_customer': {'median_ms': 500.0}}
+    assert check_startup_budget(results, 60) == [('10k:startup.bot_non_interactive', 120.0)]
+    assert check_startup_budget(results, 150) == []
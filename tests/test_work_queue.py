@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+from conftest import execute
+
+from work_queue import WorkQueue
+from insurance_data import iter_overdue_records
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def workers(policy_book, clock):
+    queues = [WorkQueue(worker_id=f"w{i}", lease_seconds=60, clock=clock) for i in range(2)]
+    yield queues
+    for queue in queues:
+        queue.close()
+
+def test_workers_claim_in_campaign_order_without_overlap(workers):
+    a, b = workers
+    # The queue breaks due-date ties on policy_number
+    book = sorted(iter_overdue_records(), key=lambda r: (r.premium_due_date, r.policy_number))
+    claimed = [a.claim().policy_number, b.claim().policy_number, a.claim().policy_number, b.claim().policy_number]
+    assert claimed == [record.policy_number for record in book[:4]]
+    assert a.held.isdisjoint(b.held)
+
+def test_expired_lease_is_reclaimed(workers, clock):
+    a, b = workers
+    record = a.claim()
+    clock.sleep(61)
+    taken = b.claim()
+    assert taken.policy_number == record.policy_number
+    assert b.stats['reclaimed'] == 1
+    # The first worker finds out on its next heartbeat, and cannot complete it
+    assert a.heartbeat() == []
+    assert a.stats['lost_leases'] == 1
+    assert not a.complete(record.policy_number)
+    assert b.complete(record.policy_number)
+
+def test_heartbeat_keeps_the_lease(workers, clock):
+    a, b = workers
+    record = a.claim()
+    clock.sleep(45)
+    assert a.heartbeat() == [record.policy_number]
+    clock.sleep(45)
+    assert b.claim().policy_number != record.policy_number
+
+def test_release_and_complete(workers):
+    a, b = workers
+    record = a.claim()
+    assert a.release(record.policy_number)
+    assert b.claim().policy_number == record.policy_number
+    assert b.complete(record.policy_number)
+    assert record.policy_number not in {a.claim().policy_number for _ in range(3)}
+
+def test_paid_policies_are_skipped(workers, policy_book):
+    a, _ = workers
+    first = next(iter_overdue_records())
+    execute(policy_book, "UPDATE policy_info SET outstanding_amount = 0, status = 'Active' WHERE policy_number = ?",
+            (first.policy_number,))
+    assert a.claim().policy_number != first.policy_number
+    assert a.stats['skipped'] == 1
+
+def test_claim_policies_skips_held(workers):
+    a, b = workers
+    records = [record for _, record in zip(range(3), iter_overdue_records())]
+    held = a.claim()
+    others = [r.policy_number for r in records if r.policy_number != held.policy_number]
+    assert b.claim_policies([held.policy_number] + others) == others
+
+def test_concurrent_workers_never_share_a_claim(policy_book, clock):
+    total = sum(1 for _ in iter_overdue_records())
+    claimed = []
+    lock = threading.Lock()
+
+    def work(index):
+        queue = WorkQueue(worker_id=f"t{index}", lease_seconds=600, clock=clock)
+        try:
+            while True:
+                record = queue.claim()
+                if record is None:
+                    return
+                with lock:
+                    claimed.append(record.policy_number)
+                queue.complete(record.policy_number)
+        finally:
+            queue.close()
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == total
+    assert len(set(claimed)) == total
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Transcript Archive - compressed, time-partitioned transcript segments
+
+Rolls Customer_transcripts/*.txt into append-only segment files, one per
+month, rotated at a size limit. Each transcript is compressed on its own
+as a zstd frame (when the zstandard package is installed) or a gzip
+member. A segment is therefore a plain concatenated .zst/.gz stream that
+standard tools can read. zstd frames use a raw-content dictionary seeded
+with the calling script and the transcript headers, so the boilerplate
+every call repeats costs almost nothing; the dictionary is written once to
+the archive folder (zstdcat -D archive/dictionary.zdict reads a segment). An SQLite offset index maps each transcript name
+to (segment, offset, length). Reading one transcript mmaps its segment
+and decompresses only that slice.
+
+Usage:
+    python transcript_archive.py migrate                  # archive every .txt not yet archived
+    python transcript_archive.py migrate --older-than-days 7 --delete
+    python transcript_archive.py list --customer Kavita_Joshi
+    python transcript_archive.py read Kavita_Joshi_20250811_221027
+    python transcript_archive.py stats
+"""
+
+import os
+import re
+import sys
+import gzip
+import mmap
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+# zstd is optional; gzip (stdlib) is the fallback codec
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+TRANSCRIPT_FOLDER = "Customer_transcripts"
+ARCHIVE_FOLDER = os.path.join(TRANSCRIPT_FOLDER, "archive")
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+CODEC_EXTENSIONS = {'zstd': 'zst', 'gzip': 'gz'}
+DICTIONARY_FILE = "dictionary.zdict"
+
+# Section headers written by VAPIInsuranceBot.save_transcript
+TRANSCRIPT_HEADER = """
+=== VAPI CALL TRANSCRIPT ===
+Customer: 
+Call ID: 
+Date: 
+Status: ended
+Duration:  seconds
+Cost: $
+
+=== TRANSCRIPT ===
+AI: 
+User: 
+
+=== CALL METADATA ===
+Started At: 
+Ended At: 
+End Reason: customer-ended-call
+
+=== END OF TRANSCRIPT ===
+"""
+
+# Customer_Name_YYYYMMDD_HHMMSS.txt as written by VAPIInsuranceBot.save_transcript
+TRANSCRIPT_NAME = re.compile(r'^(?P<customer>.+)_(?P<stamp>\d{8}_\d{6})$')
+
+INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS transcripts (
+        name TEXT PRIMARY KEY,
+        customer TEXT,
+        call_time TEXT,
+        segment TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        raw_length INTEGER NOT NULL,
+        codec TEXT NOT NULL,
+        archived_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_transcripts_customer ON transcripts (customer, call_time);
+    CREATE INDEX IF NOT EXISTS idx_transcripts_segment ON transcripts (segment, offset);
+"""
+
+def build_dictionary_seed():
+    """Calling script plus transcript headers: the text most transcripts share"""
+    seed = ""
+    try:
+        from customer_script_generator import CustomerScriptGenerator
+        seed = CustomerScriptGenerator().calling_script
+    except Exception as e:
+        print(f"⚠️  Calling script unavailable for the compression dictionary: {e}")
+    # zstd prefers matches near the end of a raw dictionary, so the headers go last
+    return (seed + TRANSCRIPT_HEADER).encode('utf-8')
+
+def parse_transcript_name(name):
+    """(customer, call datetime or None) from a transcript file name"""
+    base = os.path.splitext(os.path.basename(name))[0]
+    match = TRANSCRIPT_NAME.match(base)
+    if not match:
+        return base, None
+    try:
+        return match.group('customer'), datetime.strptime(match.group('stamp'), "%Y%m%d_%H%M%S")
+    except ValueError:
+        return match.group('customer'), None
+
+class TranscriptArchive:
+    def __init__(self, root=ARCHIVE_FOLDER, codec=None, max_segment_bytes=MAX_SEGMENT_BYTES):
+        self.root = root
+        self.codec = codec or ('zstd' if ZSTD_AVAILABLE else 'gzip')
+        if self.codec == 'zstd' and not ZSTD_AVAILABLE:
+            raise ValueError("zstd codec needs the 'zstandard' package (pip install zstandard)")
+        if self.codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Unknown codec '{self.codec}'")
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(root, exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.index.executescript(INDEX_SCHEMA)
+        self._maps = {}  # segment -> mmap, remapped when the segment has grown
+        self._lock = threading.Lock()
+        self._dictionary = None
+        self._compressor = self._decompressor = None
+
+    def _zstd_dictionary(self):
+        """Archive's dictionary, created on first zstd write and never changed afterwards"""
+        if self._dictionary is None:
+            path = os.path.join(self.root, DICTIONARY_FILE)
+            if not os.path.exists(path):
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(build_dictionary_seed())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            with open(path, 'rb') as f:
+                self._dictionary = zstandard.ZstdCompressionDict(f.read(), dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        return self._dictionary
+
+    def _compress(self, data):
+        if self.codec == 'zstd':
+            if self._compressor is None:
+                self._compressor = zstandard.ZstdCompressor(level=10, dict_data=self._zstd_dictionary())
+            return self._compressor.compress(data)
+        return gzip.compress(data, compresslevel=9, mtime=0)
+
+    def _decompress(self, codec, data):
+        if codec == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise ValueError("This transcript is zstd-compressed; install 'zstandard' to read it")
+            if self._decompressor is None:
+                self._decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dictionary())
+            return self._decompressor.decompress(data)
+        return gzip.decompress(data)
+
+    def _segment_for(self, partition, incoming):
+        """Current segment of a partition, rotated when it would pass max_segment_bytes"""
+        extension = CODEC_EXTENSIONS[self.codec]
+        row = self.index.execute(
+            "SELECT segment FROM transcripts WHERE segment LIKE ? ORDER BY segment DESC LIMIT 1",
+            (f"transcripts-{partition}-%.{extension}",)
+        ).fetchone()
+        number = int(row[0].rsplit('-', 1)[1].split('.')[0]) if row else 1
+        segment = f"transcripts-{partition}-{number:04d}.{extension}"
+        path = os.path.join(self.root, segment)
+        if os.path.exists(path) and os.path.getsize(path) + incoming > self.max_segment_bytes:
+            segment = f"transcripts-{partition}-{number + 1:04d}.{extension}"
+        return segment
+
+    def add(self, name, text, call_time=None):
+        """Append one transcript; returns False if a transcript with this name is already archived"""
+        name = os.path.splitext(os.path.basename(name))[0]
+        customer, parsed_time = parse_transcript_name(name)
+        call_time = call_time or parsed_time or datetime.now()
+        raw = text.encode('utf-8')
+        with self._lock:
+            if self.index.execute("SELECT 1 FROM transcripts WHERE name = ?", (name,)).fetchone():
+                return False
+            member = self._compress(raw)  # compressor objects are not thread-safe
+            segment = self._segment_for(call_time.strftime("%Y-%m"), len(member))
+            with open(os.path.join(self.root, segment), 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            # Data is durable before the index points at it; a crash in between
+            # only leaves unreferenced bytes at the segment tail
+            with self.index:
+                self.index.execute(
+                    "INSERT INTO transcripts (name, customer, call_time, segment, offset, length, raw_length, codec) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, customer, call_time.isoformat(timespec='seconds'), segment, offset,
+                     len(member), len(raw), self.codec)
+                )
+        return True
+
+    def _view(self, segment, end):
+        """mmap of a segment covering at least `end` bytes"""
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            with open(os.path.join(self.root, segment), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def read(self, name):
+        """Transcript text by name (with or without .txt), or None if not archived"""
+        name = os.path.splitext(os.path.basename(name))[0]
+        with self._lock:
+            row = self.index.execute(
+                "SELECT segment, offset, length, codec FROM transcripts WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            segment, offset, length, codec = row
+            data = self._view(segment, offset + length)[offset:offset + length]
+            return self._decompress(codec, data).decode('utf-8')
+
+    def list(self, customer=None, since=None, until=None):
+        """Index rows (name, customer, call_time, segment, raw_length) in call order"""
+        query = "SELECT name, customer, call_time, segment, raw_length FROM transcripts WHERE 1 = 1"
+        params = []
+        if customer:
+            query += " AND customer = ?"
+            params.append(customer)
+        if since:
+            query += " AND call_time >= ?"
+            params.append(since)
+        if until:
+            query += " AND call_time < ?"
+            params.append(until)
+        with self._lock:
+            return self.index.execute(query + " ORDER BY call_time, name", params).fetchall()
+
+    def __contains__(self, name):
+        name = os.path.splitext(os.path.basename(name))[0]
+        with self._lock:
+            return self.index.execute("SELECT 1 FROM transcripts WHERE name = ?", (name,)).fetchone() is not None
+
+    def migrate(self, folder=TRANSCRIPT_FOLDER, older_than_days=0, delete=False):
+        """Archive every .txt in folder not yet archived; returns (archived, skipped)"""
+        cutoff = time.time() - older_than_days * 86400
+        archived = skipped = 0
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            if not filename.endswith('.txt') or not os.path.isfile(path):
+                continue
+            if older_than_days and os.path.getmtime(path) > cutoff:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            customer, call_time = parse_transcript_name(filename)
+            if self.add(filename, text, call_time or datetime.fromtimestamp(os.path.getmtime(path))):
+                archived += 1
+            else:
+                skipped += 1
+            if delete:
+                # Only remove the original once the archived copy reads back identical
+                if self.read(filename) == text:
+                    os.remove(path)
+                else:
+                    print(f"⚠️  Archived copy of {filename} differs - keeping the original")
+        return archived, skipped
+
+    def stats(self):
+        with self._lock:
+            count, raw, stored, segments = self.index.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_length), 0), COALESCE(SUM(length), 0), COUNT(DISTINCT segment) FROM transcripts"
+            ).fetchone()
+        return {'transcripts': count, 'raw_bytes': raw, 'stored_bytes': stored, 'segments': segments,
+                'ratio': round(raw / stored, 2) if stored else 0.0}
+
+    def close(self):
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self.index.close()
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compressed transcript archive")
+    parser.add_argument('--root', default=ARCHIVE_FOLDER, help="Archive folder")
+    parser.add_argument('--codec', choices=sorted(CODEC_EXTENSIONS), help="Default: zstd if installed, else gzip")
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('migrate', help="Archive existing .txt transcripts")
+    migrate.add_argument('--folder', default=TRANSCRIPT_FOLDER)
+    migrate.add_argument('--older-than-days', type=float, default=0)
+    migrate.add_argument('--delete', action='store_true', help="Remove originals after a verified archive")
+    listing = commands.add_parser('list', help="List archived transcripts")
+    listing.add_argument('--customer')
+    listing.add_argument('--since')
+    listing.add_argument('--until')
+    read = commands.add_parser('read', help="Print one transcript")
+    read.add_argument('name')
+    commands.add_parser('stats', help="Archive size and compression ratio")
+    args = parser.parse_args()
+
+    try:
+        archive = TranscriptArchive(args.root, args.codec)
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    try:
+        if args.command == 'read':
+            text = archive.read(args.name)
+            if text is None:
+                print(f"❌ '{args.name}' is not in the archive")
+                sys.exit(1)
+            sys.stdout.write(text)
+            return
+        print("🗄️  Transcript Archive")
+        print("=" * 60)
+        if args.command == 'migrate':
+            archived, skipped = archive.migrate(args.folder, args.older_than_days, args.delete)
+            print(f"✅ Archived {archived} transcripts ({skipped} already archived) with {archive.codec}")
+        elif args.command == 'list':
+            for name, customer, call_time, segment, raw_length in archive.list(args.customer, args.since, args.until):
+                print(f"   📄 {call_time}  {name}  ({raw_length / 1024:.1f} KB, {segment})")
+        stats = archive.stats()
+        print(f"📊 {stats['transcripts']} transcripts in {stats['segments']} segments: "
+              f"{stats['raw_bytes'] / 1024:.1f} KB -> {stats['stored_bytes'] / 1024:.1f} KB ({stats['ratio']}x)")
+    finally:
+        archive.close()
+
+if __name__ == "__main__":
+    main()
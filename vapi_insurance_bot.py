@@ -15,31 +15,139 @@ PERFORMANCE OPTIMIZATIONS (Latest Update):
 import os
 import sys
 import json
-import sqlite3
-import requests
 import time
 import socket
-import urllib3
+import random
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-from customer_script_generator import CustomerScriptGenerator
 
-# Load environment variables
-load_dotenv()
+from profiling import stage, record_stage, enable_from_argv
+from artifact_writer import ArtifactWriter, write_file
+
+class _LazyModule:
+    """Import a heavy dependency on first attribute access instead of at start-up"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+requests = _LazyModule('requests')
+# Only needed once an assistant is created or a transcript saved
+latency_analyzer = _LazyModule('latency_analyzer')
+
+# Opening and closing lines; None = language not known yet, so offer both
+FIRST_MESSAGES = {
+    None: "Hello और नमस्ते! Good Morning Sir, May I speak with {name}? आप हिंदी में भी बात कर सकते हैं।",
+    'en': "Hello, Good Morning Sir! May I speak with {name}?",
+    'hi': "नमस्ते, सुप्रभात! क्या मैं {name} जी से बात कर सकती हूं?",
+}
+END_CALL_MESSAGES = {
+    None: "Thank you for your time. धन्यवाद! Have a great day!",
+    'en': "Thank you for your time. Have a great day!",
+    'hi': "आपके समय के लिए धन्यवाद! आपका दिन शुभ हो!",
+}
+LANGUAGE_NAMES = {'en': 'English', 'hi': 'Hindi'}
+
+MULTILINGUAL_INSTRUCTIONS = """=== MULTILINGUAL SUPPORT INSTRUCTIONS ===
+- DEFAULT LANGUAGE: Start conversation in English
+- HINDI SUPPORT: If customer responds in Hindi or requests Hindi, immediately switch
+- LANGUAGE DETECTION: Recognize Hindi phrases like "हाँ" (yes), "नहीं" (no), "मैं हिंदी में बात करना चाहता हूं" (I want to speak in Hindi)
+- MIXED LANGUAGE: Use Hinglish (Hindi-English mix) naturally as Indians do
+- KEY HINDI PHRASES TO USE:
+  • "नमस्ते" (Namaste) for greeting
+  • "आपका पॉलिसी" (Your policy)  
+  • "प्रीमियम भरना है" (Premium payment needed)
+  • "धन्यवाद" (Thank you)
+- Automatically detect and respond in customer's preferred language"""
+
+_env_loaded = False
+
+def load_environment():
+    """Load .env once (python-dotenv is optional; real env vars always win)"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    if os.getenv('VAPI_SKIP_DOTENV') == '1':
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        print("⚠️  python-dotenv not installed; skipping .env")
+        return
+    load_dotenv()
+
+def is_interactive():
+    """Whether it is safe to prompt on stdin (false for cron, containers and VAPI_NON_INTERACTIVE=1)"""
+    if os.getenv('VAPI_NON_INTERACTIVE') == '1':
+        return False
+    try:
+        return sys.stdin is not None and sys.stdin.isatty()
+    except (AttributeError, ValueError):
+        return False
 
 class VAPIInsuranceBot:
-    def __init__(self, mock_mode=False):
+    def __init__(self, mock_mode=False, clock=None, interactive=None, campaign_queue=None, work_queue=None, dnc_filter=None, pacing=None, writer=None):
         """Initialize the VAPI Insurance Bot"""
+        load_environment()
+        from insurance_data import require_unsharded
+        require_unsharded("The bot")
         self.mock_mode = mock_mode
+        # Anything with time()/sleep(); campaign_simulator.VirtualClock skips real waiting
+        self.clock = clock or time
+        # Optional campaign_queue.OverdueQueue kept current from the change feed
+        self.campaign_queue = campaign_queue
+        # Optional work_queue.WorkQueue so several bot processes share one book
+        self.work_queue = work_queue
+        # dnc_filter.DNCFilter; loaded on first dial unless one is passed in
+        self._dnc_filter = dnc_filter
+        # Optional pacing_controller.PacingController fed with every VAPI response
+        self.pacing = pacing
+        # Optional artifact_writer.ArtifactWriter; scripts and transcripts are written inline without one
+        self.writer = writer
         self.api_key = os.getenv('VAPI_API_KEY')
         self.phone_number_id = os.getenv('VAPI_PHONE_NUMBER_ID')
         self.base_url = os.getenv('VAPI_BASE_URL', 'https://api.vapi.ai')
         self.db_path = os.getenv('DATABASE_PATH', 'insurance_db.sqlite')
         
+        # HTTP behaviour (tunable for load tests against fake_vapi_server.py)
+        self.max_retries = int(os.getenv('VAPI_MAX_RETRIES', '3'))
+        self.retry_backoff = float(os.getenv('VAPI_RETRY_BACKOFF', '1.0'))
+        self.poll_interval = float(os.getenv('VAPI_POLL_INTERVAL', '10'))
+        self.request_timeout = float(os.getenv('VAPI_REQUEST_TIMEOUT', '30'))
+        
+        # Latency-relevant assistant settings (compare variants with latency_analyzer.py)
+        self.llm_model = os.getenv('VAPI_LLM_MODEL', 'gpt-4o-mini')
+        self.voice_model = os.getenv('VAPI_VOICE_MODEL', 'eleven_flash_v2_5')
+        self.transcriber_model = os.getenv('VAPI_TRANSCRIBER_MODEL', 'nova-2')
+        self.response_delay = float(os.getenv('VAPI_RESPONSE_DELAY', '0.8'))
+        self.llm_request_delay = float(os.getenv('VAPI_LLM_REQUEST_DELAY', '0.1'))
+        self._thread_local = threading.local()
+        self._network_checked = False
+        self.http_stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'server_errors': 0}
+        self._stats_lock = threading.Lock()
+        # Warm state for long-lived processes (campaign_daemon.py): the parsed
+        # system prompt, and assistants already created for an identical config
+        self._system_prompt = None  # (mtime, text)
+        self.assistant_cache_size = int(os.getenv('VAPI_ASSISTANT_CACHE', '256'))
+        self._assistant_cache = OrderedDict()  # config digest -> assistant
+        self.cache_stats = {'assistant_hits': 0, 'assistant_misses': 0, 'prompt_loads': 0}
+        
         if self.mock_mode:
             print("🎭 Running in MOCK MODE - No actual API calls will be made")
         elif not self.api_key or not self.phone_number_id:
             print("⚠️  API credentials not found. Consider using mock mode for testing.")
+            if interactive is None:
+                interactive = is_interactive()
+            if not interactive:
+                raise ValueError("❌ VAPI_API_KEY and VAPI_PHONE_NUMBER_ID must be set (non-interactive start; use --mock to simulate)")
             response = input("Would you like to run in mock mode? (y/n): ").lower()
             if response == 'y':
                 self.mock_mode = True
@@ -52,7 +160,9 @@ class VAPIInsuranceBot:
             'Content-Type': 'application/json'
         }
         
+        from customer_script_generator import CustomerScriptGenerator
         self.script_generator = CustomerScriptGenerator(self.db_path)
+        self.script_generator.writer = writer
         
         # Create folders for transcripts
         self.transcript_folder = "Customer_transcripts"
@@ -60,6 +170,65 @@ class VAPIInsuranceBot:
             os.makedirs(self.transcript_folder)
             print(f"📁 Created transcript folder: {self.transcript_folder}")
 
+    @property
+    def session(self):
+        """Per-thread HTTP session so concurrent calls reuse keep-alive connections"""
+        session = getattr(self._thread_local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._thread_local.session = session
+        return session
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.http_stats[key] += 1
+
+    def _request(self, method, path, **kwargs):
+        """Send a VAPI request, retrying 429s, 5xx responses and connection errors"""
+        # One profiling stage per endpoint (retries included)
+        with stage(f"http.{method} /{path.strip('/').split('/')[0]}"):
+            return self._request_with_retries(method, path, **kwargs)
+
+    def _request_with_retries(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.request_timeout)
+        url = f"{self.base_url}{path}"
+        
+        for attempt in range(self.max_retries + 1):
+            self._count('requests')
+            sent = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if self.pacing is not None:
+                    self.pacing.record_response(time.perf_counter() - sent, None)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+            else:
+                if self.pacing is not None:
+                    self.pacing.record_response(time.perf_counter() - sent, response.status_code)
+                if response.status_code == 429:
+                    self._count('rate_limited')
+                elif response.status_code >= 500:
+                    self._count('server_errors')
+                else:
+                    return response
+                
+                if attempt >= self.max_retries:
+                    return response
+                
+                # Honour Retry-After when VAPI sends it, otherwise back off exponentially
+                retry_after = response.headers.get('Retry-After')
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = self.retry_backoff * (2 ** attempt)
+            
+            self._count('retries')
+            print(f"🔁 Retrying {method} {path} in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            self.clock.sleep(delay * random.uniform(1.0, 1.2))
+
     def test_network_connectivity(self):
         """Test network connectivity and DNS resolution"""
         print("🔍 Testing network connectivity...")
@@ -108,52 +277,154 @@ class VAPIInsuranceBot:
     def get_overdue_customer(self):
         """Get the customer with the longest overdue premium"""
         print("🔍 Finding customer with longest overdue premium...")
+        if self.work_queue is not None:
+            # Leased claim: no other worker gets this customer while we hold it
+            self.work_queue.start_heartbeat()
+            return self.work_queue.claim()
+        if self.campaign_queue is not None:
+            # Apply only the policy_info deltas since the last pick instead of re-querying
+            self.campaign_queue.refresh()
+            return self.campaign_queue.pop()
         return self.script_generator.get_longest_overdue_customer()
 
-    def generate_customer_script(self, customer_data):
+    def is_still_overdue(self, record):
+        """Re-read the policy right before dialing; a payment may have landed meanwhile"""
+        from insurance_data import fetch_record_by_policy, is_overdue
+        try:
+            current = fetch_record_by_policy(record.policy_number)
+        except Exception as e:
+            print(f"⚠️  Could not re-check {record.policy_number}: {e}")
+            return True
+        return current is not None and is_overdue(current)
+
+    def drop_paid_members(self, household):
+        """Re-check every policy on the call right before dialing; paid ones leave the queues
+
+        Returns the members still overdue, in campaign order. The first of
+        them is who the call should be addressed to.
+        """
+        due = [member for member in household if self.is_still_overdue(member)]
+        if len(due) < len(household):
+            self.finish_household([member for member in household if member not in due])
+        return due
+
+    def get_household(self, record):
+        """The customer plus every other overdue policy on the same phone number"""
+        from insurance_data import fetch_household_records
+        try:
+            others = [r for r in fetch_household_records(record.phone_number) if r.policy_number != record.policy_number]
+        except Exception as e:
+            print(f"⚠️  Could not look up household for {record.phone_number}: {e}")
+            return [record]
+        if self.work_queue is not None and others:
+            # Only fold in policies no other worker is already handling
+            taken = set(self.work_queue.claim_policies([r.policy_number for r in others]))
+            others = [r for r in others if r.policy_number in taken]
+        return [record] + others
+
+    def finish_household(self, household):
+        """Take every policy covered by the call out of the queues"""
+        for member in household:
+            if self.campaign_queue is not None:
+                self.campaign_queue.discard(member.policy_number)
+            if self.work_queue is not None:
+                self.work_queue.complete(member.policy_number)
+
+    def record_call_history(self, call_data, records, transcript_path=None):
+        """Append the call to call_history (used by the analyze_customer_data prompt)"""
+        if self.mock_mode:
+            # Mock transcripts are canned; storing them would give real customers a fake history and language
+            return
+        from insurance_data import record_call_history
+        try:
+            record_call_history(call_data, records, transcript_path)
+        except Exception as e:
+            print(f"⚠️  Could not record call history: {e}")
+        self.remember_language(call_data, records)
+
+    def remember_language(self, call_data, records):
+        """Store the language the customer chose or spoke, so the next call opens in it"""
+        from insurance_data import detect_call_language, record_language_preference
+        try:
+            language, source = detect_call_language(call_data)
+            if language is None:
+                return None
+            record_language_preference(records, language, source, call_data.get('id'))
+            print(f"🗣️  Language for next call: {LANGUAGE_NAMES[language]} ({source})")
+            return language
+        except Exception as e:
+            print(f"⚠️  Could not store language preference: {e}")
+            return None
+
+    def language_for(self, record):
+        """Language remembered from an earlier call ('en' / 'hi'), or None to ask"""
+        from insurance_data import fetch_language_preference
+        try:
+            return fetch_language_preference(record.policy_number)
+        except Exception as e:
+            print(f"⚠️  Could not look up language for {record.policy_number}: {e}")
+            return None
+
+    def base_system_prompt(self):
+        """SYSTEM_PROMPT from system_promt.py, re-read only when the file changes"""
+        mtime = os.path.getmtime('system_promt.py')
+        cached = self._system_prompt
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open('system_promt.py', 'r', encoding='utf-8') as f:
+            system_prompt_content = f.read()
+        
+        # Extract the SYSTEM_PROMPT variable content
+        start_marker = 'SYSTEM_PROMPT = """'
+        end_marker = '"""'
+        start_idx = system_prompt_content.find(start_marker) + len(start_marker)
+        end_idx = system_prompt_content.find(end_marker, start_idx)
+        text = system_prompt_content[start_idx:end_idx].strip()
+        self._system_prompt = (mtime, text)
+        self.cache_stats['prompt_loads'] += 1
+        return text
+
+    def generate_customer_script(self, record, language=None):
         """Generate personalized script for customer"""
-        print(f"📝 Generating script for {customer_data.get('policy_holder_name')}...")
-        return self.script_generator.create_customer_script_file(customer_data)
+        print(f"📝 Generating script for {record.policy_holder_name}...")
+        with stage("script.generate"):
+            return self.script_generator.create_customer_script_file(record, language)
 
-    def create_vapi_assistant(self, customer_data, script_content):
-        """Create a VAPI assistant with personalized system prompt"""
+    def create_vapi_assistant(self, record, script_content, language=None):
+        """Create a VAPI assistant with personalized system prompt (single-language if language is known)"""
         try:
             # Mock mode - simulate assistant creation
             if self.mock_mode:
-                print(f"🎭 MOCK: Creating assistant for {customer_data.get('policy_holder_name')}...")
-                time.sleep(2)  # Simulate API delay
+                print(f"🎭 MOCK: Creating assistant for {record.policy_holder_name}...")
+                self.clock.sleep(2)  # Simulate API delay
                 mock_assistant = {
-                    'id': f"mock_assistant_{int(time.time())}",
-                    'name': f"Arjun_Insurance_Agent_{customer_data.get('policy_number', '')}",
+                    'id': f"mock_assistant_{int(self.clock.time())}",
+                    'name': f"Arjun_Insurance_Agent_{record.policy_number}",
                     'status': 'active'
                 }
                 print(f"✅ MOCK: Assistant created successfully: {mock_assistant['id']}")
                 return mock_assistant
             
-            # Test network connectivity first
-            if not self.test_network_connectivity():
-                print("❌ Network connectivity test failed. Please fix network issues before proceeding.")
-                return None
+            # Test network connectivity first (once per bot)
+            if not self._network_checked:
+                if not self.test_network_connectivity():
+                    print("❌ Network connectivity test failed. Please fix network issues before proceeding.")
+                    return None
+                self._network_checked = True
             
             # Read the system prompt template
-            with open('system_promt.py', 'r', encoding='utf-8') as f:
-                system_prompt_content = f.read()
-            
-            # Extract the SYSTEM_PROMPT variable content
-            start_marker = 'SYSTEM_PROMPT = """'
-            end_marker = '"""'
-            start_idx = system_prompt_content.find(start_marker) + len(start_marker)
-            end_idx = system_prompt_content.find(end_marker, start_idx)
-            base_system_prompt = system_prompt_content[start_idx:end_idx].strip()
-            
-            # Format numbers using the same functions as script generator
-            outstanding_amt = customer_data.get('outstanding_amount', 0)
-            sum_assured_amt = customer_data.get('sum_assured', 0)
-            fund_value_amt = customer_data.get('fund_value', 0)
-            total_paid_amt = customer_data.get('total_premium_paid', 0)
-            loyalty_amt = customer_data.get('loyalty_benefits', 0)
-            
-            # Use the generated calling script as the main prompt with multilingual support
+            prompt_started = time.perf_counter()
+            base_system_prompt = self.base_system_prompt()
+            
+            if language is not None:
+                # Known from an earlier call: no language detection or Hindi phrase list needed
+                language_instructions = f"""=== LANGUAGE ===
+- Speak {LANGUAGE_NAMES[language]} only; the customer chose it on an earlier call
+- Switch language only if the customer explicitly asks"""
+            else:
+                language_instructions = MULTILINGUAL_INSTRUCTIONS
+            
+            # Use the generated calling script as the main prompt
             enhanced_prompt = f"""{base_system_prompt}
 
 === GENERATED CALLING SCRIPT ===
@@ -161,16 +432,7 @@ Follow this complete calling script with all conversation flows and rebuttals:
 
 {script_content}
 
-=== MULTILINGUAL SUPPORT INSTRUCTIONS ===
-- DEFAULT LANGUAGE: Start conversation in English
-- HINDI SUPPORT: If customer responds in Hindi or requests Hindi, immediately switch
-- LANGUAGE DETECTION: Recognize Hindi phrases like "हाँ" (yes), "नहीं" (no), "मैं हिंदी में बात करना चाहता हूं" (I want to speak in Hindi)
-- MIXED LANGUAGE: Use Hinglish (Hindi-English mix) naturally as Indians do
-- KEY HINDI PHRASES TO USE:
-  • "नमस्ते" (Namaste) for greeting
-  • "आपका पॉलिसी" (Your policy)  
-  • "प्रीमियम भरना है" (Premium payment needed)
-  • "धन्यवाद" (Thank you)
+{language_instructions}
 
 === ADDITIONAL INSTRUCTIONS ===
 - Follow the script structure but adapt naturally to customer responses
@@ -178,16 +440,22 @@ Follow this complete calling script with all conversation flows and rebuttals:
 - Handle objections using the rebuttals provided in the script
 - Stay in character as Arjun throughout the conversation
 - Be polite, professional, and helpful
-- Automatically detect and respond in customer's preferred language
 """
+            transcriber = {
+                "provider": "deepgram",  # Keeping Deepgram for accuracy  
+                "model": self.transcriber_model,  # nova-2: latest fastest model
+                "language": "en" if language == 'en' else "hi",  # Hindi unless the customer chose English
+            }
+            if language != 'en':
+                transcriber["codeSwitchingEnabled"] = True  # Enable switching between Hindi and English
 
             # Assistant configuration with optimized low-latency settings
             assistant_config = {
-                "name": f"Arjun_Insurance_Agent_{customer_data.get('policy_number', '')}",
-                "firstMessage": f"Hello और नमस्ते! Good Morning Sir, May I speak with {customer_data.get('policy_holder_name', 'the policy holder')}? आप हिंदी में भी बात कर सकते हैं।",
+                "name": f"Arjun_Insurance_Agent_{record.policy_number}",
+                "firstMessage": FIRST_MESSAGES[language].format(name=record.policy_holder_name),
                 "model": {
                     "provider": "openai",
-                    "model": "gpt-4o-mini",  # Fastest OpenAI model with lowest latency
+                    "model": self.llm_model,  # gpt-4o-mini: fastest OpenAI model with lowest latency
                     "temperature": 0.6,  # Slightly lower for faster processing
                     "maxTokens": 250,  # Reduced for faster responses
                     "messages": [
@@ -200,7 +468,7 @@ Follow this complete calling script with all conversation flows and rebuttals:
                 "voice": {
                     "provider": "11labs",  # Correct VAPI provider name for ElevenLabs
                     "voiceId": "pNInz6obpgDQGcFmaJgB",  # Adam - clear, professional voice
-                    "model": "eleven_flash_v2_5",  # Ultra low-latency model (sub-100ms)
+                    "model": self.voice_model,  # eleven_flash_v2_5: ultra low-latency model (sub-100ms)
                     "stability": 0.85,  # Higher stability for clearer speech
                     "similarityBoost": 0.8,  # Good balance of consistency
                     "style": 0.15,  # Subtle style for natural conversation
@@ -211,46 +479,59 @@ Follow this complete calling script with all conversation flows and rebuttals:
                     # For Azure Indian voices: "provider": "azure", "voiceId": "en-IN-NeerjaNeural" 
                     # For Cartesia ultra-low latency: "provider": "cartesia", "voiceId": "a0e99841-438c-4a64-b679-ae501e7d6091"
                 },
-                "transcriber": {
-                    "provider": "deepgram",  # Keeping Deepgram for accuracy  
-                    "model": "nova-2",  # Latest fastest model
-                    "language": "hi",  # Hindi language support
-                    "codeSwitchingEnabled": True  # Enable switching between Hindi and English
-                },
+                "transcriber": transcriber,
                 "firstMessageMode": "assistant-speaks-first",
-                "endCallMessage": "Thank you for your time. धन्यवाद! Have a great day!",
+                "endCallMessage": END_CALL_MESSAGES[language],
                 "maxDurationSeconds": 600,  # 10 minutes max
                 "backgroundSound": "off",
                 "silenceTimeoutSeconds": 30,  # Faster timeout for better flow
-                "responseDelaySeconds": 0.8,  # Reduced delay for snappier responses
-                "llmRequestDelaySeconds": 0.1,  # Minimal LLM delay
+                "responseDelaySeconds": self.response_delay,  # Reduced delay for snappier responses
+                "llmRequestDelaySeconds": self.llm_request_delay,  # Minimal LLM delay
                 "artifactPlan": {
                     "recordingEnabled": True,
                     "transcriptPlan": {
                         "enabled": True,
                         "assistantName": "Arjun",
-                        "userName": customer_data.get('policy_holder_name', 'Customer')
+                        "userName": record.policy_holder_name
                     }
                 }
             }
+            record_stage("prompt.assemble", time.perf_counter() - prompt_started)
             
-            print(f"🤖 Creating multilingual VAPI assistant for {customer_data.get('policy_holder_name')}...")
+            print(f"🤖 Creating multilingual VAPI assistant for {record.policy_holder_name}...")
             print(f"🚀 Using optimized settings:")
             print(f"   • Model: {assistant_config['model']['model']} (fastest OpenAI model)")
             print(f"   • Voice: {assistant_config['voice']['provider']} with {assistant_config['voice']['model']} (sub-100ms latency)")
-            print(f"   • Transcriber: {assistant_config['transcriber']['provider']} {assistant_config['transcriber']['model']} (Hindi + code-switching enabled)")
-            print(f"   • Languages: Hindi (हिंदी) + English + Hinglish mix supported")
+            print(f"   • Transcriber: {transcriber['provider']} {transcriber['model']} ({transcriber['language']})")
+            if language is not None:
+                print(f"   • Language: {LANGUAGE_NAMES[language]} only (remembered from an earlier call)")
+            else:
+                print(f"   • Languages: Hindi (हिंदी) + English + Hinglish mix supported")
+            
+            # The same customer, script and settings again (a resumed or retried job): reuse it
+            digest = hashlib.sha1(json.dumps(assistant_config, sort_keys=True).encode('utf-8')).hexdigest()
+            with self._stats_lock:
+                cached = self._assistant_cache.get(digest)
+                if cached is not None:
+                    self._assistant_cache.move_to_end(digest)
+                    self.cache_stats['assistant_hits'] += 1
+            if cached is not None:
+                print(f"♻️  Reusing assistant {cached['id']} (identical configuration)")
+                return cached
             
-            response = requests.post(
-                f"{self.base_url}/assistant",
-                headers=self.headers,
-                json=assistant_config,
-                timeout=30
-            )
+            response = self._request('POST', '/assistant', json=assistant_config)
             
             if response.status_code == 201:
                 assistant = response.json()
+                # Kept with the transcript so turn latency can be grouped by configuration
+                assistant['latencyProfile'] = latency_analyzer.latency_profile(assistant_config)
                 print(f"✅ Assistant created successfully: {assistant['id']}")
+                with self._stats_lock:
+                    self.cache_stats['assistant_misses'] += 1
+                    if self.assistant_cache_size > 0:
+                        self._assistant_cache[digest] = assistant
+                        while len(self._assistant_cache) > self.assistant_cache_size:
+                            self._assistant_cache.popitem(last=False)
                 return assistant
             else:
                 print(f"❌ Failed to create assistant: {response.status_code}")
@@ -278,50 +559,65 @@ Follow this complete calling script with all conversation flows and rebuttals:
             print("💡 Please check your API credentials and configuration.")
             return None
 
-    def make_call(self, assistant_id, customer_data):
+    @property
+    def dnc_filter(self):
+        if self._dnc_filter is None:
+            from dnc_filter import DNCFilter
+            self._dnc_filter = DNCFilter()
+        return self._dnc_filter
+
+    def is_do_not_call(self, record):
+        """True if the customer's number is on the do-not-call / opt-out list"""
+        return self.dnc_filter.is_blocked(record.phone_number or '+919849475949')
+
+    def make_call(self, assistant_id, record):
         """Make a call using VAPI"""
         try:
+            # Regulatory suppression: never dial a DNC / opted-out number
+            if self.is_do_not_call(record):
+                if self.dnc_filter.missing:
+                    print(f"🚫 No do-not-call list loaded - not dialing {record.policy_holder_name}")
+                else:
+                    print(f"🚫 {record.policy_holder_name}'s number is on the do-not-call list - not dialing")
+                return None
+            
             # Mock mode - simulate call initiation
             if self.mock_mode:
-                customer_phone = customer_data.get('phone_number', '+919849475949')
-                print(f"🎭 MOCK: Making call to {customer_data.get('policy_holder_name')} at {customer_phone}...")
-                time.sleep(1)  # Simulate API delay
+                customer_phone = record.phone_number or '+919849475949'
+                print(f"🎭 MOCK: Making call to {record.policy_holder_name} at {customer_phone}...")
+                self.clock.sleep(1)  # Simulate API delay
                 mock_call = {
-                    'id': f"mock_call_{int(time.time())}",
+                    'id': f"mock_call_{int(self.clock.time())}",
                     'status': 'ringing',
                     'assistantId': assistant_id,
                     'customer': {
                         'number': customer_phone,
-                        'name': customer_data.get('policy_holder_name', 'Customer')
+                        'name': record.policy_holder_name
                     }
                 }
                 print(f"✅ MOCK: Call initiated successfully: {mock_call['id']}")
                 return mock_call
             
-            customer_phone = customer_data.get('phone_number', '+919849475949')
+            customer_phone = record.phone_number or '+919849475949'
             
             call_config = {
                 "assistantId": assistant_id,
                 "phoneNumberId": self.phone_number_id,
                 "customer": {
                     "number": customer_phone,
-                    "name": customer_data.get('policy_holder_name', 'Customer')
+                    "name": record.policy_holder_name
                 },
                 "metadata": {
-                    "policy_number": customer_data.get('policy_number', ''),
-                    "customer_name": customer_data.get('policy_holder_name', ''),
-                    "outstanding_amount": str(customer_data.get('outstanding_amount', 0)),
+                    "policy_number": record.policy_number,
+                    "customer_name": record.policy_holder_name,
+                    "outstanding_amount": str(record.outstanding_amount),
                     "campaign": "Insurance_Premium_Collection"
                 }
             }
             
-            print(f"📞 Making call to {customer_data.get('policy_holder_name')} at {customer_phone}...")
+            print(f"📞 Making call to {record.policy_holder_name} at {customer_phone}...")
             
-            response = requests.post(
-                f"{self.base_url}/call",
-                headers=self.headers,
-                json=call_config
-            )
+            response = self._request('POST', '/call', json=call_config)
             
             if response.status_code == 201:
                 call = response.json()
@@ -348,7 +644,7 @@ Follow this complete calling script with all conversation flows and rebuttals:
             # Simulate call states
             states = ['ringing', 'in-progress', 'completed']
             for state in states:
-                time.sleep(3)  # Simulate time passing
+                self.clock.sleep(3)  # Simulate time passing
                 print(f"📊 MOCK Call status: {state}")
             
             # Return mock completed call data
@@ -389,15 +685,12 @@ Follow this complete calling script with all conversation flows and rebuttals:
             print(f"🎯 MOCK: Call completed with status: completed")
             return mock_call_data
         
-        start_time = time.time()
+        start_time = self.clock.time()
         max_wait_seconds = max_wait_minutes * 60
         
-        while time.time() - start_time < max_wait_seconds:
+        while self.clock.time() - start_time < max_wait_seconds:
             try:
-                response = requests.get(
-                    f"{self.base_url}/call/{call_id}",
-                    headers=self.headers
-                )
+                response = self._request('GET', f'/call/{call_id}')
                 
                 if response.status_code == 200:
                     call_data = response.json()
@@ -408,20 +701,20 @@ Follow this complete calling script with all conversation flows and rebuttals:
                     if status in ['ended', 'completed', 'failed']:
                         print(f"🎯 Call completed with status: {status}")
                         return call_data
-                    
-                    # Wait before next check
-                    time.sleep(10)
                 else:
                     print(f"❌ Error checking call status: {response.status_code}")
                     
             except Exception as e:
                 print(f"❌ Error monitoring call: {e}")
+            
+            # Wait before next check
+            self.clock.sleep(self.poll_interval)
                 
         print(f"⏰ Call monitoring timeout after {max_wait_minutes} minutes")
         return None
 
-    def save_transcript(self, call_data, customer_name):
-        """Save call transcript to file"""
+    def save_transcript(self, call_data, customer_name, latency_profile=None):
+        """Save call transcript to file, with per-message timestamps alongside for latency_analyzer.py"""
         try:
             if not call_data or 'artifact' not in call_data:
                 print("❌ No call artifact data available for transcript")
@@ -463,11 +756,22 @@ End Reason: {call_data.get('endedReason', 'N/A')}
 === END OF TRANSCRIPT ===
 """
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(transcript_content)
+            write_file(filepath, transcript_content, self.writer)
+            
+            timing = {
+                'call_id': call_data.get('id'),
+                'customer': customer_name,
+                'assistant_id': call_data.get('assistantId'),
+                'assistant_profile': latency_profile,
+                'startedAt': call_data.get('startedAt'),
+                'endedAt': call_data.get('endedAt'),
+                'endedReason': call_data.get('endedReason'),
+                'messages': latency_analyzer.timed_messages(call_data),
+            }
+            write_file(os.path.splitext(filepath)[0] + '.json', json.dumps(timing, ensure_ascii=False), self.writer)
             
-            print(f"✅ Transcript saved: {filepath}")
-            return True
+            print(f"✅ Transcript {'queued' if self.writer is not None else 'saved'}: {filepath}")
+            return filepath
             
         except Exception as e:
             print(f"❌ Error saving transcript: {e}")
@@ -480,44 +784,84 @@ End Reason: {call_data.get('endedReason', 'N/A')}
         
         try:
             # Step 1: Get overdue customer
-            customer_data = self.get_overdue_customer()
-            if not customer_data:
+            with stage("db.get_overdue_customer"):
+                record = self.get_overdue_customer()
+            if not record:
                 print("❌ No overdue customers found!")
                 return False
             
-            customer_name = customer_data.get('policy_holder_name', 'Customer')
+            customer_name = record.policy_holder_name
             print(f"\n🎯 Target Customer: {customer_name}")
-            print(f"📋 Policy: {customer_data.get('policy_number', 'N/A')}")
-            print(f"💰 Outstanding: {self.script_generator.number_to_words(customer_data.get('outstanding_amount', 0))} ({self.script_generator.format_currency(customer_data.get('outstanding_amount', 0))})")
-            
-            # Step 2: Generate customer script
-            script_file = self.generate_customer_script(customer_data)
-            if not script_file:
-                print("❌ Failed to generate customer script!")
-                return False
-            
-            # Read script content
-            with open(script_file, 'r', encoding='utf-8') as f:
-                script_content = f.read()
-            
-            # Step 3: Create VAPI assistant
-            assistant = self.create_vapi_assistant(customer_data, script_content)
-            if not assistant:
-                print("❌ Failed to create VAPI assistant!")
-                return False
+            print(f"📋 Policy: {record.policy_number}")
+            print(f"💰 Outstanding: {self.script_generator.number_to_words(record.outstanding_amount)} ({self.script_generator.format_currency(record.outstanding_amount)})")
+            
+            # Other overdue policies on the same number go into this one call
+            with stage("db.get_household"):
+                household = self.get_household(record)
+            if self.is_do_not_call(record):
+                if self.dnc_filter.missing:
+                    # Fail closed, and leave the household in the queues for when the list is back
+                    print("❌ No do-not-call list - not dialing")
+                    return False
+                print(f"🚫 {record.phone_number} is on the do-not-call list - skipping household")
+                self.finish_household(household)
+                return True
+            
+            while True:
+                record = household[0]
+                customer_name = record.policy_holder_name
+                
+                # Step 2: Generate customer script, in the customer's language if we already know it
+                language = self.language_for(record)
+                if len(household) > 1:
+                    print(f"👨‍👩‍👧 {len(household)} overdue policies share {record.phone_number} - one combined call")
+                else:
+                    print(f"📝 Generating script for {customer_name}...")
+                with stage("script.generate"):
+                    script_file, script_content = self.script_generator.create_script(household, language)
+                if not script_file:
+                    print("❌ Failed to generate customer script!")
+                    return False
+                
+                # Step 3: Create VAPI assistant
+                assistant = self.create_vapi_assistant(record, script_content, language)
+                if not assistant:
+                    print("❌ Failed to create VAPI assistant!")
+                    return False
+                
+                # Step 4: Make the call, unless premiums were paid while we prepared
+                due = self.drop_paid_members(household)
+                if len(due) == len(household):
+                    break
+                if not due:
+                    if len(household) == 1:
+                        print(f"💰 {customer_name} has already paid - skipping call")
+                    else:
+                        print(f"💰 Every policy on {record.phone_number} has been paid - skipping call")
+                    return True
+                if due[0] is not record:
+                    # The rest of the household still owes; address the call to the next of them
+                    print(f"💰 {customer_name} has already paid - calling {due[0].policy_holder_name} about the remaining policies")
+                else:
+                    print(f"💰 {len(household) - len(due)} policies on {record.phone_number} were paid meanwhile - updating the script")
+                household = due
             
-            # Step 4: Make the call
-            call = self.make_call(assistant['id'], customer_data)
+            call = self.make_call(assistant['id'], record)
             if not call:
                 print("❌ Failed to initiate call!")
                 return False
             
             # Step 5: Monitor call completion
-            completed_call = self.monitor_call(call['id'], customer_name)
+            with stage("call.monitor"):
+                completed_call = self.monitor_call(call['id'], customer_name)
             
-            # Step 6: Save transcript
+            # Step 6: Save transcript and the call outcome for every policy it covered
             if completed_call:
-                self.save_transcript(completed_call, customer_name)
+                with stage("transcript.save"):
+                    transcript_path = self.save_transcript(completed_call, customer_name, assistant.get('latencyProfile'))
+                with stage("db.record_call_history"):
+                    self.record_call_history(completed_call, household, transcript_path or None)
+            self.finish_household(household)
             
             print("\n🎉 Campaign completed successfully!")
             print(f"📞 Call ID: {call['id']}")
@@ -528,21 +872,55 @@ End Reason: {call_data.get('endedReason', 'N/A')}
         except Exception as e:
             print(f"❌ Campaign failed: {e}")
             return False
+        finally:
+            if self.work_queue is not None:
+                # Anything still held (failed before completing) goes back to the pool
+                for policy_number in list(self.work_queue.held):
+                    self.work_queue.release(policy_number)
 
 def main():
     """Main function"""
     print("🤖 VAPI Insurance Bot - Automated Customer Outreach")
     print("=" * 60)
     
-    # Check for mock mode argument
-    mock_mode = len(sys.argv) > 1 and sys.argv[1] == '--mock'
+    # --profile: CPU, memory and stage report in profiles/ when the run ends
+    enable_from_argv('vapi_insurance_bot')
+    
+    # Check for mock mode / non-interactive arguments
+    mock_mode = '--mock' in sys.argv
+    if '--non-interactive' in sys.argv:
+        os.environ['VAPI_NON_INTERACTIVE'] = '1'
+    
+    # --fake-vapi runs the real HTTP path against a local fake_vapi_server.py
+    if '--fake-vapi' in sys.argv:
+        from fake_vapi_server import FakeVAPIConfig, FakeVAPIServer
+        fake_server = FakeVAPIServer(('127.0.0.1', 0), FakeVAPIConfig(answer_rate=1.0, time_scale=0.01))
+        fake_server.start_background()
+        os.environ.update({
+            'VAPI_BASE_URL': fake_server.base_url,
+            'VAPI_API_KEY': os.getenv('VAPI_API_KEY') or 'fake-vapi-key',
+            'VAPI_PHONE_NUMBER_ID': os.getenv('VAPI_PHONE_NUMBER_ID') or 'fake-vapi-number',
+            'VAPI_POLL_INTERVAL': os.getenv('VAPI_POLL_INTERVAL', '0.5'),
+        })
+        print(f"🎭 Using fake VAPI server at {fake_server.base_url}")
     
     try:
+        # --worker: claim customers through the shared lease table so several
+        # bot processes can run against one book without double-dialing
+        work_queue = None
+        if '--worker' in sys.argv:
+            from work_queue import WorkQueue
+            work_queue = WorkQueue()
+        
+        # Scripts and transcripts go to disk on a background thread
+        writer = ArtifactWriter()
+        
         # Initialize bot
-        bot = VAPIInsuranceBot(mock_mode=mock_mode)
+        bot = VAPIInsuranceBot(mock_mode=mock_mode, work_queue=work_queue, writer=writer)
         
         # Run campaign
         success = bot.run_campaign()
+        writer.close()
         
         if success:
             print("\n✅ Campaign completed successfully!")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Work Queue - lease-based claiming so many campaign workers share one book
+
+Each worker claims the next overdue policy atomically in policy_claims.
+The claim is a lease: the holder renews it with heartbeat() while the
+call is in progress. If a worker dies, its lease expires and the policy
+can be claimed again. Any number of worker processes can share the
+database file, and no two of them ever hold a live claim on the same
+policy. The database runs in WAL mode, which needs a local disk, so
+workers on other hosts should reach it through a shared service rather
+than a network mount.
+
+Usage:
+    queue = WorkQueue(worker_id="host-a:1")
+    record = queue.claim()
+    ...
+    queue.complete(record.policy_number)
+"""
+
+import os
+import time
+import random
+import socket
+import sqlite3
+import threading
+
+import insurance_data
+from insurance_data import OVERDUE_FILTER, fetch_record_by_policy, is_overdue, require_unsharded
+
+# Overdue policies are enqueued once as 'ready' rows sorted by due date, so
+# claiming is an index lookup rather than a scan past everything already done
+CLAIMS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS policy_claims (
+        policy_number TEXT PRIMARY KEY,
+        due_date TEXT,
+        state TEXT NOT NULL DEFAULT 'ready',
+        worker_id TEXT,
+        claimed_at REAL,
+        lease_expires REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        completed_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_policy_claims_ready ON policy_claims (state, due_date, policy_number);
+    CREATE INDEX IF NOT EXISTS idx_policy_claims_expiry ON policy_claims (state, lease_expires);
+"""
+
+ENQUEUE_SQL = f"""
+    INSERT OR IGNORE INTO policy_claims (policy_number, due_date, state)
+    SELECT policy_number, date(premium_due_date), 'ready'
+    FROM policy_info WHERE {OVERDUE_FILTER}
+"""
+
+def ensure_work_queue(conn):
+    """Create the claims table and its indexes if missing"""
+    conn.executescript(CLAIMS_SCHEMA)
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+class WorkQueue:
+    def __init__(self, db_path=None, worker_id=None, lease_seconds=300, clock=None, lock_timeout=60):
+        require_unsharded("The work queue")
+        self.db_path = db_path or insurance_data.DB_PATH
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.lock_timeout = lock_timeout
+        self.clock = clock or time
+        self.held = set()
+        self.stats = {'claims': 0, 'reclaimed': 0, 'skipped': 0, 'busy_retries': 0, 'lost_leases': 0}
+        self._lock = threading.Lock()
+        self._heartbeat_stop = None
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Database file '{self.db_path}' not found!")
+        # Autocommit; every write takes its own BEGIN IMMEDIATE so the lock is
+        # acquired up front (see _write for how lock waits are handled)
+        self.conn = sqlite3.connect(self.db_path, timeout=lock_timeout, isolation_level=None, check_same_thread=False)
+        # WAL lets readers (the bot, MCP server) keep working while workers claim
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Claims are cheap to redo after a power cut; skip the fsync per commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        ensure_work_queue(self.conn)
+        # SQLite's own busy handler backs off to 100ms sleeps, so under many
+        # workers a few hog the lock and the rest starve; retry with short
+        # jittered sleeps instead
+        self.conn.execute("PRAGMA busy_timeout = 0")
+        self.records_conn = insurance_data.connect_for_records(self.db_path, check_same_thread=False)
+        self.enqueue_overdue()
+
+    def _write(self, fn):
+        """Run fn inside BEGIN IMMEDIATE, retrying while another worker holds the lock"""
+        with self._lock:
+            deadline = time.monotonic() + self.lock_timeout
+            backoff = 0.0005
+            while True:
+                try:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                    break
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e) or time.monotonic() > deadline:
+                        raise
+                    self.stats['busy_retries'] += 1
+                    time.sleep(random.uniform(0, backoff))
+                    backoff = min(backoff * 2, 0.01)
+            try:
+                result = fn()
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def enqueue_overdue(self):
+        """Add overdue policies not yet in the queue (idempotent); returns how many were added"""
+        return self._write(lambda: self.conn.execute(ENQUEUE_SQL).rowcount)
+
+    def _take_next(self, now):
+        """Inside the write lock: take an expired lease first, else the next ready policy"""
+        row = self.conn.execute(
+            "SELECT policy_number FROM policy_claims WHERE state = 'claimed' AND lease_expires < ? LIMIT 1", (now,)
+        ).fetchone() or self.conn.execute(
+            "SELECT policy_number FROM policy_claims WHERE state = 'ready' ORDER BY due_date, policy_number LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return self.conn.execute(
+            "UPDATE policy_claims SET state = 'claimed', worker_id = ?, claimed_at = ?, lease_expires = ?, "
+            "attempts = attempts + 1 WHERE policy_number = ? RETURNING policy_number, attempts",
+            (self.worker_id, now, now + self.lease_seconds, row[0])
+        ).fetchone()
+
+    def claim(self):
+        """Claim the next overdue policy for this worker; returns a PolicyRecord or None"""
+        while True:
+            row = self._write(lambda: self._take_next(self.clock.time()))
+            if row is None:
+                return None
+            policy_number, attempts = row
+            with self._lock:
+                record = fetch_record_by_policy(policy_number, self.records_conn)
+            if record is None or not is_overdue(record):
+                # Paid or removed since it was enqueued
+                self._write(lambda: self.conn.execute(
+                    "UPDATE policy_claims SET state = 'skipped', completed_at = ? WHERE policy_number = ?",
+                    (self.clock.time(), policy_number)
+                ))
+                self.stats['skipped'] += 1
+                continue
+            self.held.add(policy_number)
+            self.stats['claims'] += 1
+            if attempts > 1:
+                self.stats['reclaimed'] += 1
+            return record
+
+    def claim_policies(self, policy_numbers):
+        """Claim specific policies (e.g. the rest of a household) if nobody else holds them"""
+        now = self.clock.time()
+
+        def take():
+            taken = []
+            for policy_number in policy_numbers:
+                row = self.conn.execute(
+                    "UPDATE policy_claims SET state = 'claimed', worker_id = ?, claimed_at = ?, lease_expires = ?, "
+                    "attempts = attempts + 1 WHERE policy_number = ? "
+                    "AND (state = 'ready' OR (state = 'claimed' AND lease_expires < ?)) RETURNING policy_number",
+                    (self.worker_id, now, now + self.lease_seconds, policy_number, now)
+                ).fetchone()
+                if row:
+                    taken.append(row[0])
+            return taken
+
+        taken = self._write(take) if policy_numbers else []
+        self.held.update(taken)
+        return taken
+
+    def heartbeat(self, policy_number=None):
+        """Extend the lease on one (or every) held claim; returns the policies still held"""
+        targets = [policy_number] if policy_number else list(self.held)
+        expires = self.clock.time() + self.lease_seconds
+
+        def renew():
+            kept = []
+            for target in targets:
+                cursor = self.conn.execute(
+                    "UPDATE policy_claims SET lease_expires = ? "
+                    "WHERE policy_number = ? AND worker_id = ? AND state = 'claimed'",
+                    (expires, target, self.worker_id)
+                )
+                if cursor.rowcount:
+                    kept.append(target)
+            return kept
+
+        kept = self._write(renew) if targets else []
+        for lost in set(targets) - set(kept):
+            print(f"⚠️  Lease on {lost} was lost (expired and reclaimed by another worker)")
+            self.held.discard(lost)
+            self.stats['lost_leases'] += 1
+        return kept
+
+    def complete(self, policy_number):
+        """Mark a claimed policy as done; False if the lease was lost to another worker"""
+        self.held.discard(policy_number)
+        return self._write(lambda: self.conn.execute(
+            "UPDATE policy_claims SET state = 'done', completed_at = ? "
+            "WHERE policy_number = ? AND worker_id = ? AND state = 'claimed'",
+            (self.clock.time(), policy_number, self.worker_id)
+        ).rowcount) > 0
+
+    def release(self, policy_number):
+        """Give a claim back unfinished (e.g. shutting down) so another worker can take it"""
+        self.held.discard(policy_number)
+        return self._write(lambda: self.conn.execute(
+            "UPDATE policy_claims SET state = 'ready', worker_id = NULL, lease_expires = NULL "
+            "WHERE policy_number = ? AND worker_id = ? AND state = 'claimed'",
+            (policy_number, self.worker_id)
+        ).rowcount) > 0
+
+    def reclaim_expired(self):
+        """Put every expired lease back to ready; returns how many were freed"""
+        return self._write(lambda: self.conn.execute(
+            "UPDATE policy_claims SET state = 'ready', worker_id = NULL, lease_expires = NULL "
+            "WHERE state = 'claimed' AND lease_expires < ?", (self.clock.time(),)
+        ).rowcount)
+
+    def reset_campaign(self):
+        """Forget finished claims and re-enqueue the current overdue book for a new campaign"""
+        self._write(lambda: self.conn.execute("DELETE FROM policy_claims WHERE state IN ('done', 'skipped')"))
+        return self.enqueue_overdue()
+
+    def start_heartbeat(self, interval=None):
+        """Renew held leases from a background thread every lease_seconds / 3"""
+        if self._heartbeat_stop is not None:
+            return
+        interval = interval or self.lease_seconds / 3
+        self._heartbeat_stop = threading.Event()
+
+        def beat(stop):
+            while not stop.wait(interval):
+                try:
+                    if self.held:
+                        self.heartbeat()
+                except sqlite3.Error as e:
+                    print(f"⚠️  Heartbeat failed: {e}")
+
+        threading.Thread(target=beat, args=(self._heartbeat_stop,), daemon=True).start()
+
+    def close(self):
+        if self._heartbeat_stop is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_stop = None
+        for policy_number in list(self.held):
+            self.release(policy_number)
+        if self.conn is not None:
+            self.conn.close()
+            self.records_conn.close()
+            self.conn = None